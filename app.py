@@ -40,6 +40,9 @@ register_blueprints(app)
 @app.after_request
 def add_no_cache_headers(response):
     """Add headers to disable browser caching in development"""
+    # Responses that set their own caching policy (e.g. raw images) keep it
+    if response.cache_control.private or response.cache_control.public:
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -10,5 +10,84 @@ class Config:
     JWT_SECRET_KEY = 'jwt-secret-string'  # Change in production
     JWT_TOKEN_EXPIRATION = timedelta(days=1)
     
+    # SQLite connection settings, applied to every pooled connection (database/engine.py).
+    # WAL lets readers run while a report is being written; writers wait up to
+    # SQLITE_BUSY_TIMEOUT milliseconds for the write lock instead of failing
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_BUSY_TIMEOUT = 30000
+    # NORMAL is safe in WAL mode: a power loss can drop the last commits but never corrupts
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    # Bytes of the database file read through memory mapping instead of read() calls
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    # Page cache per connection: pages, or KiB when negative
+    SQLITE_CACHE_SIZE = -16000
+    # Temporary tables and sort indexes kept in memory
+    SQLITE_TEMP_STORE = 'MEMORY'
+    # Connections kept open per worker process, extra ones allowed at peak, and
+    # seconds a request waits for a free connection
+    SQLITE_POOL_SIZE = 5
+    SQLITE_POOL_MAX_OVERFLOW = 10
+    SQLITE_POOL_TIMEOUT = 30
+    
+    # Verified-identity cache used by token_required (seconds / max cached tokens)
+    IDENTITY_CACHE_TTL = 300
+    IDENTITY_CACHE_MAX_ENTRIES = 10000
+    
+    # Browser cache lifetime for raw image responses (seconds)
+    IMAGE_CACHE_MAX_AGE = 86400
+    
+    # Content-addressed blob store for images (relative to the working directory)
+    BLOB_STORE_PATH = 'instance/blobs'
+    
+    # Pre-serialized response snapshots shared by all worker processes
+    SNAPSHOT_CACHE_PATH = 'instance/snapshots'
+    
+    # Rendered PDFs cached on disk, and the worker processes that render them
+    PDF_CACHE_PATH = 'instance/pdfs'
+    PDF_RENDER_WORKERS = 2
+    PDF_RENDER_QUEUE_LIMIT = 20
+    # Seconds a request waits for a new PDF before answering 202 (retry later)
+    PDF_RENDER_WAIT = 20
+    
+    # Bulk report export: largest export, documents rendering at once, progress kept (seconds)
+    EXPORT_MAX_REPORTS = 1000
+    EXPORT_MAX_IN_FLIGHT = 4
+    EXPORT_PROGRESS_TTL = 3600
+    # Exports streaming at once per worker process; more get 429. Kept so that
+    # EXPORT_MAX_CONCURRENT * EXPORT_MAX_IN_FLIGHT leaves room under
+    # PDF_RENDER_QUEUE_LIMIT for interactive PDF requests
+    EXPORT_MAX_CONCURRENT = 2
+    
+    # Progress of long-running jobs such as exports, shared by all worker processes
+    JOB_PROGRESS_PATH = 'instance/progress'
+    
+    # Renditions generated in the background for every uploaded image (max edge in px)
+    IMAGE_RENDITION_SIZES = [128, 512]
+    IMAGE_RENDITION_QUALITY = 85
+    IMAGE_PIPELINE_WORKERS = 2
+    # Rendition linked from printable report HTML (one of IMAGE_RENDITION_SIZES or 'full')
+    REPORT_IMAGE_SIZE = '512'
+    
+    # Maximum ids accepted by the batch thumbnail endpoints
+    THUMBNAIL_BATCH_LIMIT = 200
+    
+    # List totals reused by follow-up pages of the same listing (seconds)
+    PAGE_COUNT_CACHE_TTL = 60
+    PAGE_COUNT_CACHE_MAX_ENTRIES = 1000
+    
+    # Dashboard counters cached per role scope (seconds / max scopes); writes invalidate them
+    DASHBOARD_STATS_CACHE_TTL = 60
+    DASHBOARD_STATS_CACHE_MAX_ENTRIES = 1000
+    
+    # Dropdown and filter data cached per role scope (seconds / max scopes); writes invalidate them
+    REFERENCE_DATA_CACHE_TTL = 3600
+    REFERENCE_DATA_CACHE_MAX_ENTRIES = 1000
+    
+    # Rows fetched per round trip when streaming lists as NDJSON
+    STREAM_BATCH_SIZE = 200
+    
+    # How often each worker checks whether another worker changed the settings (seconds)
+    SETTINGS_VERSION_CHECK_INTERVAL = 5
+    
     # Admin password for user registration
     ADMIN_PASSWORD = 'sYzAZPZd'
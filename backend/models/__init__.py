@@ -1,6 +1,7 @@
 # Models package - exports all models
 
 from backend.models.user import db, User, UserRole
+from backend.models.blob import Blob
 from backend.models.client import Person, Client, ClientImage
 from backend.models.product import Product, ProductImage
 from backend.models.visit_report import VisitReport, VisitReportImage, VisitReportNote, VisitReportProduct
@@ -10,6 +11,7 @@ __all__ = [
     'db',
     'User',
     'UserRole',
+    'Blob',
     'Person',
     'Client',
     'ClientImage',
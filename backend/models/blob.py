@@ -0,0 +1,138 @@
+# Blob reference counting for the content-addressed blob store
+
+from backend.models.user import db
+from backend.storage.blob_store import blob_size, delete_blob_file, put_blob
+from backend.storage.image_pipeline import schedule_renditions
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+class Blob(db.Model):
+    __tablename__ = 'blobs'
+    
+    hash = db.Column(db.String(64), primary_key=True)  # SHA-256 of the content
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Blob {self.hash[:12]} refs={self.ref_count}>'
+
+_blobs = Blob.__table__
+
+def store_blob(data):
+    """Write bytes to the store for the current request's transaction.
+
+    The bytes are kept on the session until the transaction ends: the file is
+    written again if it was discarded before this transaction's row refers to
+    it (see acquire_blob), and removed if the transaction rolls back.
+    """
+    hash_value = put_blob(data)
+    db.session.info.setdefault('stored_blobs', {})[hash_value] = data
+    return hash_value
+
+def acquire_blob(connection, hash_value, session=None):
+    """Add one reference to a blob, creating its row on first use"""
+    result = connection.execute(
+        _blobs.update().where(_blobs.c.hash == hash_value).values(ref_count=_blobs.c.ref_count + 1)
+    )
+    # Now under the write lock: put back a file this session stored (or found
+    # already stored) that discard_unreferenced_blobs removed since
+    stored = session.info.get('stored_blobs', {}).get(hash_value) if session is not None else None
+    if stored is not None:
+        put_blob(stored)
+    if result.rowcount == 0:
+        connection.execute(_blobs.insert().values(
+            hash=hash_value, size=blob_size(hash_value), ref_count=1, created_at=datetime.utcnow()
+        ))
+        if session is not None:
+            session.info.setdefault('new_blobs', set()).add(hash_value)
+    if session is not None:
+        session.info.get('released_blobs', set()).discard(hash_value)
+
+def release_blob(connection, hash_value, session=None):
+    """Drop one reference; unreferenced blobs are deleted from disk after commit"""
+    connection.execute(
+        _blobs.update().where(_blobs.c.hash == hash_value).values(ref_count=_blobs.c.ref_count - 1)
+    )
+    remaining = connection.execute(
+        db.select(_blobs.c.ref_count).where(_blobs.c.hash == hash_value)
+    ).scalar()
+    if remaining is not None and remaining <= 0:
+        connection.execute(_blobs.delete().where(_blobs.c.hash == hash_value))
+        if session is not None:
+            session.info.setdefault('released_blobs', set()).add(hash_value)
+
+def track_blob_references(model, column_name):
+    """Keep blob reference counts in sync with a model's hash column"""
+
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        hash_value = getattr(target, column_name)
+        if hash_value:
+            acquire_blob(connection, hash_value, object_session(target))
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        history = get_history(target, column_name)
+        if not history.has_changes():
+            return
+        session = object_session(target)
+        for hash_value in history.added:
+            if hash_value:
+                acquire_blob(connection, hash_value, session)
+        for hash_value in history.deleted:
+            if hash_value:
+                release_blob(connection, hash_value, session)
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        hash_value = getattr(target, column_name)
+        if hash_value:
+            release_blob(connection, hash_value, object_session(target))
+
+@event.listens_for(Session, 'after_commit')
+def _schedule_new_blob_renditions(session):
+    """Generate renditions of newly uploaded images off the request thread"""
+    session.info.pop('stored_blobs', None)
+    for hash_value in session.info.pop('new_blobs', ()):
+        schedule_renditions(hash_value)
+
+@event.listens_for(Session, 'after_commit')
+def _delete_released_blobs(session):
+    """Remove files whose last reference went away in the committed transaction"""
+    released = session.info.pop('released_blobs', None)
+    if released:
+        discard_unreferenced_blobs(released)
+
+def discard_unreferenced_blobs(hashes):
+    """Delete the files of blobs that have no row in the blobs table.
+
+    Used for released blobs after commit, and for files stored for a write
+    that was rolled back before any row referenced them. Runs under the
+    database write lock: another request may have deduplicated onto one of
+    these files and not committed its row yet, and acquire_blob rewrites the
+    file under the same lock, so the check and the delete never interleave
+    with that insert.
+    """
+    hashes = set(hashes)
+    if not hashes:
+        return
+    with db.engine.begin() as connection:
+        # The first write takes the lock, held until the block commits
+        connection.execute(_blobs.delete().where(_blobs.c.hash.in_(hashes), _blobs.c.ref_count <= 0))
+        referenced = {row[0] for row in connection.execute(
+            db.select(_blobs.c.hash).where(_blobs.c.hash.in_(hashes))
+        )}
+        for hash_value in hashes - referenced:
+            delete_blob_file(hash_value)
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_pending_blob_changes(session):
+    """Drop the pending changes and the files stored for the rolled back write"""
+    session.info.pop('released_blobs', None)
+    session.info.pop('new_blobs', None)
+    stored = session.info.pop('stored_blobs', None)
+    if stored:
+        discard_unreferenced_blobs(stored)
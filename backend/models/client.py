@@ -1,6 +1,9 @@
 # Client, Person, and ClientImage Models
 
 from backend.models.user import db
+from backend.models.blob import track_blob_references
+from backend.search.normalize import track_search_keys
+from backend.storage.blob_store import read_blob
 from datetime import datetime
 
 class Person(db.Model):
@@ -21,6 +24,16 @@ class Person(db.Model):
 
 class Client(db.Model):
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Filter dimensions: seek on the key, and list the distinct values of a
+        # scope from the index alone (filter-data dropdowns)
+        db.Index('ix_clients_region_scope', 'region_key', 'is_active', 'assigned_user_id', 'region'),
+        db.Index('ix_clients_salesman_scope', 'salesman_key', 'is_active', 'assigned_user_id', 'salesman_name'),
+        # Client lists and name dropdowns: scope by owner (or all active clients
+        # for admins) and read in name order from the index
+        db.Index('ix_clients_assigned_active_name', 'assigned_user_id', 'is_active', 'name'),
+        db.Index('ix_clients_active_name', 'is_active', 'name'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -28,7 +41,15 @@ class Client(db.Model):
     location = db.Column(db.Text)  # Google Maps coordinates/address
     address = db.Column(db.Text)  # Physical address string
     salesman_name = db.Column(db.String(255))  # Name of the salesman handling this client
-    thumbnail = db.Column(db.LargeBinary)  # BLOB for image data
+    # normalize_text() of the columns above, set on write and used for search
+    name_key = db.Column(db.String(255), index=True)
+    region_key = db.Column(db.String(255))
+    address_key = db.Column(db.Text)  # Only searched through the full-text index
+    salesman_key = db.Column(db.String(255))
+    thumbnail = db.deferred(db.Column(db.LargeBinary))  # Legacy BLOB, superseded by thumbnail_hash
+    thumbnail_hash = db.Column(db.String(64))  # Blob store reference
+    # Computed in SQL so list queries never load the deferred BLOB
+    has_thumbnail = db.column_property(thumbnail_hash.isnot(None) | thumbnail.expression.isnot(None))
     is_active = db.Column(db.Boolean, default=True)  # For deactivation instead of deletion
     
     # Foreign keys
@@ -44,6 +65,13 @@ class Client(db.Model):
     images = db.relationship('ClientImage', backref='client', lazy=True, cascade='all, delete-orphan')
     visit_reports = db.relationship('VisitReport', backref='client', lazy=True)
     
+    @property
+    def thumbnail_bytes(self):
+        """Thumbnail from the blob store, falling back to the legacy BLOB column"""
+        if self.thumbnail_hash:
+            return read_blob(self.thumbnail_hash)
+        return self.thumbnail
+    
     def __repr__(self):
         return f'<Client {self.name}>'
 
@@ -51,10 +79,22 @@ class ClientImage(db.Model):
     __tablename__ = 'client_images'
     
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
-    image_data = db.Column(db.LargeBinary, nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False, index=True)
+    image_data = db.deferred(db.Column(db.LargeBinary))  # Legacy BLOB, superseded by image_hash
+    image_hash = db.Column(db.String(64))  # Blob store reference
     filename = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def image_bytes(self):
+        """Image from the blob store, falling back to the legacy BLOB column"""
+        if self.image_hash:
+            return read_blob(self.image_hash)
+        return self.image_data
+    
     def __repr__(self):
         return f'<ClientImage {self.filename}>'
+
+track_blob_references(Client, 'thumbnail_hash')
+track_blob_references(ClientImage, 'image_hash')
+track_search_keys(Client, name_key='name', region_key='region', address_key='address', salesman_key='salesman_name')
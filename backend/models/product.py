@@ -1,6 +1,9 @@
 # Product and ProductImage Models
 
 from backend.models.user import db
+from backend.models.blob import track_blob_references
+from backend.search.normalize import track_search_keys
+from backend.storage.blob_store import read_blob
 from datetime import datetime
 
 class Product(db.Model):
@@ -8,18 +11,29 @@ class Product(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
+    name_key = db.Column(db.String(255), index=True)  # normalize_text(name), set on write
     description = db.Column(db.Text, nullable=True)  # Product description
     taxed_price_store = db.Column(db.Numeric(10, 2))
     untaxed_price_store = db.Column(db.Numeric(10, 2))
     taxed_price_client = db.Column(db.Numeric(10, 2))
     untaxed_price_client = db.Column(db.Numeric(10, 2))
-    thumbnail = db.Column(db.LargeBinary)  # BLOB for image data
+    thumbnail = db.deferred(db.Column(db.LargeBinary))  # Legacy BLOB, superseded by thumbnail_hash
+    thumbnail_hash = db.Column(db.String(64))  # Blob store reference
+    # Computed in SQL so list queries never load the deferred BLOB
+    has_thumbnail = db.column_property(thumbnail_hash.isnot(None) | thumbnail.expression.isnot(None))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     images = db.relationship('ProductImage', backref='product', lazy=True, cascade='all, delete-orphan')
     visit_report_products = db.relationship('VisitReportProduct', backref='product', lazy=True)
     
+    @property
+    def thumbnail_bytes(self):
+        """Thumbnail from the blob store, falling back to the legacy BLOB column"""
+        if self.thumbnail_hash:
+            return read_blob(self.thumbnail_hash)
+        return self.thumbnail
+    
     def __repr__(self):
         return f'<Product {self.name}>'
 
@@ -27,10 +41,22 @@ class ProductImage(db.Model):
     __tablename__ = 'product_images'
     
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
-    image_data = db.Column(db.LargeBinary, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    image_data = db.deferred(db.Column(db.LargeBinary))  # Legacy BLOB, superseded by image_hash
+    image_hash = db.Column(db.String(64))  # Blob store reference
     filename = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def image_bytes(self):
+        """Image from the blob store, falling back to the legacy BLOB column"""
+        if self.image_hash:
+            return read_blob(self.image_hash)
+        return self.image_data
+    
     def __repr__(self):
         return f'<ProductImage {self.filename}>'
+
+track_blob_references(Product, 'thumbnail_hash')
+track_blob_references(ProductImage, 'image_hash')
+track_search_keys(Product, name_key='name')
@@ -19,7 +19,7 @@ class User(db.Model):
     username = db.Column(db.String(255), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.Enum(UserRole), nullable=False)
-    supervisor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    supervisor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -1,13 +1,21 @@
 # Visit Report Models
 
 from backend.models.user import db
+from backend.models.blob import track_blob_references
+from backend.storage.blob_store import read_blob
 from datetime import datetime
 
 class VisitReport(db.Model):
     __tablename__ = 'visit_reports'
+    __table_args__ = (
+        # Report lists: scope by author (or all active reports for admins) and
+        # read newest first straight from the index, (created_at, id) cursors included
+        db.Index('ix_visit_reports_user_activity', 'user_id', 'is_active', 'created_at'),
+        db.Index('ix_visit_reports_active_created', 'is_active', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     visit_date = db.Column(db.Date, nullable=False)
     is_active = db.Column(db.Boolean, default=True)  # For deactivation instead of deletion
@@ -25,20 +33,30 @@ class VisitReportImage(db.Model):
     __tablename__ = 'visit_report_images'
     
     id = db.Column(db.Integer, primary_key=True)
-    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False)
-    image_data = db.Column(db.LargeBinary, nullable=False)
+    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False, index=True)
+    image_data = db.deferred(db.Column(db.LargeBinary))  # Legacy BLOB, superseded by image_hash
+    image_hash = db.Column(db.String(64))  # Blob store reference
     filename = db.Column(db.String(255))
     is_suggested_products = db.Column(db.Boolean, default=False)  # Flag for suggested products images
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def image_bytes(self):
+        """Image from the blob store, falling back to the legacy BLOB column"""
+        if self.image_hash:
+            return read_blob(self.image_hash)
+        return self.image_data
+    
     def __repr__(self):
         return f'<VisitReportImage {self.filename}>'
 
+track_blob_references(VisitReportImage, 'image_hash')
+
 class VisitReportNote(db.Model):
     __tablename__ = 'visit_report_notes'
     
     id = db.Column(db.Integer, primary_key=True)
-    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False)
+    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False, index=True)
     note_text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -49,8 +67,8 @@ class VisitReportProduct(db.Model):
     __tablename__ = 'visit_report_products'
     
     id = db.Column(db.Integer, primary_key=True)
-    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    visit_report_id = db.Column(db.Integer, db.ForeignKey('visit_reports.id'), nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     displayed_price = db.Column(db.Numeric(10, 2))  # Price shown in store
     expired_or_nearly_expired = db.Column(db.Boolean, default=False)
     expiry_date = db.Column(db.Date)  # Only if expired_or_nearly_expired = True
@@ -0,0 +1 @@
+# Rendering package - server-side HTML and PDF generation
@@ -0,0 +1,58 @@
+# Catalogue PDF document
+#
+# Builds the HTML that weasyprint renders into the printable catalogue: one
+# 1080x1080 page per product, laid out like frontend/html/catalogue.html.
+
+import os
+from html import escape
+from backend.rendering.pdf import BASE_URL, PdfCache
+
+TEMPLATE_PATH = os.path.join(BASE_URL, 'templates', 'catalogue_pdf.html')
+
+# Same labels and currency as the browser catalogue
+PRICE_LABELS = [
+    ('taxed_price_store', 'سعر العميل (شامل)'),
+    ('untaxed_price_store', 'سعر العميل (بدون)'),
+    ('taxed_price_client', 'سعر المحل (شامل)'),
+    ('untaxed_price_client', 'سعر المحل (بدون)'),
+]
+CURRENCY = 'ر.س'
+
+# Rendered catalogues, keyed by the ETag of the catalogue snapshot they were built from
+catalogue_pdfs = PdfCache('catalogue')
+
+def format_price(price):
+    return f'{float(price or 0):.2f} {CURRENCY}'
+
+def render_page(product):
+    """HTML of one catalogue page for a product dict from the catalogue snapshot"""
+    image = f"data:image/jpeg;base64,{product['thumbnail']}" if product.get('thumbnail') else 'catalogue/logo.png'
+    prices = [
+        f'<td class="price-item"><div class="price-label">{label}</div>'
+        f'<div class="price-value">{format_price(product.get(field))}</div></td>'
+        for field, label in PRICE_LABELS
+    ]
+    return f"""
+    <div class="catalogue-page">
+        <img src="catalogue/logo.png" alt="Logo" class="catalogue-logo">
+        <div class="image-frame-container">
+            <img src="{image}" alt="{escape(product['name'])}" class="product-image">
+            <img src="catalogue/image-frame.png" alt="" class="image-frame">
+        </div>
+        <div class="product-info">
+            <h1 class="product-name">{escape(product['name'])}</h1>
+            <p class="product-description">{escape(product.get('description') or '')}</p>
+        </div>
+        <div class="price-container">
+            <table class="price-grid-inner">
+                <tr>{prices[0]}{prices[1]}</tr>
+                <tr>{prices[2]}{prices[3]}</tr>
+            </table>
+        </div>
+    </div>"""
+
+def build_catalogue_html(products):
+    """Full catalogue document for a list of snapshot product dicts"""
+    with open(TEMPLATE_PATH, 'r', encoding='utf-8') as f:
+        template = f.read()
+    return template.replace('{{pages}}', ''.join(render_page(p) for p in products))
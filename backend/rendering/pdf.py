@@ -0,0 +1,158 @@
+# PDF rendering
+#
+# HTML documents are turned into PDF by weasyprint in a small pool of worker
+# processes, so a render never blocks a request thread or the GIL. Finished PDFs
+# are kept on disk under <PDF_CACHE_PATH>/<namespace>/<key>.pdf, where the key is
+# a version of the data the document was built from; a PDF is served from disk
+# until its data changes and the key with it.
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from flask import jsonify, send_file
+from backend.config import Config
+
+# Repository root, so templates can reference catalogue/ and templates/font/ relatively
+BASE_URL = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + os.sep
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+class RenderQueueFull(Exception):
+    """Raised when too many PDFs are already waiting for a worker"""
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a process that holds database connections and threads is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.PDF_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
+
+def render_pdf(html, base_url=BASE_URL):
+    """Render an HTML document to PDF bytes (runs in a worker process)"""
+    # Imported here so the web process never loads weasyprint and its native libraries
+    from weasyprint import HTML
+    return HTML(string=html, base_url=base_url).write_pdf()
+
+def submit(fn, *args):
+    """Run a top-level function in the render worker pool and return its Future"""
+    return _get_executor().submit(fn, *args)
+
+def render_to_file(html, path, base_url=BASE_URL):
+    """Render an HTML document and atomically write the PDF to path (runs in a worker process)"""
+    write_file(path, render_pdf(html, base_url))
+    return path
+
+def write_file(path, data):
+    """Atomically write bytes to path, creating its directory"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class PdfCache:
+    """Rendered PDFs of one kind of document, keyed by data version"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def path(self, key):
+        return os.path.join(os.path.abspath(Config.PDF_CACHE_PATH), self.namespace, f'{key}.pdf')
+
+    def get(self, key):
+        """Path of the cached PDF for key, or None if it has not been rendered"""
+        path = self.path(key)
+        return path if os.path.exists(path) else None
+
+    def render(self, key, build_html):
+        """Queue a render of key and return a Future resolving to its path.
+
+        build_html() -> str runs right away in the calling thread (it may use the
+        database); a render of the same key already in progress is reused.
+        """
+        job_key = (self.namespace, key)
+        with _jobs_lock:
+            future = self._queued(job_key)
+        if future is not None:
+            return future
+
+        # Built outside the lock, so renders of other documents never wait on
+        # this one's queries; the job table is checked again before queueing
+        html = build_html()
+        with _jobs_lock:
+            future = self._queued(job_key)
+            if future is not None:
+                return future
+            future = submit(render_to_file, html, self.path(key))
+            _jobs[job_key] = future
+
+        def forget(_):
+            with _jobs_lock:
+                _jobs.pop(job_key, None)
+        future.add_done_callback(forget)
+        return future
+
+    def _queued(self, job_key):
+        """Render of job_key in progress, or None if a new one may be queued (hold _jobs_lock).
+
+        Raises RenderQueueFull when there is no room for a new render.
+        """
+        future = _jobs.get(job_key)
+        if future is None and len(_jobs) >= Config.PDF_RENDER_QUEUE_LIMIT:
+            raise RenderQueueFull('Too many PDFs are being generated, try again shortly')
+        return future
+
+    def invalidate(self, prefix='', keep=None):
+        """Delete cached PDFs whose key starts with prefix, except keep"""
+        directory = os.path.dirname(self.path('_'))
+        if not os.path.isdir(directory):
+            return
+        for name in os.listdir(directory):
+            if name.startswith(prefix) and name.endswith('.pdf') and name != f'{keep}.pdf':
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+def send_pdf(pdf_cache, key, build_html, download_name, private=True):
+    """Serve the PDF for key, rendering it first if needed.
+
+    Waits up to PDF_RENDER_WAIT seconds for a new render; after that the client
+    gets 202 with Retry-After and picks the file up from the cache on a retry.
+    """
+    path = pdf_cache.get(key)
+    if path is None:
+        future = pdf_cache.render(key, build_html)
+        try:
+            path = future.result(timeout=Config.PDF_RENDER_WAIT)
+        except FutureTimeout:
+            response = jsonify({'status': 'rendering', 'message': 'PDF is being generated, try again shortly'})
+            response.status_code = 202
+            response.headers['Retry-After'] = '5'
+            return response
+
+    response = send_file(path, mimetype='application/pdf', download_name=download_name,
+                         etag=key, conditional=True, max_age=0)
+    if private:
+        response.cache_control.public = False
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,125 @@
+# Visit report PDF document
+#
+# weasyprint does not run JavaScript, so the report templates are filled here
+# the way populateReport() fills them in the browser, and the interactive parts
+# (scripts, print buttons, signature pad) are dropped.
+
+import base64
+import hashlib
+import re
+from urllib.parse import unquote, urlparse
+from datetime import date, datetime
+from html import escape
+from backend.rendering.pdf import PdfCache
+from backend.utils.images import detect_image_mimetype
+
+# Rendered reports, keyed by '<report id>-<hash of the filled document>'
+report_pdfs = PdfCache('reports')
+
+_WEEKDAYS = ['الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد']
+
+# Hidden in the PDF; the signature pad only works in the browser
+_PDF_STYLE = """
+    <style>
+        .controls, #addSignatureBtn, #signaturePadContainer { display: none !important; }
+    </style>
+"""
+
+def _replace_inner(html, element_id, inner):
+    """Replace the content of the element with the given id (no nested same-name tags)"""
+    pattern = re.compile(r'(<(\w+)[^>]*\bid="%s"[^>]*>).*?(</\2>)' % re.escape(element_id), re.S)
+    return pattern.sub(lambda m: m.group(1) + inner + m.group(3), html, count=1)
+
+def _format_notes(notes):
+    """Same formatting as populateReport(): one starred line per note, <u> answers highlighted"""
+    lines = []
+    for note in notes.split('\\n'):
+        note = note.strip()
+        if not note:
+            continue
+        note = escape(note)
+        note = re.sub(r'&lt;u&gt;(.*?)&lt;/u&gt;', r'<span style="color: #B88A2A; font-weight: bold;">\1</span>', note)
+        note = re.sub(r'^\*+\s*', '', note)
+        lines.append('<span style="font-weight: bold; color: #CA9E3F;">*</span> ' + note + '<br>')
+    return ''.join(lines) if lines else escape(notes)
+
+def _price_mismatch(product, tolerance):
+    """Displayed price above ours, or below ours by more than the tolerance"""
+    our_price = product.get('our_price_raw')
+    displayed_price = product.get('displayed_price_raw')
+    if our_price is None or displayed_price is None:
+        return False
+    return displayed_price > our_price or displayed_price < our_price - tolerance
+
+def _is_expired(expiry_date, today):
+    try:
+        return datetime.strptime(expiry_date, '%Y/%m/%d').date() < today
+    except ValueError:
+        return False
+
+def _product_rows(products, tolerance, today):
+    warning = ' style="color: #8B0000; font-weight: bold;"'
+    rows = []
+    for index, product in enumerate(products, start=1):
+        price_style = warning if _price_mismatch(product, tolerance) else ''
+        expiry_style = warning if _is_expired(product.get('expiry_date') or '', today) else ''
+        rows.append(
+            f"<tr><td>{index}</td><td>{escape(product.get('name') or '')}</td>"
+            f"<td{price_style}>{escape(product.get('our_price') or '')}</td>"
+            f"<td{price_style}>{escape(product.get('displayed_price') or '')}</td>"
+            f"<td{expiry_style}>{escape(product.get('expiry_date') or '')}</td>"
+            f"<td>{product.get('units_count') or ''}</td></tr>"
+        )
+    # The table always shows at least four rows
+    for index in range(len(rows) + 1, 5):
+        rows.append(f'<tr><td>{index}</td><td></td><td></td><td></td><td></td><td></td></tr>')
+    return ''.join(rows)
+
+def build_report_pdf_html(template_html, report_data, image_src, today=None):
+    """Fill a visit report template with report_data for PDF rendering.
+
+    image_src(image) returns the src of one image entry of report_data.
+    """
+    today = today or date.today()
+    html = re.sub(r'<script\b.*?</script>', '', template_html, flags=re.S)
+    # Assets are resolved against the repository root rather than the web root
+    html = html.replace("url('/font/", "url('templates/font/").replace('src="/logo_corner.png"', 'src="templates/logo_corner.png"')
+    html = html.replace('</head>', _PDF_STYLE + '</head>', 1)
+
+    for element_id, key in (('client-name', 'client_name'), ('client-address', 'client_address'),
+                            ('client-phone', 'client_phone'), ('salesman-name', 'salesman_name')):
+        html = _replace_inner(html, element_id, escape(report_data.get(key) or '-'))
+
+    # Day name and Gregorian date; the browser also shows the Umm al-Qura date,
+    # which needs a calendar the standard library does not have
+    visit_date = datetime.strptime(report_data['visit_date'], '%Y/%m/%d').date()
+    html = _replace_inner(html, 'visit-day', _WEEKDAYS[visit_date.weekday()])
+    html = _replace_inner(html, 'visit-date-gregorian', visit_date.strftime('%d/%m/%Y'))
+    html = re.sub(r'<span> - </span>\s*<span id="visit-date-islamic"></span>', '', html, count=1)
+
+    regular = [img for img in report_data['images'] if not img.get('is_suggested_products')]
+    suggested = [img for img in report_data['images'] if img.get('is_suggested_products')]
+    for i, img in enumerate(regular[:3], start=1):
+        html = _replace_inner(html, f'image-{i}', f'<img src="{image_src(img)}" class="actual-image" alt="صورة {i}">')
+    if suggested:
+        html = html.replace('id="suggested-products-section" style="display: none;"', 'id="suggested-products-section"', 1)
+        for i, img in enumerate(suggested[:3], start=1):
+            html = _replace_inner(html, f'suggested-image-{i}', f'<img src="{image_src(img)}" class="actual-image" alt="صورة مقترحة {i}">')
+
+    if report_data.get('notes'):
+        html = _replace_inner(html, 'notes-content', _format_notes(report_data['notes']))
+
+    html = _replace_inner(html, 'products-tbody', _product_rows(report_data['products'], report_data['price_tolerance'], today))
+    return html
+
+def report_pdf_key(report_id, html):
+    """Cache key that changes whenever anything shown in the document changes"""
+    return f'{report_id}-{hashlib.sha256(html.encode("utf-8")).hexdigest()[:24]}'
+
+def inline_local_images(html):
+    """Replace file:// image sources with data URIs so the HTML stands alone (runs in a worker process)"""
+    def inline(match):
+        with open(unquote(urlparse(match.group(1)).path), 'rb') as f:
+            data = f.read()
+        return f'src="data:{detect_image_mimetype(data)};base64,{base64.b64encode(data).decode("ascii")}"'
+    return re.sub(r'src="(file://[^"]+)"', inline, html)
@@ -0,0 +1,75 @@
+# Template rendering
+#
+# Files read on hot paths (report templates, settings) are loaded and parsed
+# once per process and reloaded only when their modification time or size
+# changes, so editing a template on the server still takes effect immediately.
+
+import json
+import os
+import threading
+
+class FileCache:
+    """Parsed contents of one file, re-read only when the file changes on disk"""
+
+    def __init__(self, path, parse):
+        self.path = path
+        self.parse = parse
+        self._signature = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return parse(text) for the current file contents (raises OSError if missing)"""
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return self._value
+
+        with self._lock:
+            if signature != self._signature:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._value = self.parse(f.read())
+                self._signature = signature
+            return self._value
+
+
+class ReportTemplate:
+    """A report template split around the point where the data script is injected"""
+
+    def __init__(self, source):
+        self.source = source
+        index = source.rfind('</body>')
+        if index == -1:
+            index = len(source)
+        self.head = source[:index]
+        self.tail = source[index:]
+
+    def render(self, report_data):
+        """Template with a script that calls populateReport(report_data) on load"""
+        # '</' is escaped so text in the data can never close the script element
+        data = json.dumps(report_data, ensure_ascii=False).replace('</', '<\\/')
+        return ''.join((self.head, _DATA_SCRIPT_START, data, _DATA_SCRIPT_END, self.tail))
+
+
+_DATA_SCRIPT_START = """
+        <script>
+            window.addEventListener('DOMContentLoaded', function() {
+                const reportData = """
+_DATA_SCRIPT_END = """;
+                if (typeof populateReport === 'function') {
+                    populateReport(reportData);
+                }
+            });
+        </script>
+        """
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def get_report_template(path):
+    """Compiled ReportTemplate for a template file, cached per path"""
+    cache = _templates.get(path)
+    if cache is None:
+        with _templates_lock:
+            cache = _templates.setdefault(path, FileCache(path, ReportTemplate))
+    return cache.get()
@@ -14,6 +14,7 @@ def register_blueprints(app: Flask):
     from backend.routes.client_routes import client_bp
     from backend.routes.product_routes import product_bp
     from backend.routes.report_routes import report_bp
+    from backend.routes.dashboard_routes import dashboard_bp
     
     # Register all blueprints
     app.register_blueprint(auth_bp)
@@ -27,6 +28,7 @@ def register_blueprints(app: Flask):
     app.register_blueprint(client_bp)
     app.register_blueprint(product_bp)
     app.register_blueprint(report_bp)
+    app.register_blueprint(dashboard_bp)
 
     
     print("✅ ALL BLUEPRINTS REGISTERED!")
@@ -40,6 +42,7 @@ def register_blueprints(app: Flask):
     print("  - client_bp: /api/clients/*")
     print("  - product_bp: /api/products/*")
     print("  - report_bp: /api/visit-reports/*")
+    print("  - dashboard_bp: /api/dashboard/*")
     print("="*70)
     print("🎉 100% MODULAR ARCHITECTURE ACTIVE!")
 
@@ -2,33 +2,36 @@
 
 from flask import Blueprint, request, jsonify
 from backend.models import db, Client, Person, ClientImage, User, UserRole, VisitReport
-from backend.utils.auth import token_required
+from backend.config import Config
+from backend.utils.auth import token_required, media_token_required
+from backend.utils.images import send_stored_image, send_image_batch, batch_request_data
+from backend.storage.image_pipeline import RENDITION_SIZES
+from backend.utils.permissions import client_visibility_filter
+from backend.utils.pagination import Pagination, InvalidCursor
+from backend.utils.streaming import ndjson_response
+from backend.utils.snapshots import send_snapshot
+from backend.utils.reference_data import client_names, client_names_with_salesman, client_filter_data
+from backend.search.fts import client_hits
+from backend.search.normalize import normalize_text
+from backend.models.blob import store_blob
 from sqlalchemy import text
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import joinedload, selectinload, undefer
 import base64
 
 client_bp = Blueprint('clients', __name__, url_prefix='/api/clients')
 
 # ==================== GET ROUTES ====================
 
+# Dropdown and filter lists come from reference data snapshots; the database is
+# only read again after a client or user changes
+
 @client_bp.route('/names', methods=['GET'])
 @token_required
 def get_client_names_only(current_user):
     """Get client names for dropdowns"""
     try:
-        if current_user.role == UserRole.SUPER_ADMIN:
-            query = text("SELECT id, name, region FROM clients WHERE is_active = 1 ORDER BY name")
-            result = db.session.execute(query).fetchall()
-        elif current_user.role == UserRole.SALES_SUPERVISOR:
-            query = text("""SELECT id, name, region FROM clients WHERE is_active = 1 AND (
-                assigned_user_id = :user_id OR assigned_user_id IN (SELECT id FROM users WHERE supervisor_id = :user_id)
-            ) ORDER BY name""")
-            result = db.session.execute(query, {'user_id': current_user.id}).fetchall()
-        else:
-            query = text("SELECT id, name, region FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id ORDER BY name")
-            result = db.session.execute(query, {'user_id': current_user.id}).fetchall()
-        
-        clients = [{'id': row[0], 'name': row[1], 'region': row[2]} for row in result]
-        return jsonify(clients), 200
+        return send_snapshot(client_names(current_user), private=True)
     except Exception as e:
         return jsonify({'message': 'Failed to fetch client names', 'error': str(e)}), 500
 
@@ -38,27 +41,7 @@ def get_client_names_only(current_user):
 def get_client_names_with_salesman(current_user):
     """Get client names with salesman info for team management"""
     try:
-        if current_user.role == UserRole.SUPER_ADMIN:
-            query = text("SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 ORDER BY name")
-            result = db.session.execute(query).fetchall()
-        elif current_user.role == UserRole.SALES_SUPERVISOR:
-            query = text("""SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 AND (
-                assigned_user_id = :user_id OR assigned_user_id IN (SELECT id FROM users WHERE supervisor_id = :user_id)
-                OR assigned_user_id IS NULL
-            ) ORDER BY name""")
-            result = db.session.execute(query, {'user_id': current_user.id}).fetchall()
-        else:
-            query = text("SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id ORDER BY name")
-            result = db.session.execute(query, {'user_id': current_user.id}).fetchall()
-        
-        clients = [{
-            'id': row[0], 
-            'name': row[1], 
-            'region': row[2],
-            'salesman_name': row[3],
-            'assigned_user_id': row[4]
-        } for row in result]
-        return jsonify(clients), 200
+        return send_snapshot(client_names_with_salesman(current_user), private=True)
     except Exception as e:
         return jsonify({'message': 'Failed to fetch client names', 'error': str(e)}), 500
 
@@ -67,36 +50,7 @@ def get_client_names_with_salesman(current_user):
 def get_client_filter_data(current_user):
     """Get unique regions and salesmen for filter dropdowns"""
     try:
-        if current_user.role == UserRole.SUPER_ADMIN:
-            regions_result = db.session.execute(text("SELECT DISTINCT region FROM clients WHERE is_active = 1 AND region IS NOT NULL AND region != '' ORDER BY region")).fetchall()
-            salesmen_result = db.session.execute(text("SELECT DISTINCT salesman_name FROM clients WHERE is_active = 1 AND salesman_name IS NOT NULL AND salesman_name != '' ORDER BY salesman_name")).fetchall()
-        elif current_user.role == UserRole.SALES_SUPERVISOR:
-            # For supervisors, get regions/salesmen from ALL clients in their team (themselves + their salesmen)
-            query_regions = text("""
-                SELECT DISTINCT c.region FROM clients c
-                LEFT JOIN users u ON c.assigned_user_id = u.id
-                WHERE c.is_active = 1 AND c.region IS NOT NULL AND c.region != ''
-                AND (c.assigned_user_id = :user_id OR u.supervisor_id = :user_id)
-                ORDER BY c.region
-            """)
-            query_salesmen = text("""
-                SELECT DISTINCT c.salesman_name FROM clients c
-                LEFT JOIN users u ON c.assigned_user_id = u.id
-                WHERE c.is_active = 1 AND c.salesman_name IS NOT NULL AND c.salesman_name != ''
-                AND (c.assigned_user_id = :user_id OR u.supervisor_id = :user_id)
-                ORDER BY c.salesman_name
-            """)
-            regions_result = db.session.execute(query_regions, {'user_id': current_user.id}).fetchall()
-            salesmen_result = db.session.execute(query_salesmen, {'user_id': current_user.id}).fetchall()
-        else:
-            regions_result = db.session.execute(text("SELECT DISTINCT region FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id AND region IS NOT NULL AND region != '' ORDER BY region"), {'user_id': current_user.id}).fetchall()
-            salesmen_result = db.session.execute(text("SELECT DISTINCT salesman_name FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id AND salesman_name IS NOT NULL AND salesman_name != '' ORDER BY salesman_name"), {'user_id': current_user.id}).fetchall()
-        
-        # Deduplicate and strip whitespace
-        regions = sorted(list(set([r[0].strip() for r in regions_result if r[0] and r[0].strip()])))
-        salesmen = sorted(list(set([s[0].strip() for s in salesmen_result if s[0] and s[0].strip()])))
-
-        return jsonify({'regions': regions, 'salesmen': salesmen}), 200
+        return send_snapshot(client_filter_data(current_user), private=True)
     except Exception as e:
         return jsonify({'message': 'Failed to fetch filter data', 'error': str(e)}), 500
 
@@ -106,8 +60,7 @@ def get_clients_list(current_user):
     """Get clients list with PAGINATION"""
     try:
         show_all = request.args.get('show_all', 'false').lower() == 'true'
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 500))  # Increased for filter results
+        paging = Pagination([Client.name, Client.id], default_per_page=500)  # Increased for filter results
         region_filter = request.args.get('region', '').strip()
         salesman_filter = request.args.get('salesman', '').strip()
 
@@ -126,58 +79,114 @@ def get_clients_list(current_user):
                 query = query.filter_by(is_active=True)
         
         if region_filter:
-            # Use trimmed comparison for whitespace tolerance
-            query = query.filter(db.func.trim(Client.region) == region_filter)
+            # Keys are trimmed and spelling-folded on write, so this is an index seek
+            query = query.filter(Client.region_key == normalize_text(region_filter))
         if salesman_filter:
-            query = query.filter(db.func.trim(Client.salesman_name) == salesman_filter)
+            query = query.filter(Client.salesman_key == normalize_text(salesman_filter))
+        
+        total_count = paging.count(query, current_user.id)
+        
+        # One round trip: image counts come from a correlated subquery (an index seek
+        # per client on the page) and people and the assigned user are joined in
+        # (the thumbnail BLOB is deferred on the model)
+        image_count = db.select(db.func.count(ClientImage.id)).where(
+            ClientImage.client_id == Client.id
+        ).correlate(Client).scalar_subquery()
+        page_query = query.add_columns(image_count).options(
+            joinedload(Client.owner), joinedload(Client.purchasing_manager),
+            joinedload(Client.accountant), joinedload(Client.assigned_user)
+        )
         
-        total_count = query.count()
-        clients = query.order_by(Client.name, Client.id).offset((page - 1) * per_page).limit(per_page).all()
+        # format=ndjson streams one client per line straight from the database cursor
+        if request.args.get('format') == 'ndjson':
+            rows = paging.iter_split(paging.apply(page_query).yield_per(Config.STREAM_BATCH_SIZE))
+            return ndjson_response(rows, _stream_row(_serialize_client_summary), lambda: paging.meta(total_count))
         
+        rows = paging.split(paging.apply(page_query).all())
         clients_data = []
-        for client in clients:
+        for client, image_count in rows:
             try:
-                owner_data = {'name': client.owner.name, 'phone': client.owner.phone, 'email': client.owner.email} if client.owner else None
-                pm_data = {'name': client.purchasing_manager.name, 'phone': client.purchasing_manager.phone, 'email': client.purchasing_manager.email} if client.purchasing_manager else None
-                acc_data = {'name': client.accountant.name, 'phone': client.accountant.phone, 'email': client.accountant.email} if client.accountant else None
-                
-                clients_data.append({
-                    'id': client.id, 'name': client.name, 'region': client.region,
-                    'location': client.location, 'address': getattr(client, 'address', None),
-                    'salesman_name': client.salesman_name,
-                    'phone': client.owner.phone if client.owner else None,
-                    'has_thumbnail': client.thumbnail is not None,
-                    'image_count': len(client.images) if client.images else 0,
-                    'owner': owner_data, 'purchasing_manager': pm_data, 'accountant': acc_data,
-                    'assigned_user': client.assigned_user.username if client.assigned_user else None,
-                    'created_at': client.created_at.isoformat(), 'is_active': client.is_active
-                })
+                clients_data.append(_serialize_client_summary(client, image_count))
             except Exception as e:
                 print(f"Error processing client {client.id}: {e}")
         
-        return jsonify({'clients': clients_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'clients': clients_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch clients list', 'error': str(e)}), 500
 
+def _serialize_client_summary(client, image_count):
+    """Client fields shown on the list cards"""
+    owner_data = {'name': client.owner.name, 'phone': client.owner.phone, 'email': client.owner.email} if client.owner else None
+    pm_data = {'name': client.purchasing_manager.name, 'phone': client.purchasing_manager.phone, 'email': client.purchasing_manager.email} if client.purchasing_manager else None
+    acc_data = {'name': client.accountant.name, 'phone': client.accountant.phone, 'email': client.accountant.email} if client.accountant else None
+    
+    return {
+        'id': client.id, 'name': client.name, 'region': client.region,
+        'location': client.location, 'address': getattr(client, 'address', None),
+        'salesman_name': client.salesman_name,
+        'phone': client.owner.phone if client.owner else None,
+        'has_thumbnail': client.has_thumbnail,
+        'image_count': image_count,
+        'owner': owner_data, 'purchasing_manager': pm_data, 'accountant': acc_data,
+        'assigned_user': client.assigned_user.username if client.assigned_user else None,
+        'created_at': client.created_at.isoformat(), 'is_active': client.is_active
+    }
+
+def _serialize_client_search_result(client, rank=None):
+    """Client fields returned by the search endpoint (rank: full-text relevance, lower is better)"""
+    return {
+        'id': client.id, 'name': client.name, 'region': client.region, 'location': client.location,
+        'salesman_name': client.salesman_name, 'has_thumbnail': client.has_thumbnail,
+        'is_active': client.is_active, 'rank': rank
+    }
+
+def _stream_row(serialize):
+    """Wrap a serializer for NDJSON streaming of clients"""
+    def serialize_row(row):
+        values = tuple(row) if isinstance(row, Row) else (row,)
+        client = values[0]
+        try:
+            return serialize(*values)
+        except Exception as e:
+            print(f"Error processing client {client.id}: {e}")
+            return None
+        finally:
+            # Release each written client so memory stays flat however many rows are sent
+            db.session.expunge(client)
+    return serialize_row
+
 @client_bp.route('/<int:client_id>', methods=['GET'])
 @token_required
 def get_single_client(current_user, client_id):
     """Get a single client with ALL details"""
     try:
-        client = Client.query.get(client_id)
+        # inline_images=false returns only URLs of the raw image endpoints
+        inline_images = request.args.get('inline_images', 'true').lower() == 'true'
+        query = Client.query
+        if inline_images:
+            query = query.options(undefer(Client.thumbnail), selectinload(Client.images).undefer(ClientImage.image_data))
+        client = query.get(client_id)
         if not client:
             return jsonify({'message': 'Client not found'}), 404
         
         owner_data = {'id': client.owner.id, 'name': client.owner.name, 'phone': client.owner.phone, 'email': client.owner.email} if client.owner else None
         pm_data = {'id': client.purchasing_manager.id, 'name': client.purchasing_manager.name, 'phone': client.purchasing_manager.phone, 'email': client.purchasing_manager.email} if client.purchasing_manager else None
         acc_data = {'id': client.accountant.id, 'name': client.accountant.name, 'phone': client.accountant.phone, 'email': client.accountant.email} if client.accountant else None
-        additional_images = [{'id': img.id, 'filename': img.filename, 'data': base64.b64encode(img.image_data).decode('utf-8')} for img in client.images] if client.images else []
+        additional_images = []
+        for img in (client.images or []):
+            image_data = {'id': img.id, 'filename': img.filename, 'url': f'/api/clients/{client.id}/images/{img.id}/raw'}
+            if inline_images:
+                image_data['data'] = base64.b64encode(img.image_bytes).decode('utf-8')
+            additional_images.append(image_data)
         
         return jsonify({
             'id': client.id, 'name': client.name, 'region': client.region,
             'location': client.location, 'address': getattr(client, 'address', None),
             'salesman_name': client.salesman_name,
-            'thumbnail': base64.b64encode(client.thumbnail).decode('utf-8') if client.thumbnail else None,
+            'thumbnail': base64.b64encode(client.thumbnail_bytes).decode('utf-8') if (client.has_thumbnail and inline_images) else None,
+            'thumbnail_url': f'/api/clients/{client.id}/thumbnail/raw' if client.has_thumbnail else None,
             'images': additional_images, 'image_count': len(additional_images),
             'owner': owner_data, 'purchasing_manager': pm_data, 'accountant': acc_data,
             'assigned_user': client.assigned_user.username if client.assigned_user else None,
@@ -192,14 +201,68 @@ def get_single_client(current_user, client_id):
 def get_client_thumbnail(current_user, client_id):
     """Get ONLY thumbnail for a specific client"""
     try:
-        client = Client.query.get(client_id)
+        client = Client.query.options(undefer(Client.thumbnail)).get(client_id)
         if not client:
             return jsonify({'message': 'Client not found'}), 404
-        thumbnail = base64.b64encode(client.thumbnail).decode('utf-8') if client.thumbnail else None
+        thumbnail = base64.b64encode(client.thumbnail_bytes).decode('utf-8') if client.has_thumbnail else None
         return jsonify({'thumbnail': thumbnail}), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch thumbnail', 'error': str(e)}), 500
 
+@client_bp.route('/<int:client_id>/thumbnail/raw', methods=['GET'])
+@media_token_required
+def get_client_thumbnail_raw(current_user, client_id):
+    """Serve the client thumbnail as raw image bytes (browser-cacheable)"""
+    try:
+        # Clients the user cannot view answer 404 like missing ones
+        client = Client.query.options(undefer(Client.thumbnail)).filter(
+            Client.id == client_id, client_visibility_filter(current_user)
+        ).first()
+        if not client or not client.has_thumbnail:
+            return jsonify({'message': 'Thumbnail not found'}), 404
+        return send_stored_image(client.thumbnail_hash, client.thumbnail)
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch thumbnail', 'error': str(e)}), 500
+
+@client_bp.route('/thumbnails', methods=['GET', 'POST'])
+@token_required
+def get_client_thumbnails_batch(current_user):
+    """Get thumbnails of many clients in one response (binary records, or JSON with format=json)"""
+    try:
+        data = batch_request_data()
+        client_ids = [int(client_id) for client_id in (data.get('ids') or [])]
+        if len(client_ids) > Config.THUMBNAIL_BATCH_LIMIT:
+            return jsonify({'message': f'At most {Config.THUMBNAIL_BATCH_LIMIT} ids per request'}), 400
+        size = str(data.get('size', '128'))
+        if size and size not in RENDITION_SIZES:
+            return jsonify({'message': 'Invalid image size', 'sizes': RENDITION_SIZES}), 400
+        
+        # Permission scoping and thumbnail lookup in a single query
+        rows = db.session.query(Client.id, Client.thumbnail_hash, Client.thumbnail).filter(
+            Client.id.in_(client_ids), client_visibility_filter(current_user),
+            Client.thumbnail_hash.isnot(None) | Client.thumbnail.isnot(None)
+        ).all() if client_ids else []
+        
+        return send_image_batch(rows, size, as_json=data.get('format') == 'json')
+    except (TypeError, ValueError):
+        return jsonify({'message': 'ids must be a list of integers'}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch thumbnails', 'error': str(e)}), 500
+
+@client_bp.route('/<int:client_id>/images/<int:image_id>/raw', methods=['GET'])
+@media_token_required
+def get_client_image_raw(current_user, client_id, image_id):
+    """Serve one additional client image as raw bytes (browser-cacheable)"""
+    try:
+        image = ClientImage.query.options(undefer(ClientImage.image_data)).join(Client).filter(
+            ClientImage.id == image_id, ClientImage.client_id == client_id, client_visibility_filter(current_user)
+        ).first()
+        if not image:
+            return jsonify({'message': 'Image not found'}), 404
+        return send_stored_image(image.image_hash, image.image_data)
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch image', 'error': str(e)}), 500
+
 # ==================== CREATE ROUTE ====================
 
 @client_bp.route('', methods=['POST'])
@@ -219,7 +282,8 @@ def create_client(current_user):
         
         if 'thumbnail' in data and data['thumbnail']:
             try:
-                client.thumbnail = base64.b64decode(data['thumbnail'])
+                client.thumbnail_hash = store_blob(base64.b64decode(data['thumbnail']))
+                client.thumbnail = None
             except:
                 pass
         
@@ -258,7 +322,7 @@ def create_client(current_user):
             for img_data in data['additional_images']:
                 if img_data.get('data'):
                     try:
-                        img = ClientImage(client_id=client.id, image_data=base64.b64decode(img_data['data']), filename=img_data.get('filename', 'image.jpg'))
+                        img = ClientImage(client_id=client.id, image_hash=store_blob(base64.b64decode(img_data['data'])), filename=img_data.get('filename', 'image.jpg'))
                         db.session.add(img)
                     except:
                         pass
@@ -296,7 +360,8 @@ def update_client(current_user, client_id):
         
         if 'thumbnail' in data and data['thumbnail']:
             try:
-                client.thumbnail = base64.b64decode(data['thumbnail'])
+                client.thumbnail_hash = store_blob(base64.b64decode(data['thumbnail']))
+                client.thumbnail = None
             except:
                 pass
         
@@ -420,11 +485,13 @@ def reactivate_client(current_user, client_id):
 @client_bp.route('/search', methods=['GET'])
 @token_required
 def search_clients(current_user):
-    """Search clients by name"""
+    """Search clients by name, region, address or salesman, best matches first"""
     try:
         search_term = request.args.get('q', '').strip()
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 500))  # Increased for filter results
+        hits = client_hits(search_term) if search_term else None
+        # Full-text matches are ordered by relevance, everything else by name
+        sort_columns = [hits.c.rank, Client.id] if hits is not None else [Client.name, Client.id]
+        paging = Pagination(sort_columns, default_per_page=500)  # Increased for filter results
         show_all = request.args.get('show_all', 'false').lower() == 'true'
         region_filter = request.args.get('region', '').strip()
         salesman_filter = request.args.get('salesman', '').strip()
@@ -443,23 +510,31 @@ def search_clients(current_user):
             if not show_all:
                 query = query.filter_by(is_active=True)
         
-        if search_term:
-            query = query.filter(Client.name.ilike(f'%{search_term}%'))
+        # The index lookup runs first; role scope and filters only see its hits
+        if hits is not None:
+            query = query.join(hits, hits.c.id == Client.id).add_columns(hits.c.rank)
+        else:
+            if search_term:
+                # Only punctuation was typed, which the index does not hold
+                query = query.filter(Client.name.ilike(f'%{search_term}%'))
+            query = query.add_columns(db.literal(None, db.Float).label('rank'))
         
         if region_filter:
-            query = query.filter(db.func.trim(Client.region) == region_filter)
+            query = query.filter(Client.region_key == normalize_text(region_filter))
         if salesman_filter:
-            query = query.filter(db.func.trim(Client.salesman_name) == salesman_filter)
+            query = query.filter(Client.salesman_key == normalize_text(salesman_filter))
+        
+        total_count = paging.count(query, current_user.id)
         
-        total_count = query.count()
-        clients = query.order_by(Client.name, Client.id).offset((page - 1) * per_page).limit(per_page).all()
+        if request.args.get('format') == 'ndjson':
+            rows = paging.iter_split(paging.apply(query).yield_per(Config.STREAM_BATCH_SIZE))
+            return ndjson_response(rows, _stream_row(_serialize_client_search_result), lambda: paging.meta(total_count))
         
-        clients_data = [{
-            'id': c.id, 'name': c.name, 'region': c.region, 'location': c.location,
-            'salesman_name': c.salesman_name, 'has_thumbnail': c.thumbnail is not None,
-            'is_active': c.is_active
-        } for c in clients]
+        rows = paging.split(paging.apply(query).all())
+        clients_data = [_serialize_client_search_result(client, rank) for client, rank in rows]
         
-        return jsonify({'clients': clients_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'clients': clients_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to search clients', 'error': str(e)}), 500
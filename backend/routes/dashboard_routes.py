@@ -0,0 +1,58 @@
+# Dashboard Routes Blueprint
+
+from flask import Blueprint, jsonify
+from backend.models import db, Client, Product, User, UserRole, VisitReport
+from backend.config import Config
+from backend.utils.auth import token_required
+from backend.utils.cache import TTLCache
+from backend.utils.permissions import client_visibility_filter, report_visibility_filter
+from backend.utils.snapshots import invalidate_on_commit
+from datetime import date, timedelta
+
+dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
+
+# Stats per role scope; dropped after any committed change that can move a count
+_stats_cache = TTLCache(ttl=Config.DASHBOARD_STATS_CACHE_TTL, max_entries=Config.DASHBOARD_STATS_CACHE_MAX_ENTRIES)
+invalidate_on_commit(_stats_cache, Client, Product, VisitReport, User)
+
+@dashboard_bp.route('/stats', methods=['GET'])
+@token_required
+def get_dashboard_stats(current_user):
+    """Get all dashboard counters for the user's scope in one query"""
+    try:
+        today = date.today()
+        # Admins share one entry; week and month counts roll over with the date
+        scope = 'all' if current_user.role == UserRole.SUPER_ADMIN else current_user.id
+        key = (scope, today)
+        stats = _stats_cache.get(key)
+        if stats is None:
+            stats = _compute_stats(current_user, today)
+            _stats_cache.set(key, stats)
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch dashboard stats', 'error': str(e)}), 500
+
+def _compute_stats(user, today):
+    """Role-scoped counts as scalar subqueries of a single SELECT"""
+    # The week starts on Sunday
+    week_start = today - timedelta(days=(today.weekday() + 1) % 7)
+    month_start = today.replace(day=1)
+    client_scope = client_visibility_filter(user)
+    report_scope = report_visibility_filter(user)
+    active_reports = [report_scope, VisitReport.is_active == True]
+
+    def count(model, *criteria):
+        return db.select(db.func.count(model.id)).where(*criteria).scalar_subquery()
+
+    row = db.session.execute(db.select(
+        count(Client, client_scope, Client.is_active == True).label('total_clients'),
+        count(Client, client_scope, db.or_(Client.is_active == False, Client.is_active.is_(None))).label('inactive_clients'),
+        count(Product).label('total_products'),
+        count(VisitReport, *active_reports).label('total_reports'),
+        count(VisitReport, *active_reports, VisitReport.visit_date >= week_start).label('week_reports'),
+        count(VisitReport, *active_reports, VisitReport.visit_date >= month_start).label('monthly_reports'),
+    )).one()
+
+    stats = dict(row._mapping)
+    stats['active_clients'] = stats['total_clients']
+    return stats
@@ -2,34 +2,74 @@
 
 from flask import Blueprint, request, jsonify
 from backend.models import db, Product, ProductImage, UserRole
-from backend.utils.auth import token_required
+from backend.config import Config
+from backend.utils.auth import token_required, media_token_required
+from backend.utils.images import send_stored_image, send_image_batch, batch_request_data
+from backend.storage.image_pipeline import RENDITION_SIZES
+from backend.models.blob import store_blob
+from backend.utils.pagination import Pagination, InvalidCursor
+from backend.utils.snapshots import SnapshotCache, send_snapshot, invalidate_on_commit
+from backend.rendering.pdf import RenderQueueFull, send_pdf
+from backend.rendering.catalogue import catalogue_pdfs, build_catalogue_html
+from backend.search.fts import product_hits
+from backend.utils.reference_data import product_names
 from sqlalchemy import text
+from sqlalchemy.orm import selectinload, undefer
 import base64
+import json
 
 product_bp = Blueprint('products', __name__, url_prefix='/api/products')
 
+# Serialized public catalogue, rebuilt after any committed product change
+catalogue_snapshot = SnapshotCache('catalogue')
+invalidate_on_commit(catalogue_snapshot, Product)
+
 # ==================== PUBLIC ROUTES (No Auth) ====================
 
 @product_bp.route('/catalogue', methods=['GET'])
 def get_products_for_catalogue():
     """Public endpoint for catalogue - no auth required"""
     try:
-        products = Product.query.order_by(Product.name, Product.id).all()
+        # Served from the pre-serialized, pre-compressed snapshot; the database is
+        # only read again after a product changes
+        return send_snapshot(catalogue_snapshot.get(_build_catalogue))
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
+
+def _build_catalogue():
+    """Serialize the whole catalogue with thumbnails inlined"""
+    products = Product.query.options(undefer(Product.thumbnail)).order_by(Product.name, Product.id).all()
+    
+    products_data = [{
+        'id': p.id, 
+        'name': p.name,
+        'description': p.description or '',
+        'taxed_price_store': float(p.taxed_price_store) if p.taxed_price_store else 0.0,
+        'untaxed_price_store': float(p.untaxed_price_store) if p.untaxed_price_store else 0.0,
+        'taxed_price_client': float(p.taxed_price_client) if p.taxed_price_client else 0.0,
+        'untaxed_price_client': float(p.untaxed_price_client) if p.untaxed_price_client else 0.0,
+        'thumbnail': base64.b64encode(p.thumbnail_bytes).decode('utf-8') if p.has_thumbnail else None
+    } for p in products]
+    
+    return json.dumps({'products': products_data, 'total': len(products_data)}, ensure_ascii=False).encode('utf-8')
+
+@product_bp.route('/catalogue/pdf', methods=['GET'])
+def get_catalogue_pdf():
+    """Public endpoint for the printable catalogue PDF - no auth required"""
+    try:
+        # The snapshot ETag is a hash of the product data, so the PDF is rendered
+        # once per catalogue version and served from disk until a product changes
+        snapshot = catalogue_snapshot.get(_build_catalogue)
         
-        products_data = [{
-            'id': p.id, 
-            'name': p.name,
-            'description': p.description or '',
-            'taxed_price_store': float(p.taxed_price_store) if p.taxed_price_store else 0.0,
-            'untaxed_price_store': float(p.untaxed_price_store) if p.untaxed_price_store else 0.0,
-            'taxed_price_client': float(p.taxed_price_client) if p.taxed_price_client else 0.0,
-            'untaxed_price_client': float(p.untaxed_price_client) if p.untaxed_price_client else 0.0,
-            'thumbnail': base64.b64encode(p.thumbnail).decode('utf-8') if p.thumbnail else None
-        } for p in products]
+        def build_html():
+            catalogue_pdfs.invalidate(keep=snapshot.etag)
+            return build_catalogue_html(json.loads(snapshot.body)['products'])
         
-        return jsonify({'products': products_data, 'total': len(products_data)}), 200
+        return send_pdf(catalogue_pdfs, snapshot.etag, build_html, 'catalogue.pdf', private=False)
+    except RenderQueueFull as e:
+        return jsonify({'message': str(e)}), 503
     except Exception as e:
-        return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
+        return jsonify({'message': 'Failed to generate catalogue PDF', 'error': str(e)}), 500
 
 # ==================== GET ROUTES ====================
 
@@ -38,12 +78,11 @@ def get_products_for_catalogue():
 def get_products_list(current_user):
     """Get products list with PAGINATION"""
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
+        paging = Pagination([Product.name, Product.id])
         
         query = Product.query
-        total_count = query.count()
-        products = query.order_by(Product.name, Product.id).offset((page - 1) * per_page).limit(per_page).all()
+        total_count = paging.count(query, None)
+        rows = paging.split(paging.apply(_with_image_counts(query)).all())
         
         products_data = [{
             'id': p.id, 'name': p.name,
@@ -51,12 +90,14 @@ def get_products_list(current_user):
             'untaxed_price_store': float(p.untaxed_price_store) if p.untaxed_price_store else 0.0,
             'taxed_price_client': float(p.taxed_price_client) if p.taxed_price_client else 0.0,
             'untaxed_price_client': float(p.untaxed_price_client) if p.untaxed_price_client else 0.0,
-            'has_thumbnail': p.thumbnail is not None,
-            'image_count': len(p.images) if p.images else 0,
+            'has_thumbnail': p.has_thumbnail,
+            'image_count': image_count,
             'can_edit': current_user.role == UserRole.SUPER_ADMIN
-        } for p in products]
+        } for p, image_count in rows]
         
-        return jsonify({'products': products_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'products': products_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
 
@@ -65,10 +106,8 @@ def get_products_list(current_user):
 def get_product_names_only(current_user):
     """Get product IDs, names, and prices for dropdowns"""
     try:
-        query = text("SELECT id, name, taxed_price_store, taxed_price_client FROM products ORDER BY name")
-        result = db.session.execute(query).fetchall()
-        products = [{'id': row[0], 'name': row[1], 'internal_price': float(row[2]) if row[2] else 0.0, 'client_price': float(row[3]) if row[3] else 0.0} for row in result]
-        return jsonify(products), 200
+        # Served from the reference data snapshot until a product changes
+        return send_snapshot(product_names(), private=True)
     except Exception as e:
         return jsonify({'message': 'Failed to fetch product names', 'error': str(e)}), 500
 
@@ -77,11 +116,16 @@ def get_product_names_only(current_user):
 def get_single_product(current_user, product_id):
     """Get a single product with ALL details"""
     try:
-        product = Product.query.get(product_id)
+        # inline_images=false returns only URLs of the raw image endpoints
+        inline_images = request.args.get('inline_images', 'true').lower() == 'true'
+        query = Product.query
+        if inline_images:
+            query = query.options(undefer(Product.thumbnail), selectinload(Product.images).undefer(ProductImage.image_data))
+        product = query.get(product_id)
         if not product:
             return jsonify({'message': 'Product not found'}), 404
         
-        additional_images = [{'id': img.id, 'filename': img.filename, 'data': base64.b64encode(img.image_data).decode('utf-8')} for img in product.images] if product.images else []
+        additional_images = _serialize_product_images(product, inline_images)
         
         return jsonify({
             'id': product.id, 'name': product.name,
@@ -90,7 +134,8 @@ def get_single_product(current_user, product_id):
             'untaxed_price_store': float(product.untaxed_price_store) if product.untaxed_price_store else 0.0,
             'taxed_price_client': float(product.taxed_price_client) if product.taxed_price_client else 0.0,
             'untaxed_price_client': float(product.untaxed_price_client) if product.untaxed_price_client else 0.0,
-            'thumbnail': base64.b64encode(product.thumbnail).decode('utf-8') if product.thumbnail else None,
+            'thumbnail': base64.b64encode(product.thumbnail_bytes).decode('utf-8') if (product.has_thumbnail and inline_images) else None,
+            'thumbnail_url': f'/api/products/{product.id}/thumbnail/raw' if product.has_thumbnail else None,
             'images': additional_images, 'image_count': len(additional_images),
             'created_at': product.created_at.isoformat() if product.created_at else None,
             'can_edit': current_user.role == UserRole.SUPER_ADMIN
@@ -103,10 +148,10 @@ def get_single_product(current_user, product_id):
 def get_product_thumbnail(current_user, product_id):
     """Get ONLY thumbnail for a specific product"""
     try:
-        product = Product.query.get(product_id)
+        product = Product.query.options(undefer(Product.thumbnail)).get(product_id)
         if not product:
             return jsonify({'message': 'Product not found'}), 404
-        thumbnail = base64.b64encode(product.thumbnail).decode('utf-8') if product.thumbnail else None
+        thumbnail = base64.b64encode(product.thumbnail_bytes).decode('utf-8') if product.has_thumbnail else None
         return jsonify({'thumbnail': thumbnail}), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch thumbnail', 'error': str(e)}), 500
@@ -116,15 +161,84 @@ def get_product_thumbnail(current_user, product_id):
 def get_product_images(current_user, product_id):
     """Get only images for a specific product - for lazy loading"""
     try:
-        product = Product.query.get(product_id)
+        inline_images = request.args.get('inline_images', 'true').lower() == 'true'
+        query = Product.query
+        if inline_images:
+            query = query.options(selectinload(Product.images).undefer(ProductImage.image_data))
+        product = query.get(product_id)
         if not product:
             return jsonify({'message': 'Product not found'}), 404
         
-        additional_images = [{'id': img.id, 'filename': img.filename, 'data': base64.b64encode(img.image_data).decode('utf-8')} for img in product.images] if product.images else []
+        additional_images = _serialize_product_images(product, inline_images)
         return jsonify({'images': additional_images}), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch product images', 'error': str(e)}), 500
 
+@product_bp.route('/<int:product_id>/thumbnail/raw', methods=['GET'])
+@media_token_required
+def get_product_thumbnail_raw(current_user, product_id):
+    """Serve the product thumbnail as raw image bytes (browser-cacheable)"""
+    try:
+        product = Product.query.options(undefer(Product.thumbnail)).get(product_id)
+        if not product or not product.has_thumbnail:
+            return jsonify({'message': 'Thumbnail not found'}), 404
+        return send_stored_image(product.thumbnail_hash, product.thumbnail)
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch thumbnail', 'error': str(e)}), 500
+
+@product_bp.route('/thumbnails', methods=['GET', 'POST'])
+@token_required
+def get_product_thumbnails_batch(current_user):
+    """Get thumbnails of many products in one response (binary records, or JSON with format=json)"""
+    try:
+        data = batch_request_data()
+        product_ids = [int(product_id) for product_id in (data.get('ids') or [])]
+        if len(product_ids) > Config.THUMBNAIL_BATCH_LIMIT:
+            return jsonify({'message': f'At most {Config.THUMBNAIL_BATCH_LIMIT} ids per request'}), 400
+        size = str(data.get('size', '128'))
+        if size and size not in RENDITION_SIZES:
+            return jsonify({'message': 'Invalid image size', 'sizes': RENDITION_SIZES}), 400
+        
+        rows = db.session.query(Product.id, Product.thumbnail_hash, Product.thumbnail).filter(
+            Product.id.in_(product_ids),
+            Product.thumbnail_hash.isnot(None) | Product.thumbnail.isnot(None)
+        ).all() if product_ids else []
+        
+        return send_image_batch(rows, size, as_json=data.get('format') == 'json')
+    except (TypeError, ValueError):
+        return jsonify({'message': 'ids must be a list of integers'}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch thumbnails', 'error': str(e)}), 500
+
+@product_bp.route('/<int:product_id>/images/<int:image_id>/raw', methods=['GET'])
+@media_token_required
+def get_product_image_raw(current_user, product_id, image_id):
+    """Serve one additional product image as raw bytes (browser-cacheable)"""
+    try:
+        image = ProductImage.query.options(undefer(ProductImage.image_data)).get(image_id)
+        if not image or image.product_id != product_id:
+            return jsonify({'message': 'Image not found'}), 404
+        return send_stored_image(image.image_hash, image.image_data)
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch image', 'error': str(e)}), 500
+
+def _with_image_counts(query):
+    """Add each product's image count from a correlated subquery instead of loading its images"""
+    image_count = db.select(db.func.count(ProductImage.id)).where(
+        ProductImage.product_id == Product.id
+    ).correlate(Product).scalar_subquery()
+    return query.add_columns(image_count)
+
+def _serialize_product_images(product, inline_images):
+    """Build the image list of a product, with base64 data only when inline"""
+    images = []
+    for img in (product.images or []):
+        image_data = {'id': img.id, 'filename': img.filename, 'url': f'/api/products/{product.id}/images/{img.id}/raw'}
+        if inline_images:
+            image_data['data'] = base64.b64encode(img.image_bytes).decode('utf-8')
+        images.append(image_data)
+    return images
+
 # ==================== CREATE ROUTE ====================
 
 @product_bp.route('', methods=['POST'])
@@ -149,7 +263,8 @@ def create_product(current_user):
         
         if 'thumbnail' in data and data['thumbnail']:
             try:
-                product.thumbnail = base64.b64decode(data['thumbnail'])
+                product.thumbnail_hash = store_blob(base64.b64decode(data['thumbnail']))
+                product.thumbnail = None
             except:
                 pass
         
@@ -161,7 +276,7 @@ def create_product(current_user):
             for img_data in data['additional_images']:
                 if img_data.get('data'):
                     try:
-                        img = ProductImage(product_id=product.id, image_data=base64.b64decode(img_data['data']), filename=img_data.get('filename', 'image.jpg'))
+                        img = ProductImage(product_id=product.id, image_hash=store_blob(base64.b64decode(img_data['data'])), filename=img_data.get('filename', 'image.jpg'))
                         db.session.add(img)
                     except:
                         pass
@@ -197,7 +312,8 @@ def update_product(current_user, product_id):
         
         if 'thumbnail' in data and data['thumbnail']:
             try:
-                product.thumbnail = base64.b64decode(data['thumbnail'])
+                product.thumbnail_hash = store_blob(base64.b64decode(data['thumbnail']))
+                product.thumbnail = None
             except:
                 pass
         
@@ -206,7 +322,7 @@ def update_product(current_user, product_id):
             for img_data in data['additional_images']:
                 if img_data.get('data'):
                     try:
-                        img = ProductImage(product_id=product.id, image_data=base64.b64decode(img_data['data']), filename=img_data.get('filename', 'image.jpg'))
+                        img = ProductImage(product_id=product.id, image_hash=store_blob(base64.b64decode(img_data['data'])), filename=img_data.get('filename', 'image.jpg'))
                         db.session.add(img)
                     except:
                         pass
@@ -247,28 +363,37 @@ def delete_product(current_user, product_id):
 @product_bp.route('/search', methods=['GET'])
 @token_required
 def search_products(current_user):
-    """Search products by name"""
+    """Search products by name, best matches first"""
     try:
         search_term = request.args.get('q', '').strip()
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
+        hits = product_hits(search_term) if search_term else None
+        # Full-text matches are ordered by relevance, everything else by name
+        paging = Pagination([hits.c.rank, Product.id] if hits is not None else [Product.name, Product.id])
         
         query = Product.query
-        if search_term:
-            query = query.filter(Product.name.ilike(f'%{search_term}%'))
+        if hits is not None:
+            query = query.join(hits, hits.c.id == Product.id)
+            rank_column = hits.c.rank
+        else:
+            if search_term:
+                # Only punctuation was typed, which the index does not hold
+                query = query.filter(Product.name.ilike(f'%{search_term}%'))
+            rank_column = db.literal(None, db.Float).label('rank')
         
-        total_count = query.count()
-        products = query.order_by(Product.name).offset((page - 1) * per_page).limit(per_page).all()
+        total_count = paging.count(query, None)
+        rows = paging.split(paging.apply(_with_image_counts(query).add_columns(rank_column)).all())
         
         products_data = [{
             'id': p.id, 'name': p.name,
             'taxed_price_store': float(p.taxed_price_store) if p.taxed_price_store else 0.0,
             'taxed_price_client': float(p.taxed_price_client) if p.taxed_price_client else 0.0,
-            'has_thumbnail': p.thumbnail is not None,
-            'image_count': len(p.images) if p.images else 0
-        } for p in products]
+            'has_thumbnail': p.has_thumbnail,
+            'image_count': image_count, 'rank': rank
+        } for p, image_count, rank in rows]
         
-        return jsonify({'products': products_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'products': products_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to search products', 'error': str(e)}), 500
 
@@ -2,12 +2,41 @@
 
 from flask import Blueprint, request, jsonify
 from backend.models import db, VisitReport, VisitReportImage, VisitReportNote, VisitReportProduct, Client, Product, User, UserRole
-from backend.utils.auth import token_required
+from backend.models.blob import store_blob
+from backend.utils.auth import token_required, media_token_required, get_user_from_token
+from backend.utils.images import send_stored_image, detect_image_mimetype
+from backend.storage.blob_store import blob_path
+from backend.storage.image_pipeline import RENDITION_SIZES
+from backend.utils.pagination import Pagination, InvalidCursor
+from backend.utils.progress import ProgressStore, is_valid_job_id
+from backend.utils.streaming import zip_response
+from backend.rendering.pdf import RenderQueueFull, send_pdf, submit, render_to_file
+from backend.rendering.report import report_pdfs, build_report_pdf_html, report_pdf_key, inline_local_images
+from backend.rendering.templates import get_report_template
+from backend.search.fts import report_hits
+from backend.search.normalize import normalize_text
+from backend.utils.settings import get_float_setting
+from backend.utils.snapshots import send_snapshot
+from backend.utils.reference_data import form_bootstrap, form_bootstrap_version
+from backend.config import Config
+from concurrent.futures import FIRST_COMPLETED, as_completed, wait
+from sqlalchemy.orm import joinedload, selectinload, undefer
 from datetime import datetime
 import base64
+import json
+import pathlib
+import re
+import threading
+import uuid
 
 report_bp = Blueprint('reports', __name__, url_prefix='/api/visit-reports')
 
+# Progress of bulk exports, polled while the ZIP downloads (from any worker)
+_export_progress = ProgressStore('exports', ttl=Config.EXPORT_PROGRESS_TTL)
+
+# Exports streaming in this process; each keeps up to EXPORT_MAX_IN_FLIGHT renders queued
+_export_slots = threading.BoundedSemaphore(Config.EXPORT_MAX_CONCURRENT)
+
 # ==================== GET ROUTES ====================
 
 @report_bp.route('/list', methods=['GET'])
@@ -16,27 +45,27 @@ def get_reports_list(current_user):
     """Get visit reports list with PAGINATION"""
     try:
         show_all = request.args.get('show_all', 'false').lower() == 'true'
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 15))
-        
-        if current_user.role == UserRole.SUPER_ADMIN:
-            query = VisitReport.query if show_all else VisitReport.query.filter_by(is_active=True)
-        elif current_user.role == UserRole.SALES_SUPERVISOR:
-            salesmen = User.query.filter_by(supervisor_id=current_user.id, role=UserRole.SALESMAN).all()
-            salesman_ids = [s.id for s in salesmen] + [current_user.id]
-            query = VisitReport.query.filter(VisitReport.user_id.in_(salesman_ids))
-            if not show_all:
-                query = query.filter(VisitReport.is_active == True)
-        else:
-            query = VisitReport.query.filter_by(user_id=current_user.id)
-            if not show_all:
-                query = query.filter_by(is_active=True)
-        
-        total_count = query.count()
-        reports = query.order_by(VisitReport.created_at.desc(), VisitReport.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        paging = Pagination([VisitReport.created_at, VisitReport.id], descending=True, default_per_page=15)
+        
+        query = _visible_reports(current_user, show_all)
+        total_count = paging.count(query, current_user.id)
+        
+        # Fixed number of queries per page: client and user are joined in, notes and
+        # products (with their product) are loaded in one batch each, and image
+        # counts come from a correlated subquery (an index seek per report on the
+        # page) instead of loading the images
+        image_count = db.select(db.func.count(VisitReportImage.id)).where(
+            VisitReportImage.visit_report_id == VisitReport.id
+        ).correlate(VisitReport).scalar_subquery()
+        page_query = query.add_columns(image_count).options(
+            joinedload(VisitReport.client), joinedload(VisitReport.user),
+            selectinload(VisitReport.notes),
+            selectinload(VisitReport.products).joinedload(VisitReportProduct.product)
+        )
+        rows = paging.split(paging.apply(page_query).all())
         
         reports_data = []
-        for report in reports:
+        for report, image_count in rows:
             try:
                 notes = [{'id': n.id, 'note_text': n.note_text, 'created_at': n.created_at.isoformat()} for n in report.notes] if report.notes else []
                 products = []
@@ -60,34 +89,48 @@ def get_reports_list(current_user):
                     'visit_date': report.visit_date.isoformat(), 'created_at': report.created_at.isoformat(),
                     'notes': notes, 'products': products,
                     'can_edit': current_user.role == UserRole.SUPER_ADMIN or report.user_id == current_user.id,
-                    'is_active': report.is_active, 'image_count': len(report.images) if report.images else 0
+                    'is_active': report.is_active, 'image_count': image_count
                 })
             except Exception as e:
                 print(f"Error processing report {report.id}: {e}")
         
-        return jsonify({'reports': reports_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'reports': reports_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to fetch reports', 'error': str(e)}), 500
 
+def _visible_reports(current_user, show_all=False):
+    """Reports the user may list: all for admins, the team's for supervisors, otherwise their own"""
+    if current_user.role == UserRole.SUPER_ADMIN:
+        query = VisitReport.query if show_all else VisitReport.query.filter_by(is_active=True)
+    elif current_user.role == UserRole.SALES_SUPERVISOR:
+        salesmen = User.query.filter_by(supervisor_id=current_user.id, role=UserRole.SALESMAN).all()
+        salesman_ids = [s.id for s in salesmen] + [current_user.id]
+        query = VisitReport.query.filter(VisitReport.user_id.in_(salesman_ids))
+        if not show_all:
+            query = query.filter(VisitReport.is_active == True)
+    else:
+        query = VisitReport.query.filter_by(user_id=current_user.id)
+        if not show_all:
+            query = query.filter_by(is_active=True)
+    return query
+
 @report_bp.route('/<int:report_id>', methods=['GET'])
 @token_required
 def get_single_report(current_user, report_id):
     """Get a single visit report with ALL details"""
     try:
-        report = VisitReport.query.get(report_id)
+        inline_images = request.args.get('inline_images', 'true').lower() == 'true'
+        report = _report_query(inline_images).get(report_id)
         if not report:
             return jsonify({'message': 'Report not found'}), 404
         
         # Permission check
-        allowed = current_user.role == UserRole.SUPER_ADMIN or report.user_id == current_user.id
-        if not allowed and current_user.role == UserRole.SALES_SUPERVISOR:
-            creator = User.query.get(report.user_id)
-            if creator and creator.supervisor_id == current_user.id:
-                allowed = True
-        if not allowed:
+        if not _can_view_report(current_user, report):
             return jsonify({'message': 'Permission denied'}), 403
         
-        images = [{'id': img.id, 'filename': img.filename, 'data': base64.b64encode(img.image_data).decode('utf-8'), 'is_suggested_products': getattr(img, 'is_suggested_products', False)} for img in (report.images or [])]
+        images = _serialize_report_images(report, inline_images)
         notes = [{'id': n.id, 'note_text': n.note_text} for n in (report.notes or [])]
         products = [{'id': p.id, 'product_id': p.product_id, 'product_name': p.product.name if p.product else 'Unknown', 'displayed_price': float(p.displayed_price) if p.displayed_price else None} for p in (report.products or [])]
         
@@ -105,22 +148,61 @@ def get_single_report(current_user, report_id):
 def get_report_images(current_user, report_id):
     """Get only images for a specific visit report"""
     try:
-        report = VisitReport.query.get(report_id)
+        inline_images = request.args.get('inline_images', 'true').lower() == 'true'
+        report = _report_query(inline_images).get(report_id)
         if not report:
             return jsonify({'message': 'Report not found'}), 404
         
-        images = [{'id': img.id, 'filename': img.filename, 'data': base64.b64encode(img.image_data).decode('utf-8'), 'is_suggested_products': getattr(img, 'is_suggested_products', False)} for img in (report.images or [])]
+        images = _serialize_report_images(report, inline_images)
         return jsonify({'images': images}), 200
     except Exception as e:
         return jsonify({'message': 'Failed to fetch images', 'error': str(e)}), 500
 
+@report_bp.route('/<int:report_id>/images/<int:image_id>/raw', methods=['GET'])
+@media_token_required
+def get_report_image_raw(current_user, report_id, image_id):
+    """Serve one visit report image as raw bytes (browser-cacheable)"""
+    try:
+        image = VisitReportImage.query.options(undefer(VisitReportImage.image_data)).get(image_id)
+        if not image or image.visit_report_id != report_id:
+            return jsonify({'message': 'Image not found'}), 404
+        
+        if not _can_view_report(current_user, image.visit_report):
+            return jsonify({'message': 'Permission denied'}), 403
+        
+        return send_stored_image(image.image_hash, image.image_data)
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch image', 'error': str(e)}), 500
+
+def _can_view_report(current_user, report):
+    """Admins, the report creator and the creator's supervisor may view a report"""
+    if current_user.role == UserRole.SUPER_ADMIN or report.user_id == current_user.id:
+        return True
+    if current_user.role == UserRole.SALES_SUPERVISOR:
+        creator = User.query.get(report.user_id)
+        return bool(creator and creator.supervisor_id == current_user.id)
+    return False
+
+def _report_query(inline_images):
+    """Report query that loads the legacy image BLOBs only when they are returned inline"""
+    if inline_images:
+        return VisitReport.query.options(selectinload(VisitReport.images).undefer(VisitReportImage.image_data))
+    return VisitReport.query
+
+def _serialize_report_images(report, inline_images):
+    """Build the image list of a report, with base64 data only when inline"""
+    images = []
+    for img in (report.images or []):
+        image_data = {'id': img.id, 'filename': img.filename, 'url': f'/api/visit-reports/{report.id}/images/{img.id}/raw',
+                      'is_suggested_products': getattr(img, 'is_suggested_products', False)}
+        if inline_images:
+            image_data['data'] = base64.b64encode(img.image_bytes).decode('utf-8')
+        images.append(image_data)
+    return images
+
 @report_bp.route('/<int:report_id>/html', methods=['GET'])
 def get_report_html(report_id):
     """Get report as HTML for print preview (token via query param)"""
-    import jwt
-    import json
-    from flask import current_app
-    
     try:
         # Get token from query parameter since this is opened in a new window
         token = request.args.get('token')
@@ -129,15 +211,18 @@ def get_report_html(report_id):
         
         # Verify token
         try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            current_user = get_user_from_token(token)
             if not current_user:
                 return "Unauthorized - Invalid token", 401
         except Exception as e:
             print(f"Token decode error: {e}")
             return "Unauthorized - Invalid token", 401
         
-        report = VisitReport.query.get(report_id)
+        image_size = request.args.get('image_size', Config.REPORT_IMAGE_SIZE)
+        if image_size not in RENDITION_SIZES:
+            return "Invalid image size", 400
+        
+        report = _report_query(inline_images=False).get(report_id)
         if not report:
             return "Report not found", 404
         
@@ -153,84 +238,305 @@ def get_report_html(report_id):
         else:
             return "Permission denied", 403
         
-        # Choose template based on report creator's role
-        report_creator = User.query.get(report.user_id)
-        if report_creator and report_creator.role == UserRole.SALESMAN:
-            template_file = 'templates/visit_report_salesman.html'
-        else:
-            template_file = 'templates/visit_report.html'
-        
         try:
-            with open(template_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            template = get_report_template(_report_template_file(report))
         except FileNotFoundError:
             # Fallback to simple HTML if template not found
             return generate_simple_html(report), 200, {'Content-Type': 'text/html; charset=utf-8'}
         
-        # Load price tolerance from settings
-        try:
-            with open('sys_settings.json', 'r', encoding='utf-8') as f:
-                settings = json.load(f)
-                price_tolerance = float(settings.get('price_tolerance', {}).get('value', 1.0))
-        except:
-            price_tolerance = 1.0
-        
-        # Prepare report data
-        report_data = {
-            'client_name': report.client.name if report.client else 'غير محدد',
-            'client_address': report.client.address if (report.client and hasattr(report.client, 'address') and report.client.address) else '-',
-            'client_phone': report.client.owner.phone if (report.client and report.client.owner and report.client.owner.phone) else '-',
-            'visit_date': report.visit_date.strftime('%Y/%m/%d'),
-            'salesman_name': report.user.username if report.user else 'غير محدد',
-            'notes': '\\n'.join([note.note_text for note in report.notes]) if report.notes else '',
-            'images': [],
-            'products': [],
-            'price_tolerance': price_tolerance
-        }
-        
-        # Add images
-        for img in (report.images or []):
-            if img.image_data:
-                report_data['images'].append({
-                    'data': base64.b64encode(img.image_data).decode('utf-8'),
-                    'is_suggested_products': getattr(img, 'is_suggested_products', False)
-                })
+        # Images are referenced by URL (same token as the page) so the document stays
+        # small and the browser fetches them in parallel and from its cache
+        report_data = _build_report_data(report, inline_images=False)
+        for image in report_data['images']:
+            image['src'] = f"{image['url']}?size={image_size}&token={token}"
         
-        # Add products
-        for rp in (report.products or []):
-            our_price_value = float(rp.product.taxed_price_store) if rp.product and rp.product.taxed_price_store else None
-            displayed_price_value = float(rp.displayed_price) if rp.displayed_price else None
-            
-            report_data['products'].append({
-                'name': rp.product.name if rp.product else 'منتج غير محدد',
-                'our_price': f"{our_price_value:.2f} ريال" if our_price_value is not None else 'غير محدد',
-                'our_price_raw': our_price_value,
-                'displayed_price': f"{displayed_price_value:.2f} ريال" if displayed_price_value is not None else 'غير محدد',
-                'displayed_price_raw': displayed_price_value,
-                'nearly_expired': getattr(rp, 'expired_or_nearly_expired', False),
-                'expiry_date': rp.expiry_date.strftime('%Y/%m/%d') if rp.expiry_date else '',
-                'units_count': getattr(rp, 'units_count', None)
-            })
-        
-        # Inject data script
-        data_script = f"""
-        <script>
-            window.addEventListener('DOMContentLoaded', function() {{
-                const reportData = {json.dumps(report_data, ensure_ascii=False)};
-                if (typeof populateReport === 'function') {{
-                    populateReport(reportData);
-                }}
-            }});
-        </script>
-        """
-        
-        html_content = html_content.replace('</body>', data_script + '</body>')
+        # The template is loaded and split once; rendering is the data JSON plus a join
+        html_content = template.render(report_data)
         return html_content, 200, {'Content-Type': 'text/html; charset=utf-8'}
         
     except Exception as e:
         print(f"Error serving HTML report: {e}")
         return f"Error loading report: {str(e)}", 500
 
+@report_bp.route('/<int:report_id>/pdf', methods=['GET'])
+@media_token_required
+def get_report_pdf(current_user, report_id):
+    """Get report as a PDF rendered on the server (token via header or query param)"""
+    try:
+        report = _report_query(inline_images=False).get(report_id)
+        if not report:
+            return jsonify({'message': 'Report not found'}), 404
+        
+        if not _can_view_report(current_user, report):
+            return jsonify({'message': 'Permission denied'}), 403
+        
+        key, html = _build_report_pdf(report)
+        
+        def build_html():
+            # Only the newest version of a report is kept on disk
+            report_pdfs.invalidate(prefix=f'{report.id}-', keep=key)
+            return html
+        
+        return send_pdf(report_pdfs, key, build_html, f'visit_report_{report.id}.pdf')
+    except RenderQueueFull as e:
+        return jsonify({'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'message': 'Failed to generate report PDF', 'error': str(e)}), 500
+
+# ==================== BULK EXPORT ====================
+
+@report_bp.route('/export', methods=['GET'])
+@media_token_required
+def export_reports(current_user):
+    """Export filtered reports as a ZIP of PDF or HTML files, streamed as they are rendered.
+    
+    Filters: date_from, date_to (YYYY-MM-DD), salesman_id, client_id, region.
+    Progress is available at /export/<export_id>/progress; the id is taken from
+    ?export_id= or generated and returned in the X-Export-Id header.
+    """
+    try:
+        export_format = request.args.get('format', 'pdf').lower()
+        if export_format not in ('pdf', 'html'):
+            return jsonify({'message': 'Format must be pdf or html'}), 400
+        export_id = request.args.get('export_id') or uuid.uuid4().hex
+        if not is_valid_job_id(export_id):
+            return jsonify({'message': 'Export id may only contain letters, digits, - and _ (at most 64)'}), 400
+        existing = _export_progress.get(export_id)
+        if existing and existing['user_id'] != current_user.id:
+            return jsonify({'message': 'Export id is already in use'}), 409
+        
+        query = _visible_reports(current_user)
+        if request.args.get('date_from'):
+            query = query.filter(VisitReport.visit_date >= datetime.strptime(request.args['date_from'], '%Y-%m-%d').date())
+        if request.args.get('date_to'):
+            query = query.filter(VisitReport.visit_date <= datetime.strptime(request.args['date_to'], '%Y-%m-%d').date())
+        if request.args.get('salesman_id'):
+            query = query.filter(VisitReport.user_id == int(request.args['salesman_id']))
+        if request.args.get('client_id'):
+            query = query.filter(VisitReport.client_id == int(request.args['client_id']))
+        if request.args.get('region'):
+            query = query.filter(VisitReport.client.has(Client.region_key == normalize_text(request.args['region'])))
+        
+        report_ids = [row.id for row in query.with_entities(VisitReport.id).order_by(VisitReport.visit_date, VisitReport.id)]
+        if not report_ids:
+            return jsonify({'message': 'No reports match the filter'}), 404
+        if len(report_ids) > Config.EXPORT_MAX_REPORTS:
+            return jsonify({'message': f'Too many reports ({len(report_ids)}), narrow the filter to at most {Config.EXPORT_MAX_REPORTS}'}), 400
+        
+        if not _export_slots.acquire(blocking=False):
+            response = jsonify({'message': 'Too many exports are running, try again shortly'})
+            response.status_code = 429
+            response.headers['Retry-After'] = '30'
+            return response
+        release_slot = _once(_export_slots.release)
+        try:
+            _export_progress.purge()
+            progress = {'user_id': current_user.id, 'status': 'running', 'format': export_format,
+                        'total': len(report_ids), 'done': 0, 'failed': []}
+            _export_progress.set(export_id, progress)
+            
+            entries = _export_entries(report_ids, export_format, export_id, progress, release_slot)
+            response = zip_response(entries, f'visit_reports_{export_id[:8]}.zip')
+            response.headers['X-Export-Id'] = export_id
+            # The generator frees the slot when it ends; closing the response
+            # covers a download that is dropped before the generator starts
+            response.call_on_close(release_slot)
+            return response
+        except BaseException:
+            release_slot()
+            raise
+    except ValueError as e:
+        return jsonify({'message': 'Invalid filter', 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'message': 'Failed to export reports', 'error': str(e)}), 500
+
+@report_bp.route('/export/<export_id>/progress', methods=['GET'])
+@token_required
+def get_export_progress(current_user, export_id):
+    """Get the progress of a running or recently finished export"""
+    progress = _export_progress.get(export_id)
+    if not progress or progress['user_id'] != current_user.id:
+        return jsonify({'message': 'Export not found'}), 404
+    return jsonify({'export_id': export_id, **progress}), 200
+
+def _once(fn):
+    """Wrap fn so that only the first call runs it"""
+    lock = threading.Lock()
+    called = []
+    
+    def call_once():
+        with lock:
+            if called:
+                return
+            called.append(True)
+        fn()
+    return call_once
+
+def _export_entries(report_ids, export_format, export_id, progress, release_slot):
+    """Yield (filename, bytes) for each report, rendered in the worker pool.
+    
+    At most EXPORT_MAX_IN_FLIGHT documents are rendering at once and entries are
+    yielded in completion order. PDFs already in the report cache are reused and
+    new ones are added to it. progress is saved under export_id as it changes,
+    and release_slot() is called when the export ends either way.
+    """
+    pending = {}
+    
+    def report_done():
+        progress['done'] += 1
+        _export_progress.set(export_id, progress)
+    
+    def finish(future):
+        name, report_id = pending.pop(future)
+        try:
+            result = future.result()
+            if export_format == 'pdf':
+                with open(result, 'rb') as f:
+                    data = f.read()
+            else:
+                data = result.encode('utf-8')
+            report_done()
+            return name, data
+        except Exception as e:
+            print(f"Error exporting report {report_id}: {e}")
+            progress['failed'].append({'report_id': report_id, 'error': str(e)})
+            _export_progress.set(export_id, progress)
+            return None
+    
+    try:
+        for start in range(0, len(report_ids), Config.STREAM_BATCH_SIZE):
+            batch = _report_query(inline_images=False).options(
+                joinedload(VisitReport.client), joinedload(VisitReport.user),
+                selectinload(VisitReport.notes), selectinload(VisitReport.images),
+                selectinload(VisitReport.products).joinedload(VisitReportProduct.product)
+            ).filter(VisitReport.id.in_(report_ids[start:start + Config.STREAM_BATCH_SIZE])).order_by(VisitReport.visit_date, VisitReport.id).all()
+            
+            for report in batch:
+                client_name = re.sub(r'[\\/:*?"<>|]+', '_', report.client.name if report.client else 'client')
+                name = f'{report.visit_date.isoformat()}_{report.id}_{client_name}.{export_format}'
+                key, html = _build_report_pdf(report)
+                
+                if export_format == 'pdf':
+                    cached = report_pdfs.get(key)
+                    if cached:
+                        with open(cached, 'rb') as f:
+                            data = f.read()
+                        report_done()
+                        yield name, data
+                        continue
+                    future = submit(render_to_file, html, report_pdfs.path(key))
+                else:
+                    future = submit(inline_local_images, html)
+                pending[future] = (name, report.id)
+                
+                if len(pending) >= Config.EXPORT_MAX_IN_FLIGHT:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        entry = finish(future)
+                        if entry:
+                            yield entry
+            # Only this batch leaves the request session (its images, notes and
+            # products cascade); anything else the request loaded stays attached
+            for report in batch:
+                db.session.expunge(report)
+        
+        for future in as_completed(list(pending)):
+            entry = finish(future)
+            if entry:
+                yield entry
+        
+        if progress['failed']:
+            lines = [f"{item['report_id']}: {item['error']}" for item in progress['failed']]
+            yield 'errors.txt', '\n'.join(lines).encode('utf-8')
+        progress['status'] = 'completed'
+        _export_progress.set(export_id, progress)
+    except BaseException:
+        # Includes the client disconnecting (GeneratorExit)
+        progress['status'] = 'failed'
+        _export_progress.set(export_id, progress)
+        for future in pending:
+            future.cancel()
+        raise
+    finally:
+        release_slot()
+
+def _build_report_pdf(report):
+    """Return (cache key, filled HTML) of a report's PDF document.
+    
+    Blob-store images are referenced as local files that the render worker reads
+    itself; images still in the legacy BLOB column are inlined.
+    """
+    template_html = get_report_template(_report_template_file(report)).source
+    
+    images = {img.id: img for img in (report.images or [])}
+    
+    def image_src(image):
+        img = images[image['id']]
+        if img.image_hash:
+            return pathlib.Path(blob_path(img.image_hash)).as_uri()
+        return f"data:{detect_image_mimetype(img.image_data)};base64,{base64.b64encode(img.image_data).decode('utf-8')}"
+    
+    html = build_report_pdf_html(template_html, _build_report_data(report, inline_images=False), image_src)
+    return report_pdf_key(report.id, html), html
+
+def _report_template_file(report):
+    """Choose the template based on the report creator's role"""
+    report_creator = User.query.get(report.user_id)
+    if report_creator and report_creator.role == UserRole.SALESMAN:
+        return 'templates/visit_report_salesman.html'
+    return 'templates/visit_report.html'
+
+def _build_report_data(report, inline_images=True):
+    """Data consumed by populateReport() in the report templates.
+    
+    Images carry their raw URL, plus base64 data when inline.
+    """
+    # Price tolerance from the in-memory settings service
+    price_tolerance = get_float_setting('price_tolerance', 1.0)
+    
+    # Prepare report data
+    report_data = {
+        'client_name': report.client.name if report.client else 'غير محدد',
+        'client_address': report.client.address if (report.client and hasattr(report.client, 'address') and report.client.address) else '-',
+        'client_phone': report.client.owner.phone if (report.client and report.client.owner and report.client.owner.phone) else '-',
+        'visit_date': report.visit_date.strftime('%Y/%m/%d'),
+        'salesman_name': report.user.username if report.user else 'غير محدد',
+        'notes': '\\n'.join([note.note_text for note in report.notes]) if report.notes else '',
+        'images': [],
+        'products': [],
+        'price_tolerance': price_tolerance
+    }
+    
+    # Add images
+    for img in (report.images or []):
+        if img.image_hash or img.image_data:
+            image = {
+                'id': img.id,
+                'url': f'/api/visit-reports/{report.id}/images/{img.id}/raw',
+                'is_suggested_products': getattr(img, 'is_suggested_products', False)
+            }
+            if inline_images:
+                image['data'] = base64.b64encode(img.image_bytes).decode('utf-8')
+            report_data['images'].append(image)
+    
+    # Add products
+    for rp in (report.products or []):
+        our_price_value = float(rp.product.taxed_price_store) if rp.product and rp.product.taxed_price_store else None
+        displayed_price_value = float(rp.displayed_price) if rp.displayed_price else None
+        
+        report_data['products'].append({
+            'name': rp.product.name if rp.product else 'منتج غير محدد',
+            'our_price': f"{our_price_value:.2f} ريال" if our_price_value is not None else 'غير محدد',
+            'our_price_raw': our_price_value,
+            'displayed_price': f"{displayed_price_value:.2f} ريال" if displayed_price_value is not None else 'غير محدد',
+            'displayed_price_raw': displayed_price_value,
+            'nearly_expired': getattr(rp, 'expired_or_nearly_expired', False),
+            'expiry_date': rp.expiry_date.strftime('%Y/%m/%d') if rp.expiry_date else '',
+            'units_count': getattr(rp, 'units_count', None)
+        })
+    
+    return report_data
+
 def generate_simple_html(report):
     """Generate simple HTML when template is not available"""
     html = f"""<!DOCTYPE html><html><head><meta charset="utf-8"><title>تقرير الزيارة</title>
@@ -282,19 +588,25 @@ def create_report(current_user):
             visit_date=datetime.strptime(data['visit_date'], '%Y-%m-%d').date()
         )
         
-        db.session.add(report)
-        db.session.flush()
-        
-        # Handle images
+        # Store the image files before the first insert, so the database write
+        # lock is held only for the inserts and not while images are decoded
+        stored_images = []
         for img_data in (data.get('images') or []):
             if img_data.get('data'):
                 try:
-                    img = VisitReportImage(visit_report_id=report.id, image_data=base64.b64decode(img_data['data']),
-                        filename=img_data.get('filename', 'image.jpg'), is_suggested_products=img_data.get('is_suggested_products', False))
-                    db.session.add(img)
+                    stored_images.append((store_blob(base64.b64decode(img_data['data'])), img_data))
                 except:
                     pass
         
+        db.session.add(report)
+        db.session.flush()
+        
+        # Handle images
+        for image_hash, img_data in stored_images:
+            img = VisitReportImage(visit_report_id=report.id, image_hash=image_hash,
+                filename=img_data.get('filename', 'image.jpg'), is_suggested_products=img_data.get('is_suggested_products', False))
+            db.session.add(img)
+        
         # Handle notes
         for note_text in (data.get('notes') or []):
             if note_text and note_text.strip():
@@ -342,7 +654,7 @@ def update_report(current_user, report_id):
         for img_data in (data.get('images') or []):
             if img_data.get('data') and not img_data.get('id'):
                 try:
-                    img = VisitReportImage(visit_report_id=report.id, image_data=base64.b64decode(img_data['data']),
+                    img = VisitReportImage(visit_report_id=report.id, image_hash=store_blob(base64.b64decode(img_data['data'])),
                         filename=img_data.get('filename', 'image.jpg'))
                     db.session.add(img)
                 except:
@@ -355,6 +667,8 @@ def update_report(current_user, report_id):
                 db.session.add(note)
         
         db.session.commit()
+        # The next PDF request renders the updated report
+        report_pdfs.invalidate(prefix=f'{report_id}-')
         return jsonify({'message': 'Report updated successfully'}), 200
     except Exception as e:
         db.session.rollback()
@@ -400,16 +714,39 @@ def reactivate_report(current_user, report_id):
         db.session.rollback()
         return jsonify({'message': 'Failed to reactivate report', 'error': str(e)}), 500
 
+# ==================== FORM ROUTES ====================
+
+@report_bp.route('/form-bootstrap', methods=['GET'])
+@token_required
+def get_form_bootstrap(current_user):
+    """Get everything the new report form needs in one payload.
+    
+    Client and product lists, predefined notes and the price tolerance come with
+    a version; ?since_version=<version the client holds> answers with only
+    {'version': ..., 'not_modified': true} when nothing changed since.
+    """
+    try:
+        version = form_bootstrap_version(current_user)
+        if request.args.get('since_version') == version:
+            return jsonify({'version': version, 'not_modified': True}), 200
+        return send_snapshot(form_bootstrap(current_user, version), private=True)
+    except Exception as e:
+        return jsonify({'message': 'Failed to load report form data', 'error': str(e)}), 500
+
 # ==================== SEARCH ROUTE ====================
 
 @report_bp.route('/search', methods=['GET'])
 @token_required
 def search_reports(current_user):
-    """Search reports by client name"""
+    """Search reports by client name or note text, best matches first"""
     try:
         search_term = request.args.get('q', '').strip()
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 15))
+        hits = report_hits(search_term) if search_term else None
+        if hits is not None:
+            # Full-text matches are ordered by relevance
+            paging = Pagination([hits.c.rank, VisitReport.id], default_per_page=15)
+        else:
+            paging = Pagination([VisitReport.created_at, VisitReport.id], descending=True, default_per_page=15)
         show_all = request.args.get('show_all', 'false').lower() == 'true'
         
         if current_user.role == UserRole.SUPER_ADMIN:
@@ -419,15 +756,23 @@ def search_reports(current_user):
             if not show_all:
                 query = query.filter_by(is_active=True)
         
-        if search_term:
-            query = query.join(Client).filter(Client.name.ilike(f'%{search_term}%'))
+        # The index lookup runs first; the role scope only sees its hits
+        if hits is not None:
+            query = query.join(hits, hits.c.id == VisitReport.id).add_columns(hits.c.rank)
+        else:
+            if search_term:
+                # Only punctuation was typed, which the index does not hold
+                query = query.join(Client).filter(Client.name.ilike(f'%{search_term}%'))
+            query = query.add_columns(db.literal(None, db.Float).label('rank'))
         
-        total_count = query.count()
-        reports = query.order_by(VisitReport.created_at.desc(), VisitReport.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        total_count = paging.count(query, current_user.id)
+        rows = paging.split(paging.apply(query.options(joinedload(VisitReport.client))).all())
         
         reports_data = [{'id': r.id, 'client_name': r.client.name if r.client else 'Unknown',
-            'visit_date': r.visit_date.isoformat(), 'is_active': r.is_active} for r in reports]
+            'visit_date': r.visit_date.isoformat(), 'is_active': r.is_active, 'rank': rank} for r, rank in rows]
         
-        return jsonify({'reports': reports_data, 'page': page, 'per_page': per_page, 'total': total_count, 'has_more': page * per_page < total_count}), 200
+        return jsonify({'reports': reports_data, **paging.meta(total_count)}), 200
+    except InvalidCursor as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': 'Failed to search reports', 'error': str(e)}), 500
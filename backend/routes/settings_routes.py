@@ -2,9 +2,10 @@
 
 from flask import Blueprint, request, jsonify
 from backend.models import db, SystemSetting, UserRole
-from backend.utils.auth import token_required
-import os
-import json
+from backend.utils.auth import token_required, identity_cache_stats
+from backend.utils.settings import get_all_settings, update_setting
+from backend.utils.snapshots import send_snapshot
+from backend.utils.reference_data import predefined_notes
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/api/settings')
 predefined_notes_bp = Blueprint('predefined_notes', __name__, url_prefix='/api')
@@ -18,27 +19,7 @@ def get_settings(current_user):
         return jsonify({'message': 'Permission denied'}), 403
     
     try:
-        # Load settings from JSON file
-        settings_file = 'sys_settings.json'
-        print(f"Loading settings from: {settings_file}")
-        if os.path.exists(settings_file):
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                settings_dict = json.load(f)
-            print(f"Settings loaded from file: {settings_dict}")
-        else:
-            # Create default settings file if it doesn't exist
-            print("Settings file not found, creating default")
-            settings_dict = {
-                'price_tolerance': {
-                    'value': '1.00',
-                    'description': 'Maximum allowed difference between internal and displayed price'
-                }
-            }
-            with open(settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings_dict, f, indent=2, ensure_ascii=False)
-            print(f"Default settings created: {settings_dict}")
-        
-        return jsonify(settings_dict)
+        return jsonify(get_all_settings())
     except Exception as e:
         print(f"Error getting settings: {e}")
         return jsonify({'message': 'Error loading settings'}), 500
@@ -65,45 +46,29 @@ def update_price_tolerance(current_user):
         except (ValueError, TypeError):
             return jsonify({'message': 'Invalid price tolerance value'}), 400
         
-        # Update settings in JSON file
-        settings_file = 'sys_settings.json'
-        settings_dict = {}
-        
-        # Load existing settings
-        if os.path.exists(settings_file):
-            with open(settings_file, 'r', encoding='utf-8') as f:
-                settings_dict = json.load(f)
-            print(f"Loaded existing settings: {settings_dict}")
-        else:
-            print("Settings file not found, creating new one")
-        
-        # Update price tolerance
-        settings_dict['price_tolerance'] = {
-            'value': str(tolerance_value),
-            'description': 'Maximum allowed difference between internal and displayed price'
-        }
-        
-        print(f"Updated settings to save: {settings_dict}")
-        
-        # Save back to file
-        with open(settings_file, 'w', encoding='utf-8') as f:
-            json.dump(settings_dict, f, indent=2, ensure_ascii=False)
-        
-        print(f"Settings saved to file: {settings_file}")
+        update_setting('price_tolerance', tolerance_value)
         return jsonify({'message': 'Price tolerance updated successfully'})
         
     except Exception as e:
+        db.session.rollback()
         print(f"Error updating price tolerance: {e}")
         return jsonify({'message': 'Error updating price tolerance'}), 500
 
+@settings_bp.route('/cache-stats', methods=['GET'])
+@token_required
+def get_cache_stats(current_user):
+    """Get in-process cache hit rates (super admin only)"""
+    if current_user.role != UserRole.SUPER_ADMIN:
+        return jsonify({'message': 'Permission denied'}), 403
+    
+    return jsonify({'identity': identity_cache_stats()}), 200
+
 @settings_bp.route('/predefined-notes', methods=['GET'])
 @token_required
 def get_predefined_notes(current_user):
     """Get predefined notes for visit reports"""
     try:
-        with open('templates/predefined_notes.json', 'r', encoding='utf-8') as f:
-            predefined_notes = json.load(f)
-        return jsonify(predefined_notes)
+        return send_snapshot(predefined_notes(), private=True)
     except Exception as e:
         print(f"Error loading predefined notes: {e}")
         return jsonify({'message': 'Error loading predefined notes'}), 500
@@ -114,9 +79,7 @@ def get_predefined_notes(current_user):
 def get_predefined_notes_alias(current_user):
     """Get predefined notes - alias route for frontend"""
     try:
-        with open('templates/predefined_notes.json', 'r', encoding='utf-8') as f:
-            predefined_notes = json.load(f)
-        return jsonify(predefined_notes)
+        return send_snapshot(predefined_notes(), private=True)
     except Exception as e:
         print(f"Error loading predefined notes: {e}")
         return jsonify({'message': 'Error loading predefined notes'}), 500
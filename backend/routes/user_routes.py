@@ -2,7 +2,7 @@
 
 from flask import Blueprint, request, jsonify
 from backend.models import db, User, UserRole
-from backend.utils.auth import token_required
+from backend.utils.auth import token_required, invalidate_user_identity
 
 users_bp = Blueprint('users', __name__, url_prefix='/api/users')
 supervisors_bp = Blueprint('supervisors', __name__, url_prefix='/api/supervisors')
@@ -83,6 +83,7 @@ def assign_supervisor(current_user, user_id):
         
         user.supervisor_id = supervisor_id
         db.session.commit()
+        invalidate_user_identity(user_id)
         
         return jsonify({
             'message': 'Supervisor assigned successfully',
@@ -0,0 +1 @@
+# Search package - full-text indexes kept inside the SQLite database
@@ -0,0 +1,131 @@
+# Full-text search (SQLite FTS5)
+#
+# clients_fts indexes the normalized name, region, address and salesman keys of
+# clients, products_fts the normalized product name, and visit_report_notes_fts
+# the note text as written. All are external-content tables: they store only
+# the index, read the text from the base table, and are kept in sync by
+# triggers. Lookups return (rowid, rank) hits that callers join back to their
+# scoped queries; rank is bm25, lower is better.
+
+import re
+from backend.models import db, VisitReport, VisitReportNote
+from backend.search.normalize import normalize_text
+
+SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+        name_key, region_key, address_key, salesman_key,
+        content='clients', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts(rowid, name_key, region_key, address_key, salesman_key)
+        VALUES (new.id, new.name_key, new.region_key, new.address_key, new.salesman_key);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name_key, region_key, address_key, salesman_key)
+        VALUES ('delete', old.id, old.name_key, old.region_key, old.address_key, old.salesman_key);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF name_key, region_key, address_key, salesman_key ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name_key, region_key, address_key, salesman_key)
+        VALUES ('delete', old.id, old.name_key, old.region_key, old.address_key, old.salesman_key);
+        INSERT INTO clients_fts(rowid, name_key, region_key, address_key, salesman_key)
+        VALUES (new.id, new.name_key, new.region_key, new.address_key, new.salesman_key);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name_key,
+        content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name_key) VALUES (new.id, new.name_key);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name_key ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+        INSERT INTO products_fts(rowid, name_key) VALUES (new.id, new.name_key);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS visit_report_notes_fts USING fts5(
+        note_text,
+        content='visit_report_notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS visit_report_notes_fts_insert AFTER INSERT ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(rowid, note_text) VALUES (new.id, new.note_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS visit_report_notes_fts_delete AFTER DELETE ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(visit_report_notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS visit_report_notes_fts_update AFTER UPDATE OF note_text ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(visit_report_notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+        INSERT INTO visit_report_notes_fts(rowid, note_text) VALUES (new.id, new.note_text);
+    END""",
+]
+
+INDEXES = ['clients_fts', 'products_fts', 'visit_report_notes_fts']
+
+clients_fts = db.table('clients_fts', db.column('rowid', db.Integer), db.column('rank', db.Float))
+products_fts = db.table('products_fts', db.column('rowid', db.Integer), db.column('rank', db.Float))
+notes_fts = db.table('visit_report_notes_fts', db.column('rowid', db.Integer), db.column('rank', db.Float))
+
+def ensure_search_indexes(connection, rebuild=False):
+    """Create missing FTS tables and triggers, indexing existing rows of new tables.
+
+    rebuild=True re-indexes every table, e.g. after the base tables were recreated.
+    """
+    existing = {row[0] for row in connection.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s)" % ', '.join(f"'{index}'" for index in INDEXES)
+    )}
+    for statement in SCHEMA:
+        connection.exec_driver_sql(statement)
+    for index in INDEXES:
+        if rebuild or index not in existing:
+            rebuild_search_index(connection, index)
+
+def rebuild_search_index(connection, index):
+    """Re-read every row of the base table into an index"""
+    connection.exec_driver_sql(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+def match_query(term, normalize=True):
+    """FTS5 query matching rows that contain every word of term as a prefix.
+
+    Words are quoted, so operators and punctuation typed by users are literal.
+    normalize=True folds the term like the *_key columns it is matched against.
+    Returns None when term has no searchable characters.
+    """
+    words = re.findall(r'\w+', normalize_text(term) if normalize else term)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+def _hits(fts_table, query):
+    return db.select(fts_table.c.rowid.label('id'), fts_table.c.rank.label('rank')).where(
+        db.literal_column(fts_table.name).op('MATCH')(query)
+    )
+
+def client_hits(term):
+    """Subquery of (id, rank) for clients matching term, or None if term has no words"""
+    query = match_query(term)
+    return _hits(clients_fts, query).subquery() if query else None
+
+def product_hits(term):
+    """Subquery of (id, rank) for products whose name matches term, or None if term has no words"""
+    query = match_query(term)
+    return _hits(products_fts, query).subquery() if query else None
+
+def report_hits(term):
+    """Subquery of (id, rank) for visit reports whose client name or notes match term.
+
+    A report's rank is its best rank over its client and its notes. Returns
+    None if term has no words.
+    """
+    client_query = match_query(term)
+    note_query = match_query(term, normalize=False)
+    if not client_query or not note_query:
+        return None
+    by_client = db.select(VisitReport.id.label('id'), clients_fts.c.rank.label('rank')).join(
+        clients_fts, clients_fts.c.rowid == VisitReport.client_id
+    ).where(db.literal_column('clients_fts').op('MATCH')('{name_key}: (' + client_query + ')'))
+    by_note = db.select(VisitReportNote.visit_report_id.label('id'), notes_fts.c.rank.label('rank')).join(
+        notes_fts, notes_fts.c.rowid == VisitReportNote.id
+    ).where(db.literal_column('visit_report_notes_fts').op('MATCH')(note_query))
+    hits = db.union_all(by_client, by_note).subquery()
+    return db.select(hits.c.id, db.func.min(hits.c.rank).label('rank')).group_by(hits.c.id).subquery()
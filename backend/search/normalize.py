@@ -0,0 +1,42 @@
+# Search key normalization
+#
+# Names are typed with or without tashkeel and with any of the alef/hamza,
+# taa marbuta/haa and alef maqsura/yaa spellings. Text is folded to one
+# spelling before it is stored in the *_key shadow columns and before a search
+# term is compared with them, so every variant finds the same rows.
+
+import re
+import unicodedata
+from sqlalchemy import event
+
+# Harakat, Quranic annotation marks, superscript alef and tatweel
+_MARKS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و',
+    **{digit: str(value) for value, digit in enumerate('٠١٢٣٤٥٦٧٨٩')},
+    **{digit: str(value) for value, digit in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+})
+
+def normalize_text(value):
+    """Canonical search form of a name: folded spelling, lower case, single spaces"""
+    if value is None:
+        return None
+    # NFKC turns presentation forms (e.g. ligatures pasted from PDFs) into plain letters
+    value = unicodedata.normalize('NFKC', value)
+    value = _MARKS.sub('', value).translate(_LETTERS).casefold()
+    return ' '.join(value.split())
+
+def track_search_keys(model, **keys):
+    """Keep a model's key columns equal to normalize_text() of their source columns.
+
+    keys maps each key column to its source column, e.g. name_key='name'.
+    """
+
+    def fill_keys(mapper, connection, target):
+        for key_column, source_column in keys.items():
+            setattr(target, key_column, normalize_text(getattr(target, source_column)))
+
+    event.listen(model, 'before_insert', fill_keys)
+    event.listen(model, 'before_update', fill_keys)
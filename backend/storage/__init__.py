@@ -0,0 +1 @@
+# Storage package - on-disk stores for binary data kept out of the database
@@ -0,0 +1,77 @@
+# Content-addressed blob store
+#
+# Blobs live at <BLOB_STORE_PATH>/<hash[:2]>/<hash[2:4]>/<hash> and are named by the
+# SHA-256 of their bytes, so identical images are stored once. Reference counts
+# are kept in the blobs table (see backend/models/blob.py). Resized renditions
+# live under <BLOB_STORE_PATH>/renditions/<size>/ keyed by the source hash.
+
+import hashlib
+import os
+import tempfile
+from backend.config import Config
+
+def blob_hash(data):
+    """SHA-256 hex digest that names a blob"""
+    return hashlib.sha256(data).hexdigest()
+
+def blob_path(hash_value):
+    """Absolute path of a blob in the sharded directory layout"""
+    root = os.path.abspath(Config.BLOB_STORE_PATH)
+    return os.path.join(root, hash_value[:2], hash_value[2:4], hash_value)
+
+def rendition_path(hash_value, size):
+    """Path of a resized rendition ('128', '512', 'full', ...) derived from a blob"""
+    root = os.path.abspath(Config.BLOB_STORE_PATH)
+    return os.path.join(root, 'renditions', str(size), hash_value[:2], hash_value)
+
+def put_blob(data):
+    """Write bytes to the store (deduplicated) and return their hash"""
+    hash_value = blob_hash(data)
+    path = blob_path(hash_value)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return hash_value
+
+def put_rendition(hash_value, size, data):
+    """Store a rendition generated from a blob"""
+    _write_atomic(rendition_path(hash_value, size), data)
+
+def read_blob(hash_value):
+    """Read the full bytes of a blob"""
+    with open(blob_path(hash_value), 'rb') as f:
+        return f.read()
+
+def blob_size(hash_value):
+    """Size of a stored blob in bytes"""
+    return os.path.getsize(blob_path(hash_value))
+
+def delete_blob_file(hash_value):
+    """Remove a blob file and its renditions (callers check its reference count first)"""
+    root = os.path.abspath(Config.BLOB_STORE_PATH)
+    renditions_root = os.path.join(root, 'renditions')
+    if os.path.isdir(renditions_root):
+        for size in os.listdir(renditions_root):
+            _remove(rendition_path(hash_value, size))
+    return _remove(blob_path(hash_value))
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _write_atomic(path, data):
+    """Write to a temp file and rename so readers never see a partial file"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
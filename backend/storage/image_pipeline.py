@@ -0,0 +1,66 @@
+# Image rendition pipeline
+#
+# Newly stored images are decoded once in a background thread, rotated according
+# to their EXIF orientation and saved as fixed-size renditions in the blob store,
+# so list cards and galleries never download camera originals.
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from backend.config import Config
+from backend.storage.blob_store import blob_path, rendition_path, put_rendition
+
+# 'full' keeps the original dimensions but fixes orientation and strips metadata
+RENDITION_SIZES = [str(size) for size in Config.IMAGE_RENDITION_SIZES] + ['full']
+
+_executor = ThreadPoolExecutor(max_workers=Config.IMAGE_PIPELINE_WORKERS, thread_name_prefix='image-pipeline')
+_pending = set()
+_pending_lock = threading.Lock()
+
+def schedule_renditions(hash_value):
+    """Queue rendition generation for a blob unless it is already queued"""
+    with _pending_lock:
+        if hash_value in _pending:
+            return
+        _pending.add(hash_value)
+    _executor.submit(_run, hash_value)
+
+def _run(hash_value):
+    try:
+        generate_renditions(hash_value)
+    except Exception as e:
+        print(f"Error generating renditions for blob {hash_value[:12]}: {e}")
+    finally:
+        with _pending_lock:
+            _pending.discard(hash_value)
+
+def has_rendition(hash_value, size):
+    return os.path.exists(rendition_path(hash_value, size))
+
+def generate_renditions(hash_value):
+    """Create every missing rendition of a blob (runs in the worker thread)"""
+    missing = [size for size in RENDITION_SIZES if not has_rendition(hash_value, size)]
+    if not missing:
+        return
+
+    with Image.open(blob_path(hash_value)) as source:
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    for size in missing:
+        rendition = image.copy()
+        if size != 'full':
+            rendition.thumbnail((int(size), int(size)), Image.LANCZOS)
+        put_rendition(hash_value, size, _encode(rendition, has_alpha))
+
+def _encode(image, has_alpha):
+    """PNG for transparent images, progressive JPEG for photos"""
+    buffer = io.BytesIO()
+    if has_alpha:
+        image.save(buffer, format='PNG', optimize=True)
+    else:
+        image.save(buffer, format='JPEG', quality=Config.IMAGE_RENDITION_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
@@ -1,3 +1,3 @@
 # Utils package initialization
 
-__all__ = ['auth', 'permissions', 'report_generator']
+__all__ = ['auth', 'cache', 'images', 'pagination', 'permissions', 'progress', 'reference_data', 'report_generator', 'settings', 'snapshots', 'streaming']
@@ -3,11 +3,54 @@
 import jwt
 from functools import wraps
 from flask import request, jsonify
-from backend.models import User
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from backend.models import db, User
 from backend.config import Config
+from backend.utils.cache import TTLCache
+
+# Verified identities keyed by (user_id, token) so authenticated requests skip the user lookup
+_identity_cache = TTLCache(ttl=Config.IDENTITY_CACHE_TTL, max_entries=Config.IDENTITY_CACHE_MAX_ENTRIES)
+_USER_COLUMNS = [c.key for c in inspect(User).column_attrs]
+
+def get_user_from_token(token):
+    """Decode a JWT and return the matching User attached to the current session.
+
+    Raises jwt.InvalidTokenError (or ExpiredSignatureError) for bad tokens and
+    returns None when the user no longer exists.
+    """
+    data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    user_id = data['user_id']
+    
+    cached = _identity_cache.get((user_id, token))
+    if cached is not None:
+        # Rebuild a detached User from the snapshot and attach it without a query
+        user = User(**cached)
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+    
+    user = User.query.get(user_id)
+    if user:
+        _identity_cache.set((user_id, token), {key: getattr(user, key) for key in _USER_COLUMNS})
+    return user
+
+def invalidate_user_identity(user_id):
+    """Forget cached identities for a user after their role or supervisor changes"""
+    return _identity_cache.invalidate(lambda key: key[0] == user_id)
+
+def identity_cache_stats():
+    """Get hit/miss counters of the identity cache"""
+    return _identity_cache.stats()
 
 def token_required(f):
     """Decorator to require JWT token for API routes"""
+    return _require_token(f, allow_query_token=False)
+
+def media_token_required(f):
+    """Like token_required, but also accepts ?token= so URLs work in <img src>"""
+    return _require_token(f, allow_query_token=True)
+
+def _require_token(f, allow_query_token):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
@@ -18,14 +61,14 @@ def token_required(f):
                 token = auth_header.split(" ")[1]  # Bearer TOKEN
             except IndexError:
                 return jsonify({'message': 'Invalid authorization header format'}), 401
+        elif allow_query_token:
+            token = request.args.get('token')
         
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
         
         try:
-            data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-            current_user_id = data['user_id']
-            current_user_obj = User.query.get(current_user_id)
+            current_user_obj = get_user_from_token(token)
             if not current_user_obj:
                 return jsonify({'message': 'User not found'}), 401
         except jwt.ExpiredSignatureError:
@@ -0,0 +1,78 @@
+# In-process cache utilities
+
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe in-memory cache with per-entry expiry and hit/miss counters.
+    
+    Each gunicorn worker holds its own copy, so entries must be safe to serve
+    slightly stale until their TTL runs out or they are invalidated explicitly.
+    """
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, evicting the oldest entries when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[key] = (expires_at, value)
+
+    def invalidate(self, predicate=None):
+        """Drop every entry whose key matches predicate (all entries if None)"""
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if predicate(key)]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.invalidations += removed
+            return removed
+
+    def stats(self):
+        """Return counters and hit rate for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _evict(self):
+        """Remove expired entries, then the oldest half if still full (lock held)"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        if len(self._entries) >= self.max_entries:
+            oldest = sorted(self._entries, key=lambda k: self._entries[k][0])
+            for key in oldest[:max(1, len(oldest) // 2)]:
+                del self._entries[key]
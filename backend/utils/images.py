@@ -0,0 +1,142 @@
+# Image serving utilities
+
+import base64
+import hashlib
+import struct
+from flask import request, jsonify, Response, send_file
+from backend.config import Config
+from backend.storage.blob_store import blob_path, rendition_path
+from backend.storage.image_pipeline import RENDITION_SIZES, has_rendition, schedule_renditions
+
+# Leading bytes of the image formats the frontend uploads
+_IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+]
+
+def detect_image_mimetype(data):
+    """Guess the Content-Type of an image from its leading bytes"""
+    for signature, mimetype in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+def image_etag(data):
+    """Content hash used as a strong ETag for image bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+def send_image(data, etag=None):
+    """Return raw image bytes with ETag, private caching and 304 handling"""
+    response = Response(data, mimetype=detect_image_mimetype(data))
+    response.set_etag(etag or image_etag(data))
+    response.cache_control.private = True
+    response.cache_control.max_age = Config.IMAGE_CACHE_MAX_AGE
+    return response.make_conditional(request)
+
+def resolve_image_path(hash_value, size=None):
+    """Return (path, etag, ready) for a blob or one of its renditions.
+
+    Missing renditions are queued and the original is returned with ready=False.
+    """
+    if size:
+        if has_rendition(hash_value, size):
+            return rendition_path(hash_value, size), f'{hash_value}-{size}', True
+        schedule_renditions(hash_value)
+        return blob_path(hash_value), hash_value, False
+    return blob_path(hash_value), hash_value, True
+
+def send_blob(hash_value, size=None):
+    """Stream a blob-store image (or one of its renditions) from disk.
+
+    The content hash doubles as the ETag, so conditional requests never touch
+    the file. Missing renditions are queued and the original is served meanwhile.
+    """
+    path, etag, ready = resolve_image_path(hash_value, size)
+    # Make the browser revalidate a fallback so it picks up the rendition once ready
+    max_age = Config.IMAGE_CACHE_MAX_AGE if ready else 0
+    
+    with open(path, 'rb') as f:
+        mimetype = detect_image_mimetype(f.read(12))
+    response = send_file(path, mimetype=mimetype, etag=etag, conditional=True, max_age=max_age)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+def send_stored_image(hash_value, legacy_data=None):
+    """Serve an image stored by hash, or from a legacy BLOB column not yet migrated.
+
+    Honors ?size=128|512|full on the current request for blob-store images.
+    """
+    size = request.args.get('size')
+    if size and size not in RENDITION_SIZES:
+        return jsonify({'message': 'Invalid image size', 'sizes': RENDITION_SIZES}), 400
+    if hash_value:
+        return send_blob(hash_value, size)
+    return send_image(legacy_data)
+
+def batch_request_data():
+    """Parameters of a batch image request: the JSON body of a POST, or the
+    query string of a GET (ids=1,2,3), which the browser can cache"""
+    if request.method == 'GET':
+        data = request.args.to_dict()
+        data['ids'] = [item_id for item_id in data.get('ids', '').split(',') if item_id]
+        return data
+    return request.get_json() or {}
+
+def send_image_batch(items, size=None, as_json=False):
+    """Send many images in one response.
+
+    items are (id, hash, legacy_data) tuples. The default body is a stream of
+    records: 4-byte big-endian id, 4-byte big-endian length, then the image bytes.
+    as_json returns {id: base64} instead for clients that cannot read binary.
+    The ETag covers the ids, content hashes and size, so a repeated GET for
+    unchanged images is answered from the browser cache or with a 304.
+    """
+    sources = [(item_id, *_image_source(hash_value, legacy_data, size))
+               for item_id, hash_value, legacy_data in sorted(items, key=lambda item: item[0])]
+    
+    if as_json:
+        images = {}
+        for item_id, path, legacy_data, _, _ in sources:
+            images[str(item_id)] = base64.b64encode(_read_image(path, legacy_data)).decode('utf-8')
+        response = jsonify({'images': images})
+    else:
+        def generate():
+            for item_id, path, legacy_data, _, _ in sources:
+                try:
+                    data = _read_image(path, legacy_data)
+                except OSError as e:
+                    print(f"Error reading image {item_id}: {e}")
+                    continue
+                yield struct.pack('>II', item_id, len(data))
+                yield data
+        
+        response = Response(generate(), mimetype='application/octet-stream')
+    
+    batch_key = ','.join(f'{item_id}={etag}' for item_id, _, _, etag, _ in sources)
+    response.set_etag(image_etag(f'{size}:{int(as_json)}:{batch_key}'.encode('utf-8')))
+    response.cache_control.private = True
+    # The ids a user may see depend on who asks
+    response.vary.add('Authorization')
+    # Revalidate while any rendition is still being generated, as send_blob does
+    ready = all(source_ready for _, _, _, _, source_ready in sources)
+    response.cache_control.max_age = Config.IMAGE_CACHE_MAX_AGE if ready else 0
+    return response.make_conditional(request)
+
+def _image_source(hash_value, legacy_data, size):
+    """(path, legacy_data, etag, ready) of one batch image"""
+    if not hash_value:
+        return None, legacy_data, image_etag(legacy_data), True
+    path, etag, ready = resolve_image_path(hash_value, size)
+    return path, None, etag, ready
+
+def _read_image(path, legacy_data):
+    if path is None:
+        return legacy_data
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,143 @@
+# Pagination utilities
+#
+# List endpoints accept either the classic ?page=N (offset paging) or an opaque
+# ?cursor= returned as next_cursor by the previous page (keyset paging). Keyset
+# pages seek straight to the last row seen, so they cost the same on page 500
+# as on page 1.
+
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy.engine import Row
+from backend.models import db
+from backend.config import Config
+from backend.utils.cache import TTLCache
+
+# Totals of filtered lists, reused by follow-up pages of the same listing
+_count_cache = TTLCache(ttl=Config.PAGE_COUNT_CACHE_TTL, max_entries=Config.PAGE_COUNT_CACHE_MAX_ENTRIES)
+
+# Query string arguments that select a page rather than the listing itself
+_PAGING_ARGS = {'page', 'per_page', 'cursor', 'include_total'}
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that was not produced by this API"""
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque string"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, ensure_ascii=False).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_columns):
+    """Decode a cursor back into sort key values typed like sort_columns"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        if not isinstance(values, list) or len(values) != len(sort_columns):
+            raise InvalidCursor('Invalid cursor')
+        return [
+            datetime.fromisoformat(value) if value is not None and isinstance(column.type, db.DateTime) else value
+            for column, value in zip(sort_columns, values)
+        ]
+    except (ValueError, UnicodeError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+class Pagination:
+    """Offset or keyset paging parsed from the current request.
+
+    sort_columns must end with a unique column (the primary key) so the order
+    is total; all of them are sorted in the same direction.
+    """
+
+    def __init__(self, sort_columns, descending=False, default_per_page=20):
+        self.sort_columns = sort_columns
+        self.descending = descending
+        self.page = int(request.args.get('page', 1))
+        self.per_page = int(request.args.get('per_page', default_per_page))
+        self.include_total = request.args.get('include_total', 'true').lower() == 'true'
+        cursor = request.args.get('cursor')
+        self.cursor_values = decode_cursor(cursor, sort_columns) if cursor else None
+        self.next_cursor = None
+        self.has_more = False
+
+    @property
+    def is_first_page(self):
+        return self.cursor_values is None and self.page <= 1
+
+    def count(self, query, scope):
+        """Total rows of the listing, or None when the caller opted out.
+        
+        The first page always counts; later pages of the same listing (same
+        path, scope and filters) reuse that total while it is cached.
+        """
+        if not self.include_total:
+            return None
+        
+        filters = tuple(sorted((k, v) for k, v in request.args.items() if k not in _PAGING_ARGS))
+        key = (request.path, scope, filters)
+        if not self.is_first_page:
+            cached = _count_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        total = query.order_by(None).count()
+        _count_cache.set(key, total)
+        return total
+
+    def apply(self, query):
+        """Order the query by the sort key and restrict it to the requested page"""
+        order = [column.desc() if self.descending else column.asc() for column in self.sort_columns]
+        query = query.order_by(*order)
+        
+        if self.cursor_values is not None:
+            row_key = db.tuple_(*self.sort_columns)
+            last_key = db.tuple_(*[db.literal(value, column.type) for column, value in zip(self.sort_columns, self.cursor_values)])
+            query = query.filter(row_key < last_key if self.descending else row_key > last_key)
+        else:
+            query = query.offset((self.page - 1) * self.per_page)
+        
+        # One extra row tells whether another page follows without counting
+        return query.limit(self.per_page + 1)
+
+    def split(self, rows):
+        """Trim the lookahead row and remember the cursor of the next page"""
+        self.has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if self.has_more:
+            self.next_cursor = encode_cursor(self._sort_key(rows[-1]))
+        return rows
+
+    def iter_split(self, rows):
+        """Like split, but yields rows as they arrive from a streamed query.
+
+        has_more and next_cursor are only set once the iteration is finished.
+        """
+        last_key = None
+        for index, row in enumerate(rows):
+            if index == self.per_page:
+                self.has_more = True
+                self.next_cursor = encode_cursor(last_key)
+                return
+            last_key = self._sort_key(row)
+            yield row
+
+    def _sort_key(self, row):
+        if not isinstance(row, Row):
+            return [getattr(row, column.key) for column in self.sort_columns]
+        # Labelled columns of the row (such as a search rank) are read from the row itself
+        values = row._mapping
+        return [values[column.key] if column.key in values else getattr(row[0], column.key) for column in self.sort_columns]
+
+    def meta(self, total_count):
+        """Paging fields of the response body"""
+        return {
+            'page': self.page, 'per_page': self.per_page, 'total': total_count,
+            'has_more': self.has_more, 'next_cursor': self.next_cursor
+        }
+
+
+def count_cache_stats():
+    """Get hit/miss counters of the list total cache"""
+    return _count_cache.stats()
@@ -1,6 +1,7 @@
 # Permission utilities
 
-from backend.models import UserRole
+from backend.models import db, Client, User, UserRole, VisitReport
+from sqlalchemy import or_, true
 
 def is_super_admin(user):
     """Check if user has super admin role"""
@@ -44,3 +45,23 @@ def can_view_client(user, client):
         salesmen_ids = [s.id for s in user.salesmen]
         return client.assigned_user_id in salesmen_ids
     return client.assigned_user_id == user.id
+
+def client_visibility_filter(user):
+    """SQL criterion limiting Client rows to those the user can view (for use in queries)"""
+    if is_super_admin(user):
+        return true()
+    if is_supervisor(user):
+        # Supervisor sees their own clients and their salesmen's clients
+        team_ids = db.select(User.id).where(User.supervisor_id == user.id, User.role == UserRole.SALESMAN)
+        return or_(Client.assigned_user_id == user.id, Client.assigned_user_id.in_(team_ids))
+    return Client.assigned_user_id == user.id
+
+def report_visibility_filter(user):
+    """SQL criterion limiting VisitReport rows to those the user can list (for use in queries)"""
+    if is_super_admin(user):
+        return true()
+    if is_supervisor(user):
+        # Supervisor sees their own reports and their salesmen's reports
+        team_ids = db.select(User.id).where(User.supervisor_id == user.id, User.role == UserRole.SALESMAN)
+        return or_(VisitReport.user_id == user.id, VisitReport.user_id.in_(team_ids))
+    return VisitReport.user_id == user.id
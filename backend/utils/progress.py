@@ -0,0 +1,67 @@
+# Progress of long-running jobs
+#
+# Each job's progress is a small JSON document kept in a file under
+# <JOB_PROGRESS_PATH>/<kind>/<job id>.json and rewritten atomically on every
+# update, so a poll answered by any worker process sees the latest state.
+# Entries older than the TTL are ignored, and purge() deletes them.
+
+import json
+import os
+import re
+import time
+from backend.config import Config
+from backend.rendering.pdf import write_file
+
+# Job ids become file names, so only plain tokens are accepted
+_JOB_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def is_valid_job_id(job_id):
+    """True if job_id can name a progress entry"""
+    return bool(job_id) and _JOB_ID.fullmatch(job_id) is not None
+
+
+class ProgressStore:
+    """Progress documents of one kind of job, shared by all worker processes"""
+
+    def __init__(self, kind, ttl):
+        self.kind = kind
+        self.ttl = ttl
+
+    def get(self, job_id):
+        """Progress dict of a job, or None if it is unknown or expired"""
+        if not is_valid_job_id(job_id):
+            return None
+        path = self._path(job_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, job_id, progress):
+        """Replace the progress of a job"""
+        if not is_valid_job_id(job_id):
+            raise ValueError('Invalid job id')
+        write_file(self._path(job_id), json.dumps(progress).encode('utf-8'))
+
+    def purge(self):
+        """Delete expired entries"""
+        directory = self._directory()
+        if not os.path.isdir(directory):
+            return
+        now = time.time()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _directory(self):
+        return os.path.join(os.path.abspath(Config.JOB_PROGRESS_PATH), self.kind)
+
+    def _path(self, job_id):
+        return os.path.join(self._directory(), f'{job_id}.json')
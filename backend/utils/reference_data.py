@@ -0,0 +1,157 @@
+# Reference data
+#
+# Small lists behind dropdowns and filters (client and product names, filter
+# values, predefined notes) change a few times a day. Each is serialized once
+# per role scope and served as a snapshot until a committed write to the models
+# it is read from invalidates it. The visit report form gets all of them in one
+# bootstrap payload whose version changes whenever any part does.
+
+import gzip
+import hashlib
+import json
+from sqlalchemy import text
+from backend.models import db, Client, Product, User, UserRole
+from backend.config import Config
+from backend.rendering.templates import FileCache
+from backend.utils.cache import TTLCache
+from backend.utils.permissions import client_visibility_filter
+from backend.utils.settings import get_float_setting, settings_version
+from backend.utils.snapshots import Snapshot, SnapshotCache, ScopedSnapshotCache, invalidate_on_commit
+
+PREDEFINED_NOTES_FILE = 'templates/predefined_notes.json'
+
+# Client lists per role scope; team membership decides what supervisors see
+_client_reference = ScopedSnapshotCache('client_reference', ttl=Config.REFERENCE_DATA_CACHE_TTL,
+                                        max_entries=Config.REFERENCE_DATA_CACHE_MAX_ENTRIES)
+invalidate_on_commit(_client_reference, Client, User)
+
+# Product dropdown list, the same for every user
+_product_names = SnapshotCache('product_names')
+invalidate_on_commit(_product_names, Product)
+
+# Assembled form payloads, keyed by their version
+_form_bootstraps = TTLCache(ttl=Config.REFERENCE_DATA_CACHE_TTL, max_entries=Config.REFERENCE_DATA_CACHE_MAX_ENTRIES)
+
+def _to_json(data):
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+def _snapshot(version, body):
+    return Snapshot(version, body, gzip.compress(body))
+
+# The file is re-read only when it changes on disk
+_predefined_notes = FileCache(PREDEFINED_NOTES_FILE, lambda source: _snapshot('file', _to_json(json.loads(source))))
+
+def reference_scope(user):
+    """Cache scope of a user's reference data; all admins share one"""
+    return 'all' if user.role == UserRole.SUPER_ADMIN else user.id
+
+def client_names(user):
+    """Snapshot of the active clients (id, name, region) the user can pick"""
+    return _client_reference.get(('names', reference_scope(user)), lambda: _build_client_names(user))
+
+def client_names_with_salesman(user):
+    """Snapshot of the active clients with salesman and assignment, for team management"""
+    return _client_reference.get(('names-with-salesman', reference_scope(user)), lambda: _build_client_names_with_salesman(user))
+
+def client_filter_data(user):
+    """Snapshot of the distinct regions and salesmen among the user's active clients"""
+    return _client_reference.get(('filter-data', reference_scope(user)), lambda: _build_client_filter_data(user))
+
+def product_names():
+    """Snapshot of product ids, names and prices"""
+    return _product_names.get(_build_product_names)
+
+def predefined_notes():
+    """Snapshot of the predefined visit report questions"""
+    return _predefined_notes.get()
+
+def form_bootstrap_version(user):
+    """Version of the user's report form payload; changes whenever any part of it changes"""
+    parts = (reference_scope(user), _client_reference.version(), _product_names.version(),
+             predefined_notes().etag, settings_version())
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+
+def form_bootstrap(user, version):
+    """Snapshot of everything the new visit report form needs, for form_bootstrap_version(user)"""
+    snapshot = _form_bootstraps.get(version)
+    if snapshot is None:
+        # The parts are JSON documents already, so they are spliced in as they are
+        body = b''.join((
+            b'{"version": ', _to_json(version),
+            b', "clients": ', client_names(user).body,
+            b', "products": ', product_names().body,
+            b', "predefined_notes": ', predefined_notes().body,
+            b', "price_tolerance": ', _to_json(get_float_setting('price_tolerance', 1.0)),
+            b'}'
+        ))
+        snapshot = _snapshot(version, body)
+        _form_bootstraps.set(version, snapshot)
+    return snapshot
+
+def _build_client_names(user):
+    if user.role == UserRole.SUPER_ADMIN:
+        query = text("SELECT id, name, region FROM clients WHERE is_active = 1 ORDER BY name")
+        result = db.session.execute(query).fetchall()
+    elif user.role == UserRole.SALES_SUPERVISOR:
+        query = text("""SELECT id, name, region FROM clients WHERE is_active = 1 AND (
+            assigned_user_id = :user_id OR assigned_user_id IN (SELECT id FROM users WHERE supervisor_id = :user_id)
+        ) ORDER BY name""")
+        result = db.session.execute(query, {'user_id': user.id}).fetchall()
+    else:
+        query = text("SELECT id, name, region FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id ORDER BY name")
+        result = db.session.execute(query, {'user_id': user.id}).fetchall()
+
+    return _to_json([{'id': row[0], 'name': row[1], 'region': row[2]} for row in result])
+
+def _build_client_names_with_salesman(user):
+    if user.role == UserRole.SUPER_ADMIN:
+        query = text("SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 ORDER BY name")
+        result = db.session.execute(query).fetchall()
+    elif user.role == UserRole.SALES_SUPERVISOR:
+        query = text("""SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 AND (
+            assigned_user_id = :user_id OR assigned_user_id IN (SELECT id FROM users WHERE supervisor_id = :user_id)
+            OR assigned_user_id IS NULL
+        ) ORDER BY name""")
+        result = db.session.execute(query, {'user_id': user.id}).fetchall()
+    else:
+        query = text("SELECT id, name, region, salesman_name, assigned_user_id FROM clients WHERE is_active = 1 AND assigned_user_id = :user_id ORDER BY name")
+        result = db.session.execute(query, {'user_id': user.id}).fetchall()
+
+    return _to_json([{
+        'id': row[0],
+        'name': row[1],
+        'region': row[2],
+        'salesman_name': row[3],
+        'assigned_user_id': row[4]
+    } for row in result])
+
+def _build_client_filter_data(user):
+    # Spellings of one region (or salesman) share a key; each key is listed once
+    scope = client_visibility_filter(user)
+    regions = _filter_values(Client.region_key, Client.region, scope)
+    salesmen = _filter_values(Client.salesman_key, Client.salesman_name, scope)
+    return _to_json({'regions': regions, 'salesmen': salesmen})
+
+def _filter_values(key_column, label_column, scope):
+    """Distinct non-empty values of a filter dimension among the active clients of a scope.
+
+    Seeks through the key index from each distinct key straight to the next one,
+    so the cost follows the number of values rather than the number of clients.
+    """
+    criteria = [scope, Client.is_active == True]
+
+    def first_key_after(value):
+        return db.select(key_column).where(key_column > value, *criteria).order_by(key_column).limit(1).scalar_subquery()
+
+    keys = db.select(first_key_after('').label('key')).cte('filter_keys', recursive=True)
+    keys = keys.union_all(db.select(first_key_after(keys.c.key)).where(keys.c.key.isnot(None)))
+    # One spelling as written is shown for each key
+    label = db.select(db.func.trim(label_column)).where(key_column == keys.c.key, *criteria).limit(1).scalar_subquery()
+    rows = db.session.execute(db.select(label).where(keys.c.key.isnot(None))).all()
+    return sorted(row[0] for row in rows)
+
+def _build_product_names():
+    query = text("SELECT id, name, taxed_price_store, taxed_price_client FROM products ORDER BY name")
+    result = db.session.execute(query).fetchall()
+    products = [{'id': row[0], 'name': row[1], 'internal_price': float(row[2]) if row[2] else 0.0, 'client_price': float(row[3]) if row[3] else 0.0} for row in result]
+    return _to_json(products)
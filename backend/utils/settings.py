@@ -0,0 +1,135 @@
+# System settings service
+#
+# Settings live in the system_settings table and are served from a per-process
+# copy. Every update also increments the value of the VERSION_KEY row in the
+# same transaction; workers compare that counter at most every
+# SETTINGS_VERSION_CHECK_INTERVAL seconds and reload when it moved, so all
+# gunicorn workers converge without reading the table on every request.
+# Reads use their own connection, so reading a setting never flushes, commits
+# or rolls back the caller's session; the table is seeded by init_database.
+
+import json
+import os
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from backend.models import db, SystemSetting
+from backend.config import Config
+
+VERSION_KEY = '_version'
+VERSION_DESCRIPTION = 'Incremented on every settings change'
+
+# Settings created on first use, with their default value and description
+DEFAULTS = {
+    'price_tolerance': ('1.00', 'Maximum allowed difference between internal and displayed price'),
+}
+
+# Former file-based store, imported once when the table is still empty
+LEGACY_SETTINGS_FILE = 'sys_settings.json'
+
+_lock = threading.Lock()
+_state = {'version': None, 'settings': {}, 'checked_at': 0.0}
+
+def get_setting(key, default=None):
+    """Value of a setting as stored (a string), or default"""
+    entry = get_all_settings().get(key)
+    return entry['value'] if entry else default
+
+def get_float_setting(key, default):
+    """Value of a numeric setting, or default if it is missing or invalid"""
+    try:
+        return float(get_setting(key, default))
+    except (TypeError, ValueError):
+        return default
+
+def get_all_settings():
+    """All settings as {key: {'value': ..., 'description': ...}}"""
+    now = time.monotonic()
+    if _state['version'] is not None and now - _state['checked_at'] < Config.SETTINGS_VERSION_CHECK_INTERVAL:
+        return _state['settings']
+
+    with _lock:
+        version = _read_version()
+        if version is None:
+            # init_database seeds the table; this covers databases it has not run on
+            seed_settings()
+            version = _read_version()
+        if version != _state['version']:
+            table = SystemSetting.__table__
+            with db.engine.connect() as connection:
+                rows = connection.execute(
+                    db.select(table.c.key, table.c.value, table.c.description).where(table.c.key != VERSION_KEY)
+                ).all()
+            _state['settings'] = {row.key: {'value': row.value, 'description': row.description} for row in rows}
+            _state['version'] = version
+        _state['checked_at'] = now
+        return _state['settings']
+
+def update_setting(key, value, description=None):
+    """Create or change a setting and bump the version in one transaction"""
+    setting = SystemSetting.query.filter_by(key=key).first()
+    if setting is None:
+        setting = SystemSetting(key=key, value=str(value), description=description or DEFAULTS.get(key, (None, None))[1])
+        db.session.add(setting)
+    else:
+        setting.value = str(value)
+        if description is not None:
+            setting.description = description
+    _bump_version()
+    db.session.commit()
+    # Reload in this worker right away; the others follow within the check interval
+    _state['checked_at'] = 0.0
+
+def settings_version():
+    """Current settings version of this worker (for clients that cache settings)"""
+    get_all_settings()
+    return _state['version']
+
+def seed_settings():
+    """Fill an empty table from sys_settings.json, then from DEFAULTS.
+    
+    Runs in its own transaction; does nothing once the table has been seeded.
+    """
+    table = SystemSetting.__table__
+    values = {}
+    try:
+        if os.path.exists(LEGACY_SETTINGS_FILE):
+            with open(LEGACY_SETTINGS_FILE, 'r', encoding='utf-8') as f:
+                values = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not import {LEGACY_SETTINGS_FILE}: {e}")
+
+    for key, (value, description) in DEFAULTS.items():
+        entry = values.get(key, {})
+        values[key] = {'value': entry.get('value', value), 'description': entry.get('description', description)}
+    try:
+        with db.engine.begin() as connection:
+            existing = {row[0] for row in connection.execute(db.select(table.c.key))}
+            if VERSION_KEY in existing:
+                return
+            rows = [
+                {'key': key, 'value': str(entry['value']), 'description': entry.get('description')}
+                for key, entry in values.items()
+                if key not in existing and isinstance(entry, dict) and 'value' in entry
+            ]
+            rows.append({'key': VERSION_KEY, 'value': '1', 'description': VERSION_DESCRIPTION})
+            connection.execute(table.insert(), rows)
+    except IntegrityError:
+        # Another worker seeded the table first
+        pass
+
+def _read_version():
+    table = SystemSetting.__table__
+    with db.engine.connect() as connection:
+        value = connection.execute(db.select(table.c.value).where(table.c.key == VERSION_KEY)).scalar()
+    return int(value) if value is not None else None
+
+def _bump_version():
+    # Increment in SQL so concurrent writers serialize on the row instead of
+    # overwriting each other's counter
+    updated = SystemSetting.query.filter_by(key=VERSION_KEY).update(
+        {SystemSetting.value: db.cast(db.cast(SystemSetting.value, db.Integer) + 1, db.Text)},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(SystemSetting(key=VERSION_KEY, value='1', description=VERSION_DESCRIPTION))
@@ -0,0 +1,186 @@
+# Pre-serialized response snapshots
+#
+# A snapshot is a fully serialized response body kept on disk under
+# <SNAPSHOT_CACHE_PATH> together with its gzip encoding, so every worker process
+# serves the same bytes. Each snapshot has a small version file; invalidating
+# rewrites it, which every worker notices on its next request, and a snapshot
+# built from data read before the invalidation is never served afterwards.
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from flask import request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from backend.config import Config
+from backend.utils.cache import TTLCache
+
+class Snapshot:
+    """Serialized body, its gzip encoding and ETag"""
+
+    def __init__(self, version, body, gzip_body):
+        self.version = version
+        self.body = body
+        self.gzip_body = gzip_body
+        self.etag = hashlib.sha256(body).hexdigest()
+
+
+class SnapshotCache:
+    """One named snapshot, rebuilt on demand after it is invalidated"""
+
+    def __init__(self, name):
+        self.name = name
+        self._snapshot = None
+        self._build_lock = threading.Lock()
+
+    def get(self, build):
+        """Return the current Snapshot, calling build() -> bytes if there is none"""
+        version = self._read_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+        with self._build_lock:
+            snapshot = self._load(version)
+            if snapshot is None:
+                body = build()
+                snapshot = Snapshot(version, body, gzip.compress(body, compresslevel=9))
+                # Written under the version read before building, so a concurrent
+                # invalidation leaves this snapshot unreachable
+                self._write(self._path(version), snapshot.body)
+                self._write(self._path(version) + '.gz', snapshot.gzip_body)
+            self._snapshot = snapshot
+            return snapshot
+
+    def version(self):
+        """Current version; it changes on every invalidation"""
+        return self._read_version()
+
+    def invalidate(self):
+        """Discard the snapshot in every worker; the next request rebuilds it"""
+        old_version = self._read_version()
+        self._write(self._version_path(), uuid.uuid4().hex.encode('ascii'))
+        self._snapshot = None
+        for path in (self._path(old_version), self._path(old_version) + '.gz'):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _root(self):
+        return os.path.abspath(Config.SNAPSHOT_CACHE_PATH)
+
+    def _version_path(self):
+        return os.path.join(self._root(), f'{self.name}.version')
+
+    def _path(self, version):
+        return os.path.join(self._root(), f'{self.name}.{version}')
+
+    def _read_version(self):
+        try:
+            with open(self._version_path(), 'rb') as f:
+                return f.read().decode('ascii') or '0'
+        except FileNotFoundError:
+            return '0'
+
+    def _load(self, version):
+        try:
+            with open(self._path(version), 'rb') as f:
+                body = f.read()
+            with open(self._path(version) + '.gz', 'rb') as f:
+                gzip_body = f.read()
+        except FileNotFoundError:
+            return None
+        return Snapshot(version, body, gzip_body)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class ScopedSnapshotCache(SnapshotCache):
+    """Snapshots of one dataset per scope (e.g. per user), kept in each worker's memory.
+
+    Scoped snapshots are only built on request, so they are not written to
+    disk; the version file is shared as for SnapshotCache, and invalidating it
+    drops every scope's snapshot in every worker.
+    """
+
+    def __init__(self, name, ttl, max_entries):
+        super().__init__(name)
+        self._snapshots = TTLCache(ttl=ttl, max_entries=max_entries)
+
+    def get(self, scope, build):
+        """Return the current Snapshot for scope, calling build() -> bytes if there is none"""
+        version = self._read_version()
+        # Keyed by the version read before building, like SnapshotCache
+        key = (version, scope)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            body = build()
+            snapshot = Snapshot(version, body, gzip.compress(body))
+            self._snapshots.set(key, snapshot)
+        return snapshot
+
+    def invalidate(self):
+        """Discard the snapshots of all scopes in every worker"""
+        self._write(self._version_path(), uuid.uuid4().hex.encode('ascii'))
+        self._snapshots.invalidate()
+
+
+def send_snapshot(snapshot, mimetype='application/json', private=False):
+    """Serve a snapshot with ETag/304 handling, gzip-encoded when the client accepts it.
+
+    private=True keeps authenticated or per-user data out of shared caches.
+    """
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = Response(snapshot.gzip_body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+        # Each encoding is a different representation and needs its own ETag
+        response.set_etag(f'{snapshot.etag}-gzip')
+    else:
+        response = Response(snapshot.body, mimetype=mimetype)
+        response.set_etag(snapshot.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Caches may keep it, but must revalidate so edits show up at once
+    if private:
+        response.cache_control.private = True
+    else:
+        response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def invalidate_on_commit(cache, *models):
+    """Invalidate a cache after any commit that inserts, updates or deletes one of models.
+
+    cache is anything with an invalidate() method (a SnapshotCache or TTLCache).
+    """
+    key = f'invalidate_cache_{id(cache)}'
+
+    def mark_changed(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            session.info[key] = True
+
+    for model in models:
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, mark_changed)
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidate_changed(session):
+        if session.info.pop(key, False):
+            cache.invalidate()
+
+    @event.listens_for(Session, 'after_rollback')
+    def forget_changes(session):
+        session.info.pop(key, None)
@@ -0,0 +1,66 @@
+# Streaming response utilities
+
+import json
+import zipfile
+from flask import Response, stream_with_context
+
+def ndjson_response(rows, serialize, trailer):
+    """Stream rows as newline-delimited JSON while they are fetched.
+
+    serialize(row) returns the dict for one line (or None to skip the row).
+    trailer() is called after the last row and sent as a final {"meta": ...}
+    line, so it can report values only known at the end such as next_cursor.
+    """
+    def generate():
+        for row in rows:
+            item = serialize(row)
+            if item is not None:
+                yield json.dumps(item, ensure_ascii=False) + '\n'
+        yield json.dumps({'meta': trailer()}, ensure_ascii=False) + '\n'
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.cache_control.no_store = True
+    # Ask reverse proxies (nginx) to pass chunks through instead of buffering
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class _ZipSink:
+    """Write-only file object that hands over what ZipFile wrote since the last take()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_response(entries, download_name):
+    """Stream a ZIP archive of (name, bytes) entries as they are produced.
+
+    Each entry is sent as soon as it is added, so only one is held in memory;
+    the sink is not seekable, so ZipFile writes sizes in data descriptors.
+    """
+    def generate():
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, data in entries:
+                archive.writestr(name, data)
+                yield sink.take()
+        # Central directory
+        yield sink.take()
+    
+    response = Response(stream_with_context(generate()), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    response.cache_control.no_store = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
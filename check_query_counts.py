@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Query count check for the visit report list and search endpoints:
+- Builds and seeds a throwaway database like check_query_plans.py
+- Requests a page of each listing with growing page sizes, as each role
+- Counts the SQL statements every request runs
+
+A page must cost the same number of queries whatever its size: related rows
+are loaded in batches, never one query per report. Exits with status 1 when
+the count changes with the page size (an N+1 query crept in) or a page comes
+back shorter than requested.
+
+Usage: python check_query_counts.py [--page-sizes 5 15 30]
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+from sqlalchemy import event
+from backend.models import db
+from check_query_plans import PASSWORD, create_app, seed
+
+# Listings whose pages must cost a fixed number of queries
+ENDPOINTS = [
+    '/api/visit-reports/list',
+    '/api/visit-reports/search?q=shelf',
+    '/api/visit-reports/search?q=client',
+]
+
+def count_queries(app, headers, path):
+    """(statements run, rows returned) for one request"""
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    if response.status_code != 200:
+        raise RuntimeError(f'GET {path} answered {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return len(statements), len(response.get_json()['reports'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that report list pages cost a fixed number of queries')
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[5, 15, 30], help='per_page values to compare')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='query-counts-')
+    try:
+        app = create_app(directory)
+        problems = 0
+        with app.app_context():
+            seeded = seed(clients=200, reports=500)
+            client = app.test_client()
+            for role, username in seeded['users'].items():
+                token = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD}).get_json()['token']
+                headers = {'Authorization': f'Bearer {token}'}
+                for endpoint in ENDPOINTS:
+                    separator = '&' if '?' in endpoint else '?'
+                    # Warm up the per-process caches (verified identity) so only the page itself is counted
+                    count_queries(app, headers, endpoint)
+                    counts = {}
+                    for per_page in args.page_sizes:
+                        queries, rows = count_queries(app, headers, f'{endpoint}{separator}per_page={per_page}')
+                        counts[per_page] = queries
+                        if rows != per_page:
+                            problems += 1
+                            print(f'SHORT PAGE: {role} GET {endpoint} per_page={per_page} returned {rows} reports')
+                    constant = len(set(counts.values())) == 1
+                    if not constant:
+                        problems += 1
+                    summary = ', '.join(f'{per_page}: {queries}' for per_page, queries in counts.items())
+                    print(f"{'OK' if constant else 'GROWS'}: {role} GET {endpoint} queries per page size ({summary})")
+            db.engine.dispose()
+
+        print(f'\n{problems} problems')
+        return 1 if problems else 0
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Query plan check for the API endpoints:
+- Builds a throwaway database from the models (the same schema init_database creates)
+- Seeds users of every role, clients, products and visit reports
+- Calls each read endpoint as each role and records the SQL it runs
+- Runs EXPLAIN QUERY PLAN on every distinct SELECT and flags full table scans
+
+Exits with status 1 when a query scans a table that is not listed in
+ALLOWED_SCANS, so a dropped index or a new unindexed filter is caught before
+it reaches a database large enough to notice.
+
+Usage: python check_query_plans.py [--clients 200] [--reports 500] [--verbose]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+from datetime import date, timedelta
+from flask import Flask
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from backend.config import Config
+from backend.models import (db, User, UserRole, Client, ClientImage, Product, ProductImage,
+                            VisitReport, VisitReportImage, VisitReportNote, VisitReportProduct)
+
+PASSWORD = 'plan-check'
+
+# Stand-in image bytes; only the queries around images matter here
+IMAGE = b'image'
+
+# Tables that are meant to be read whole, with the reason
+ALLOWED_SCANS = {
+    'products': 'the catalogue and product dropdown list every product',
+    'users': 'user management lists every user; the table stays small',
+    'system_settings': 'all settings are loaded into the per-process copy',
+}
+
+# Read endpoints per role; {client}, {product}, {report} and {salesman} are seeded ids
+ENDPOINTS = [
+    '/api/dashboard/stats',
+    '/api/clients/list',
+    '/api/clients/list?region=Region 1',
+    '/api/clients/list?salesman=Salesman 1',
+    '/api/clients/search?q=client',
+    '/api/clients/search?q=client&region=Region 1',
+    '/api/clients/names',
+    '/api/clients/names-with-salesman',
+    '/api/clients/filter-data',
+    '/api/clients/{client}',
+    '/api/products/list',
+    '/api/products/names',
+    '/api/products/search?q=product',
+    '/api/products/{product}',
+    '/api/products/{product}/images',
+    '/api/visit-reports/list?per_page=5',
+    '/api/visit-reports/search?q=client&per_page=5',
+    '/api/visit-reports/search?q=shelf&per_page=5',
+    '/api/visit-reports/{report}',
+    '/api/visit-reports/{report}/images',
+    '/api/visit-reports/form-bootstrap',
+    '/api/salesmen',
+    '/api/salesmen/{salesman}/clients',
+    '/api/supervisors/salesmen',
+    '/api/supervisors/salesmen/{salesman}/clients',
+    '/api/users/all',
+    '/api/settings',
+]
+
+# Listings whose next page (keyset cursor) is requested as well
+CURSOR_ENDPOINTS = ['/api/visit-reports/list?per_page=5', '/api/clients/list?per_page=5']
+
+_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?')
+
+def create_app(directory):
+    """Flask app on a fresh database in directory, with every blueprint registered"""
+    Config.SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(directory, 'plans.db')
+    Config.BLOB_STORE_PATH = os.path.join(directory, 'blobs')
+    Config.SNAPSHOT_CACHE_PATH = os.path.join(directory, 'snapshots')
+    Config.PDF_CACHE_PATH = os.path.join(directory, 'pdfs')
+    Config.JOB_PROGRESS_PATH = os.path.join(directory, 'progress')
+
+    app = Flask(__name__, static_folder='frontend')
+    app.config['SECRET_KEY'] = Config.SECRET_KEY
+    app.config['SQLALCHEMY_DATABASE_URI'] = Config.SQLALCHEMY_DATABASE_URI
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = Config.JWT_SECRET_KEY
+
+    from database.init import init_database
+    from backend.routes import register_blueprints
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_database(app)
+        register_blueprints(app)
+    return app
+
+def seed(clients, reports):
+    """Users of every role and a spread of clients, products and reports; returns the ids to request"""
+    password_hash = generate_password_hash(PASSWORD)
+    admin = User(username='plan-admin', email='plan-admin@example.com', password_hash=password_hash, role=UserRole.SUPER_ADMIN)
+    supervisor = User(username='plan-supervisor', email='plan-supervisor@example.com', password_hash=password_hash, role=UserRole.SALES_SUPERVISOR)
+    db.session.add_all([admin, supervisor])
+    db.session.flush()
+    salesmen = [
+        User(username=f'plan-salesman-{n}', email=f'plan-salesman-{n}@example.com', password_hash=password_hash,
+             role=UserRole.SALESMAN, supervisor_id=supervisor.id if n % 2 else None)
+        for n in range(4)
+    ]
+    db.session.add_all(salesmen)
+    db.session.flush()
+    owners = [supervisor] + salesmen
+
+    products = [Product(name=f'Product {n}', taxed_price_store=10 + n, taxed_price_client=12 + n) for n in range(50)]
+    db.session.add_all(products)
+    db.session.flush()
+    db.session.add_all(ProductImage(product_id=product.id, filename='product.jpg', image_data=IMAGE) for product in products[:10])
+
+    client_rows = [
+        Client(name=f'Client {n}', region=f'Region {n % 7}', address=f'Street {n}', salesman_name=f'Salesman {n % 5}',
+               assigned_user_id=owners[n % len(owners)].id, is_active=n % 10 != 0)
+        for n in range(clients)
+    ]
+    db.session.add_all(client_rows)
+    db.session.flush()
+    db.session.add_all(ClientImage(client_id=client.id, filename='client.jpg', image_data=IMAGE) for client in client_rows[::5])
+
+    today = date.today()
+    for n in range(reports):
+        client = client_rows[n % len(client_rows)]
+        report = VisitReport(client_id=client.id, user_id=client.assigned_user_id,
+                             visit_date=today - timedelta(days=n % 90), is_active=n % 20 != 0)
+        report.notes.append(VisitReportNote(note_text=f'Shelf check {n}'))
+        report.products.append(VisitReportProduct(product_id=products[n % len(products)].id, displayed_price=11))
+        if n % 3 == 0:
+            report.images.append(VisitReportImage(filename='visit.jpg', image_data=IMAGE))
+        db.session.add(report)
+    db.session.commit()
+
+    salesman = salesmen[1]
+    return {
+        'users': {'admin': admin.username, 'supervisor': supervisor.username, 'salesman': salesman.username},
+        'ids': {
+            'client': Client.query.filter_by(assigned_user_id=salesman.id).first().id,
+            'product': products[0].id,
+            'report': VisitReport.query.filter_by(user_id=salesman.id).first().id,
+            'salesman': salesman.id,
+        },
+    }
+
+def capture_statements(app, users, ids):
+    """Call every endpoint as every role; returns {statement: (parameters, endpoints)}"""
+    statements = {}
+    current = {'endpoint': None}
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if current['endpoint'] and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            entry = statements.setdefault(statement, (parameters, set()))
+            entry[1].add(current['endpoint'])
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    client = app.test_client()
+    for role, username in users.items():
+        response = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+        headers = {'Authorization': f"Bearer {response.get_json()['token']}"}
+        for endpoint in ENDPOINTS:
+            path = endpoint.format(**ids)
+            current['endpoint'] = f'{role} GET {endpoint}'
+            response = client.get(path, headers=headers)
+            if response.status_code >= 500:
+                print(f'  ! {current["endpoint"]} answered {response.status_code}')
+            next_cursor = (response.get_json(silent=True) or {}).get('next_cursor') if endpoint in CURSOR_ENDPOINTS else None
+            if next_cursor:
+                current['endpoint'] = f'{role} GET {endpoint} (next page)'
+                client.get(f'{path}&cursor={next_cursor}', headers=headers)
+            current['endpoint'] = None
+    event.remove(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def full_scans(connection, statement, parameters, tables):
+    """(plan, [(table, index)]) for the tables the statement reads in full"""
+    plan = [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+    scans = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if match and match.group(1) in tables:
+            scans.append((match.group(1), match.group(2)))
+    return plan, scans
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag full table scans in the queries of the API endpoints')
+    parser.add_argument('--clients', type=int, default=200, help='clients to seed')
+    parser.add_argument('--reports', type=int, default=500, help='visit reports to seed')
+    parser.add_argument('--verbose', action='store_true', help='print the plan of every query')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='query-plans-')
+    try:
+        app = create_app(directory)
+        with app.app_context():
+            seeded = seed(args.clients, args.reports)
+            statements = capture_statements(app, seeded['users'], seeded['ids'])
+
+            problems = 0
+            with db.engine.connect() as connection:
+                # Virtual (FTS) tables are searched through MATCH, never scanned row by row
+                tables = {row[0] for row in connection.exec_driver_sql(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL TABLE%'"
+                )}
+                for statement, (parameters, endpoints) in statements.items():
+                    plan, scans = full_scans(connection, statement, parameters, tables)
+                    unexpected = [(table, index) for table, index in scans if table not in ALLOWED_SCANS]
+                    if unexpected:
+                        problems += 1
+                    if unexpected or args.verbose:
+                        print('\n' + ('FULL SCAN: ' + ', '.join(
+                            table + (f' (whole index {index})' if index else '') for table, index in unexpected
+                        ) if unexpected else 'OK'))
+                        for endpoint in sorted(endpoints):
+                            print(f'  {endpoint}')
+                        print('  ' + ' '.join(statement.split()))
+                        for detail in plan:
+                            print(f'    {detail}')
+
+            db.engine.dispose()
+
+        print(f'\n{len(statements)} distinct queries checked, {problems} with full table scans')
+        return 1 if problems else 0
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# Database engine setup
+#
+# SQLite allows one writer at a time. In WAL mode readers keep reading the last
+# committed state while a write is in progress, so listing and reading reports
+# never waits on a report upload; writers queue on the lock for up to
+# SQLITE_BUSY_TIMEOUT instead of failing with "database is locked". The
+# pragmas below are per connection and are applied to every connection the
+# pool opens. Each worker process has its own pool.
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from backend.config import Config
+
+def is_sqlite_file(uri):
+    """True for a SQLite database stored in a file (not in memory)"""
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    if not is_sqlite_file(uri):
+        return {}
+    return {
+        'pool_size': Config.SQLITE_POOL_SIZE,
+        'max_overflow': Config.SQLITE_POOL_MAX_OVERFLOW,
+        'pool_timeout': Config.SQLITE_POOL_TIMEOUT,
+    }
+
+def connection_pragmas():
+    """PRAGMA statements run on each new connection, in order"""
+    return [
+        # First, so switching the journal mode waits for other connections too
+        f'PRAGMA busy_timeout = {int(Config.SQLITE_BUSY_TIMEOUT)}',
+        f'PRAGMA journal_mode = {Config.SQLITE_JOURNAL_MODE}',
+        f'PRAGMA synchronous = {Config.SQLITE_SYNCHRONOUS}',
+        f'PRAGMA mmap_size = {int(Config.SQLITE_MMAP_SIZE)}',
+        f'PRAGMA cache_size = {int(Config.SQLITE_CACHE_SIZE)}',
+        f'PRAGMA temp_store = {Config.SQLITE_TEMP_STORE}',
+    ]
+
+def configure_engine(engine):
+    """Apply connection_pragmas() to every connection a SQLite engine opens"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = connection_pragmas()
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
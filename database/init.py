@@ -3,6 +3,9 @@
 from flask import Flask
 from flask_migrate import Migrate
 from backend.models import db, User, Person, Client, Product, UserRole  # Import from backend.models!
+from backend.search.fts import ensure_search_indexes
+from database.engine import configure_engine, engine_options
+from backend.utils.settings import seed_settings
 from werkzeug.security import generate_password_hash
 import os
 
@@ -10,13 +13,25 @@ migrate = Migrate()
 
 def init_database(app):
     """Initialize database with Flask app"""
+    # Pool sizing must be set before the engine is created
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
     db.init_app(app)
     migrate.init_app(app, db)
     
     with app.app_context():
+        # WAL and the other connection pragmas, before the first connection opens
+        configure_engine(db.engine)
+        
         # Create all tables
         db.create_all()
         
+        # Full-text search tables and their triggers (not part of the models)
+        with db.engine.begin() as connection:
+            ensure_search_indexes(connection)
+        
+        # System settings with their defaults (own transaction)
+        seed_settings()
+        
         # Create default super admin user if not exists
         create_default_admin()
 
@@ -85,5 +100,8 @@ def reset_database(app):
     with app.app_context():
         db.drop_all()
         db.create_all()
+        with db.engine.begin() as connection:
+            ensure_search_indexes(connection, rebuild=True)
+        seed_settings()
         create_default_admin()
         print("Database reset complete!")
@@ -553,33 +553,100 @@ function getAuthHeaders() {
     };
 }
 
+// Fetch thumbnails for many ids with one request per batch (binary records:
+// 4-byte id, 4-byte length, image bytes) and hand each one over as an object URL.
+// GET so the browser cache answers repeat visits of an unchanged list
+const THUMBNAIL_BATCH_SIZE = 200;
+
+async function fetchThumbnailBatch(resource, ids, onThumbnail, size = '128', signal = undefined) {
+    for (let start = 0; start < ids.length; start += THUMBNAIL_BATCH_SIZE) {
+        const batch = ids.slice(start, start + THUMBNAIL_BATCH_SIZE).join(',');
+        const response = await fetch(`${API_BASE_URL}/${resource}/thumbnails?ids=${batch}&size=${encodeURIComponent(size)}`, {
+            headers: getAuthHeaders(),
+            signal: signal
+        });
+        if (!response.ok) {
+            console.error(`Failed to load ${resource} thumbnails:`, response.status);
+            continue;
+        }
+
+        const buffer = await response.arrayBuffer();
+        const view = new DataView(buffer);
+        let offset = 0;
+        while (offset + 8 <= buffer.byteLength) {
+            const id = view.getUint32(offset);
+            const length = view.getUint32(offset + 4);
+            offset += 8;
+            onThumbnail(id, URL.createObjectURL(new Blob([buffer.slice(offset, offset + length)])));
+            offset += length;
+        }
+    }
+}
+
+// Show an object URL from fetchThumbnailBatch as the only content of container.
+// The URL is revoked once the image has decoded (or failed), and right away
+// when the container is gone, so re-rendered lists do not keep old image data
+function showThumbnail(container, url, alt) {
+    if (!container) {
+        URL.revokeObjectURL(url);
+        return;
+    }
+    const img = document.createElement('img');
+    const revoke = () => URL.revokeObjectURL(url);
+    img.addEventListener('load', revoke, { once: true });
+    img.addEventListener('error', revoke, { once: true });
+    img.alt = alt;
+    img.src = url;
+    container.replaceChildren(img);
+}
+
+// Read a newline-delimited JSON response (?format=ndjson) as it arrives and hand
+// the rows over chunk by chunk; resolves with the trailing {"meta": ...} line
+async function fetchNdjson(url, onRows, signal = undefined) {
+    const response = await fetch(url, { headers: getAuthHeaders(), signal: signal });
+    if (!response.ok) {
+        throw new Error(`Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let pending = '';
+    let meta = null;
+    while (true) {
+        const { done, value } = await reader.read();
+        pending += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = pending.split('\n');
+        pending = done ? '' : lines.pop();
+
+        const rows = [];
+        for (const line of lines) {
+            if (!line.trim()) continue;
+            const item = JSON.parse(line);
+            if (item.meta) {
+                meta = item.meta;
+            } else {
+                rows.push(item);
+            }
+        }
+        if (rows.length) onRows(rows);
+        if (done) break;
+    }
+    return meta;
+}
+
 // Load dashboard data
 async function loadDashboardData() {
     try {
-        // Use the same fast paginated endpoints as page counters
-        const [clientsResponse, productsResponse, reportsResponse] = await Promise.all([
-            fetch(`${API_BASE_URL}/clients/list?page=1&per_page=1`, {
-                headers: getAuthHeaders()
-            }),
-            fetch(`${API_BASE_URL}/products/list?page=1&per_page=1`, {
-                headers: getAuthHeaders()
-            }),
-            fetch(`${API_BASE_URL}/visit-reports/list?page=1&per_page=1`, {
-                headers: getAuthHeaders()
-            })
-        ]);
-
-        if (clientsResponse.ok && productsResponse.ok && reportsResponse.ok) {
-            const [clientsData, productsData, reportsData] = await Promise.all([
-                clientsResponse.json(),
-                productsResponse.json(),
-                reportsResponse.json()
-            ]);
-
-            // Update dashboard counters using total from pagination (same as page counters)
-            document.getElementById('totalClients').textContent = clientsData.total || 0;
-            document.getElementById('totalProducts').textContent = productsData.total || 0;
-            document.getElementById('monthlyReports').textContent = reportsData.total || 0;
+        // All counters in one request, computed and cached per role scope on the server
+        const response = await fetch(`${API_BASE_URL}/dashboard/stats`, {
+            headers: getAuthHeaders()
+        });
+
+        if (response.ok) {
+            const stats = await response.json();
+            document.getElementById('totalClients').textContent = stats.total_clients || 0;
+            document.getElementById('totalProducts').textContent = stats.total_products || 0;
+            document.getElementById('monthlyReports').textContent = stats.monthly_reports || 0;
         } else {
             console.error('Failed to load dashboard data');
         }
@@ -727,6 +794,9 @@ window.switchToEnglish = switchToEnglish;
 window.switchToArabic = switchToArabic;
 window.updateUserGreeting = updateUserGreeting;
 window.getAuthHeaders = getAuthHeaders;
+window.fetchThumbnailBatch = fetchThumbnailBatch;
+window.showThumbnail = showThumbnail;
+window.fetchNdjson = fetchNdjson;
 window.loadDashboardData = loadDashboardData;
 window.checkAuthentication = checkAuthentication;
 window.setupUserInterface = setupUserInterface;
@@ -470,6 +470,7 @@ const ClientManager = {
                 // Store pagination info for infinite scroll
                 this.currentPage = data.page || 1;
                 this.hasMoreClients = data.has_more || false;
+                this.nextClientsCursor = data.next_cursor || null;
                 this.totalClients = data.total || clients.length;
 
                 // Add load more button if there are more clients
@@ -489,45 +490,28 @@ const ClientManager = {
     },
 
     loadClientThumbnails: async function (clients) {
-        /**Load thumbnails for clients that have them - called after displaying cards*/
+        /**Load thumbnails for clients that have them in batched requests - called after displaying cards*/
 
         // Cancel any previous thumbnail loading
         if (this.thumbnailAbortController) {
             this.thumbnailAbortController.abort();
         }
         this.thumbnailAbortController = new AbortController();
-        const signal = this.thumbnailAbortController.signal;
 
-        const clientsWithThumbnails = clients.filter(client => client.has_thumbnail);
+        const clientIds = clients.filter(client => client.has_thumbnail).map(client => client.id);
 
-        for (const client of clientsWithThumbnails) {
-            // Check if aborted (user clicked to expand a client)
-            if (signal.aborted) {
-                console.log('🛑 Thumbnail loading cancelled - priority request');
-                break;
-            }
-
-            try {
-                const response = await fetch(`${API_BASE_URL}/clients/${client.id}/thumbnail`, {
-                    headers: getAuthHeaders(),
-                    signal: signal  // Allow aborting this request
-                });
-
-                if (response.ok) {
-                    const data = await response.json();
-                    const avatarElement = document.querySelector(`[data-client-id="${client.id}"]`);
-                    if (avatarElement && data.thumbnail) {
-                        avatarElement.innerHTML = `<img src="data:image/jpeg;base64,${data.thumbnail}" alt="${client.name}">`;
-                    }
-                }
-            } catch (error) {
-                if (error.name === 'AbortError') {
-                    console.log('🛑 Thumbnail request aborted for priority');
-                    break;  // Stop loading more thumbnails
-                }
-                console.error(`Error loading thumbnail for client ${client.id}:`, error);
-                // Keep the loading indicator or show placeholder
+        try {
+            await fetchThumbnailBatch('clients', clientIds, (clientId, url) => {
+                const avatarElement = document.querySelector(`.client-avatar[data-client-id="${clientId}"]`);
+                const client = clients.find(c => c.id === clientId);
+                showThumbnail(avatarElement, url, client ? client.name : '');
+            }, '128', this.thumbnailAbortController.signal);
+        } catch (error) {
+            if (error.name === 'AbortError') {
+                console.log('🛑 Thumbnail request aborted for priority');
+                return;
             }
+            console.error('Error loading client thumbnails:', error);
         }
     },
 
@@ -662,7 +646,10 @@ const ClientManager = {
 
         try {
             const nextPage = this.currentPage + 1;
-            let apiUrl = `${API_BASE_URL}/clients/list?page=${nextPage}`;
+            // Continue from the cursor of the last page; fall back to offset paging
+            let apiUrl = this.nextClientsCursor
+                ? `${API_BASE_URL}/clients/list?cursor=${encodeURIComponent(this.nextClientsCursor)}&include_total=false`
+                : `${API_BASE_URL}/clients/list?page=${nextPage}`;
             if (this.currentStatusFilter === 'all' || this.currentStatusFilter === 'inactive') {
                 apiUrl += '&show_all=true';
             }
@@ -679,8 +666,9 @@ const ClientManager = {
                 this.currentClients = [...this.currentClients, ...newClients];
 
                 // Update pagination info
-                this.currentPage = data.page;
+                this.currentPage = nextPage;
                 this.hasMoreClients = data.has_more;
+                this.nextClientsCursor = data.next_cursor || null;
 
                 // Display new clients
                 this.displayClients(newClients, true); // true = append mode
@@ -989,7 +977,7 @@ const ClientManager = {
             const statusFilter = document.getElementById('clientStatusFilter');
             const currentStatus = statusFilter ? statusFilter.value : 'active';
 
-            let apiUrl = `${API_BASE_URL}/clients/list?page=1&per_page=10000`;
+            let apiUrl = `${API_BASE_URL}/clients/list?page=1&per_page=10000&format=ndjson`;
             if (currentStatus === 'all' || currentStatus === 'inactive') {
                 apiUrl += '&show_all=true';
             }
@@ -1002,42 +990,43 @@ const ClientManager = {
 
             console.log('📡 Filter API URL:', apiUrl);
 
-            const response = await fetch(apiUrl, {
-                headers: getAuthHeaders()
-            });
-
-            if (response.ok) {
-                const data = await response.json();
-                const filteredClients = data.clients || [];
+            // Stream the results so the first cards render before the whole list arrives
+            const filteredClients = [];
+            const meta = await fetchNdjson(apiUrl, (rows) => {
+                const append = filteredClients.length > 0;
+                filteredClients.push(...rows);
 
                 // ✅ IMPORTANT: Store filtered clients so view/edit/delete functions can access them
                 this.currentClients = filteredClients;
 
                 // Display results
-                this.displayClients(filteredClients, false, true); // fromFilter = true
+                this.displayClients(rows, append, true); // fromFilter = true
+            });
 
-                // Load thumbnails
-                this.loadClientThumbnails(filteredClients);
+            if (filteredClients.length === 0) {
+                this.currentClients = filteredClients;
+                this.displayClients(filteredClients, false, true);
+            }
 
-                // --- FIX: Disable infinite scroll for filtered results ---
-                const loadMoreBtn = document.querySelector('#clientsList .load-more-button');
-                if (loadMoreBtn) {
-                    loadMoreBtn.remove();
-                }
-                // Disconnect any existing observers
-                if (this.loadMoreObserver) {
-                    this.loadMoreObserver.disconnect();
-                    this.loadMoreObserver = null;
-                }
-                this.hasMoreClients = false; // Prevent observer from firing
-                // ---------------------------------------------------------
+            // Load thumbnails
+            this.loadClientThumbnails(filteredClients);
 
-                // Update count
-                this.updateStatusIndicator('clients', currentStatus, data.total);
-                this.updateClientCount(filteredClients.length);
-            } else {
-                console.error('Failed to load filtered clients');
+            // --- FIX: Disable infinite scroll for filtered results ---
+            const loadMoreBtn = document.querySelector('#clientsList .load-more-button');
+            if (loadMoreBtn) {
+                loadMoreBtn.remove();
+            }
+            // Disconnect any existing observers
+            if (this.loadMoreObserver) {
+                this.loadMoreObserver.disconnect();
+                this.loadMoreObserver = null;
             }
+            this.hasMoreClients = false; // Prevent observer from firing
+            // ---------------------------------------------------------
+
+            // Update count
+            this.updateStatusIndicator('clients', currentStatus, meta ? meta.total : filteredClients.length);
+            this.updateClientCount(filteredClients.length);
         } catch (error) {
             console.error('Error loading filtered clients:', error);
         }
@@ -1050,50 +1039,50 @@ const ClientManager = {
             const statusFilter = document.getElementById('clientStatusFilter');
             const currentStatus = statusFilter ? statusFilter.value : 'active';
 
-            let apiUrl = `${API_BASE_URL}/clients/search?q=${encodeURIComponent(searchTerm)}&page=1&per_page=10000`;
+            let apiUrl = `${API_BASE_URL}/clients/search?q=${encodeURIComponent(searchTerm)}&page=1&per_page=10000&format=ndjson`;
             if (currentStatus === 'all' || currentStatus === 'inactive') {
                 apiUrl += '&show_all=true';
             }
+            // Region and salesman filters are applied by the server
+            if (selectedRegion.trim()) {
+                apiUrl += `&region=${encodeURIComponent(selectedRegion)}`;
+            }
+            if (selectedSalesman.trim()) {
+                apiUrl += `&salesman=${encodeURIComponent(selectedSalesman)}`;
+            }
 
-            const response = await fetch(apiUrl, {
-                headers: getAuthHeaders()
-            });
-
-            if (response.ok) {
-                const data = await response.json();
-                let searchResults = data.clients || [];
-
-                // Apply region and salesman filters locally
-                if (selectedRegion.trim()) {
-                    searchResults = searchResults.filter(client => client.region === selectedRegion);
-                }
-                if (selectedSalesman.trim()) {
-                    searchResults = searchResults.filter(client => client.salesman_name === selectedSalesman);
-                }
+            // Stream the results so the first cards render before the whole list arrives
+            const searchResults = [];
+            const meta = await fetchNdjson(apiUrl, (rows) => {
+                const append = searchResults.length > 0;
+                searchResults.push(...rows);
 
                 // ✅ IMPORTANT: Store search results so view/edit/delete functions can access them
                 this.currentClients = searchResults;
 
                 // Display results
-                this.displayClients(searchResults, false, true); // fromFilter = true
+                this.displayClients(rows, append, true); // fromFilter = true
+            });
 
-                // Load thumbnails for search results
-                this.loadClientThumbnails(searchResults);
+            if (searchResults.length === 0) {
+                this.currentClients = searchResults;
+                this.displayClients(searchResults, false, true);
+            }
 
-                // --- FIX: Disable infinite scroll for search results ---
-                const loadMoreBtn = document.querySelector('#clientsList .load-more-button');
-                if (loadMoreBtn) {
-                    loadMoreBtn.remove();
-                }
-                this.hasMoreClients = false; // Prevent observer from firing
-                // -------------------------------------------------------
+            // Load thumbnails for search results
+            this.loadClientThumbnails(searchResults);
 
-                // Update count
-                this.updateStatusIndicator('clients', currentStatus, data.total);
-                this.updateClientCount(searchResults.length);
-            } else {
-                console.error('Failed to search clients');
+            // --- FIX: Disable infinite scroll for search results ---
+            const loadMoreBtn = document.querySelector('#clientsList .load-more-button');
+            if (loadMoreBtn) {
+                loadMoreBtn.remove();
             }
+            this.hasMoreClients = false; // Prevent observer from firing
+            // -------------------------------------------------------
+
+            // Update count
+            this.updateStatusIndicator('clients', currentStatus, meta ? meta.total : searchResults.length);
+            this.updateClientCount(searchResults.length);
         } catch (error) {
             console.error('Error searching clients:', error);
         }
@@ -1527,7 +1516,7 @@ const ClientManager = {
         const currentImg = this.currentImagesList[this.currentImageIndex];
 
         if (img) {
-            img.src = `data:image/jpeg;base64,${currentImg.data}`;
+            img.src = currentImg.src || `data:image/jpeg;base64,${currentImg.data}`;
             img.alt = currentImg.title;
         }
 
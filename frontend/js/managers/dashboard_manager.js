@@ -7,37 +7,13 @@ const DashboardManager = {
     // Load dashboard data
     async load() {
         try {
-            // Load stats from multiple endpoints since no dedicated stats route
-            const [clientsRes, productsRes, reportsRes] = await Promise.all([
-                fetch(`${Config.API_BASE_URL}/clients/list?page=1&per_page=1`, {
-                    headers: Config.getAuthHeaders()
-                }),
-                fetch(`${Config.API_BASE_URL}/products/list?page=1&per_page=1`, {
-                    headers: Config.getAuthHeaders()
-                }),
-                fetch(`${Config.API_BASE_URL}/visit-reports/list?page=1&per_page=1`, {
-                    headers: Config.getAuthHeaders()
-                })
-            ]);
+            const response = await fetch(`${Config.API_BASE_URL}/dashboard/stats`, {
+                headers: Config.getAuthHeaders()
+            });
 
-            let totalClients = 0, totalProducts = 0, monthlyReports = 0;
-
-            if (clientsRes.ok) {
-                const data = await clientsRes.json();
-                totalClients = data.total || 0;
-            }
-
-            if (productsRes.ok) {
-                const data = await productsRes.json();
-                totalProducts = data.total || 0;
+            if (response.ok) {
+                this.updateStats(await response.json());
             }
-
-            if (reportsRes.ok) {
-                const data = await reportsRes.json();
-                monthlyReports = data.total || 0;
-            }
-
-            this.updateStats({ total_clients: totalClients, total_products: totalProducts, monthly_reports: monthlyReports });
         } catch (error) {
             console.error('Error loading dashboard:', error);
         }
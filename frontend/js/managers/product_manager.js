@@ -50,6 +50,7 @@ const ProductManager = {
                 // Store pagination info for infinite scroll
                 this.currentProductPage = data.page || 1;
                 this.hasMoreProducts = data.has_more || false;
+                this.nextProductsCursor = data.next_cursor || null;
                 this.totalProducts = data.total || products.length;
 
                 console.log(`ProductManager: hasMoreProducts = ${this.hasMoreProducts}, total = ${this.totalProducts}`);
@@ -71,26 +72,17 @@ const ProductManager = {
     },
 
     loadProductThumbnails: async function (products) {
-        /**Load thumbnails for products that have them - called after displaying cards*/
-        const productsWithThumbnails = products.filter(product => product.has_thumbnail);
+        /**Load thumbnails for products that have them in batched requests - called after displaying cards*/
+        const productIds = products.filter(product => product.has_thumbnail).map(product => product.id);
 
-        for (const product of productsWithThumbnails) {
-            try {
-                const response = await fetch(`${API_BASE_URL}/products/${product.id}/thumbnail`, {
-                    headers: getAuthHeaders()
-                });
-
-                if (response.ok) {
-                    const data = await response.json();
-                    const imageElement = document.querySelector(`[data-product-id="${product.id}"]`);
-                    if (imageElement && data.thumbnail) {
-                        imageElement.innerHTML = `<img src="data:image/jpeg;base64,${data.thumbnail}" alt="${product.name}">`;
-                    }
-                }
-            } catch (error) {
-                console.error(`Error loading thumbnail for product ${product.id}:`, error);
-                // Keep the loading indicator or show fallback
-            }
+        try {
+            await fetchThumbnailBatch('products', productIds, (productId, url) => {
+                const imageElement = document.querySelector(`[data-product-id="${productId}"]`);
+                const product = products.find(p => p.id === productId);
+                showThumbnail(imageElement, url, product ? product.name : '');
+            });
+        } catch (error) {
+            console.error('Error loading product thumbnails:', error);
         }
     },
 
@@ -153,7 +145,11 @@ const ProductManager = {
 
         try {
             const nextPage = this.currentProductPage + 1;
-            const response = await fetch(`${API_BASE_URL}/products/list?page=${nextPage}`, {
+            // Continue from the cursor of the last page; fall back to offset paging
+            const apiUrl = this.nextProductsCursor
+                ? `${API_BASE_URL}/products/list?cursor=${encodeURIComponent(this.nextProductsCursor)}&include_total=false`
+                : `${API_BASE_URL}/products/list?page=${nextPage}`;
+            const response = await fetch(apiUrl, {
                 headers: getAuthHeaders()
             });
 
@@ -165,8 +161,9 @@ const ProductManager = {
                 this.currentProducts = [...this.currentProducts, ...newProducts];
 
                 // Update pagination info
-                this.currentProductPage = data.page;
+                this.currentProductPage = nextPage;
                 this.hasMoreProducts = data.has_more;
+                this.nextProductsCursor = data.next_cursor || null;
 
                 // Display new products
                 this.displayProducts(newProducts, true); // true = append mode
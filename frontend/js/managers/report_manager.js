@@ -13,8 +13,6 @@ const ReportManager = {
         const modal = document.createElement('div');
         modal.className = 'modal-overlay';
 
-        // Load predefined notes
-        this.loadPredefinedNotes();
         modal.innerHTML = `
             <div class="modal-content large-modal">
                 <div class="modal-header">
@@ -217,9 +215,8 @@ const ReportManager = {
             }
         }
 
-        // Load clients and products for the dropdowns
-        this.loadClientsForDropdown();
-        this.loadProductsForDropdown();
+        // Load clients, products, predefined notes and price tolerance in one request
+        this.loadFormBootstrap();
     },
 
     loadReports: async function (statusFilter = 'active') {
@@ -270,6 +267,7 @@ const ReportManager = {
                 // Store pagination info for infinite scroll
                 this.currentReportPage = data.page || 1;
                 this.hasMoreReports = data.has_more || false;
+                this.nextReportsCursor = data.next_cursor || null;
                 this.totalReports = data.total || reports.length;
 
                 console.log(`ReportManager: hasMoreReports = ${this.hasMoreReports}, total = ${this.totalReports}`);
@@ -408,6 +406,11 @@ const ReportManager = {
                                             <path d="M19 8H5c-1.66 0-3 1.34-3 3v6h4v4h12v-4h4v-6c0-1.66-1.34-3-3-3zm-3 11H8v-5h8v5zm3-7c-.55 0-1-.45-1-1s.45-1 1-1 1 .45 1 1-.45 1-1 1zm-1-9H6v4h12V3z"/>
                                         </svg>
                                     </button>
+                                    <button class="btn-icon-stylish print-btn" onclick="ReportManager.downloadReportPdf(${report.id}, this)" title="${currentLanguage === 'ar' ? 'تحميل PDF' : 'Download PDF'}">
+                                        <svg viewBox="0 0 24 24" width="16" height="16">
+                                            <path d="M19 9h-4V3H9v6H5l7 7 7-7zM5 18v2h14v-2H5z"/>
+                                        </svg>
+                                    </button>
                                     <button class="btn-icon-stylish delete-btn" onclick="ReportManager.deleteReport(${report.id})" title="${currentLanguage === 'ar' ? 'إلغاء تفعيل' : 'Deactivate'}">
                                         <svg viewBox="0 0 24 24" width="16" height="16">
                                             <path d="M6 19c0 1.1.9 2 2 2h8c1.1 0 2-.9 2-2V7H6v12zM19 4h-3.5l-1-1h-5l-1 1H5v2h14V4z"/>
@@ -471,7 +474,10 @@ const ReportManager = {
 
         try {
             const nextPage = this.currentReportPage + 1;
-            let apiUrl = `${API_BASE_URL}/visit-reports/list?page=${nextPage}`;
+            // Continue from the cursor of the last page; fall back to offset paging
+            let apiUrl = this.nextReportsCursor
+                ? `${API_BASE_URL}/visit-reports/list?cursor=${encodeURIComponent(this.nextReportsCursor)}&include_total=false`
+                : `${API_BASE_URL}/visit-reports/list?page=${nextPage}`;
             if (this.currentStatusFilter === 'all' || this.currentStatusFilter === 'inactive') {
                 apiUrl += '&show_all=true';
             }
@@ -488,8 +494,9 @@ const ReportManager = {
                 this.currentReports = [...this.currentReports, ...newReports];
 
                 // Update pagination info
-                this.currentReportPage = data.page;
+                this.currentReportPage = nextPage;
                 this.hasMoreReports = data.has_more;
+                this.nextReportsCursor = data.next_cursor || null;
 
                 // Display new reports
                 this.displayReportsLazy(newReports, true); // true = append mode
@@ -507,65 +514,102 @@ const ReportManager = {
         }
     },
 
-    loadClientsForDropdown: async function () {
+    // Form data is kept in localStorage with its version; the server only sends
+    // it again when clients, products, notes or settings changed since
+    loadFormBootstrap: async function () {
+        const cacheKey = this.getFormBootstrapCacheKey();
+        let cached = null;
+        try {
+            cached = JSON.parse(localStorage.getItem(cacheKey) || 'null');
+        } catch (error) {
+            cached = null;
+        }
+
+        // Fill the form from the saved copy at once; the request only confirms it
+        if (cached) {
+            this.applyFormBootstrap(cached);
+        }
+
         try {
-            console.log('Loading clients for dropdown...');
-            // Use ultra-lightweight names-only endpoint for maximum speed
-            const response = await fetch(`${API_BASE_URL}/clients/names`, {
+            const query = cached ? `?since_version=${encodeURIComponent(cached.version)}` : '';
+            const response = await fetch(`${API_BASE_URL}/visit-reports/form-bootstrap${query}`, {
                 headers: getAuthHeaders()
             });
-            console.log('Clients API response status:', response.status);
-            if (response.ok) {
-                const clients = await response.json();
-                console.log(`Loaded ${clients.length} clients for dropdown`);
-                this.clientsData = clients; // Store for search functionality
-
-                const dropdown = document.getElementById('clientDropdown');
-                if (!dropdown) {
-                    console.error('clientDropdown element not found!');
-                    return;
-                }
+            if (!response.ok) {
+                console.error('Failed to load report form data, status:', response.status);
+                return;
+            }
 
-                dropdown.innerHTML = `<div class="dropdown-item" data-value="">${currentLanguage === 'ar' ? 'اختر العميل' : 'Select Client'}</div>`;
-                clients.forEach(client => {
-                    dropdown.innerHTML += `<div class="dropdown-item" data-value="${client.id}">${client.name}</div>`;
-                });
-                console.log('Client dropdown populated with', dropdown.children.length, 'items');
+            const data = await response.json();
+            if (data.not_modified) {
+                return;
+            }
 
-                this.initializeClientSearch();
-            } else {
-                console.error('Failed to load clients, status:', response.status);
+            try {
+                localStorage.setItem(cacheKey, JSON.stringify(data));
+            } catch (error) {
+                console.warn('Could not save report form data:', error);
             }
+            this.applyFormBootstrap(data);
         } catch (error) {
-            console.error('Error loading clients for dropdown:', error);
+            console.error('Error loading report form data:', error);
         }
     },
 
-    loadProductsForDropdown: async function () {
+    getFormBootstrapCacheKey: function () {
+        // One copy per user, so a shared device never shows another user's clients
+        let userId = '';
         try {
-            // Use ultra-lightweight names-only endpoint for maximum speed
-            const response = await fetch(`${API_BASE_URL}/products/names`, {
-                headers: getAuthHeaders()
-            });
-            if (response.ok) {
-                const products = await response.json();
-                this.productsData = products; // Store for search functionality
-
-                const dropdowns = document.querySelectorAll('.product-dropdown');
-                dropdowns.forEach(dropdown => {
-                    dropdown.innerHTML = `<div class="dropdown-item" data-value="">${currentLanguage === 'ar' ? 'اختر المنتج' : 'Select Product'}</div>`;
-                    products.forEach(product => {
-                        dropdown.innerHTML += `<div class="dropdown-item" data-value="${product.id}">${product.name}</div>`;
-                    });
-                });
-
-                this.initializeProductSearch();
-            }
+            userId = JSON.parse(localStorage.getItem('userInfo') || '{}').id || '';
         } catch (error) {
-            console.error('Error loading products for dropdown:', error);
+            userId = '';
+        }
+        return `reportFormBootstrap:${userId}`;
+    },
+
+    applyFormBootstrap: function (data) {
+        this.populateClientDropdown(data.clients || []);
+        this.populateProductDropdowns(data.products || []);
+
+        this.predefinedNotes = (data.predefined_notes && data.predefined_notes.questions) || [];
+        this.populatePredefinedQuestions();
+
+        if (typeof SettingsManager !== 'undefined') {
+            SettingsManager.currentSettings.price_tolerance = data.price_tolerance;
         }
     },
 
+    populateClientDropdown: function (clients) {
+        this.clientsData = clients; // Store for search functionality
+
+        const dropdown = document.getElementById('clientDropdown');
+        if (!dropdown) {
+            console.error('clientDropdown element not found!');
+            return;
+        }
+
+        dropdown.innerHTML = `<div class="dropdown-item" data-value="">${currentLanguage === 'ar' ? 'اختر العميل' : 'Select Client'}</div>`;
+        clients.forEach(client => {
+            dropdown.innerHTML += `<div class="dropdown-item" data-value="${client.id}">${client.name}</div>`;
+        });
+
+        this.initializeClientSearch();
+    },
+
+    populateProductDropdowns: function (products) {
+        this.productsData = products; // Store for search functionality
+
+        const dropdowns = document.querySelectorAll('.product-dropdown');
+        dropdowns.forEach(dropdown => {
+            dropdown.innerHTML = `<div class="dropdown-item" data-value="">${currentLanguage === 'ar' ? 'اختر المنتج' : 'Select Product'}</div>`;
+            products.forEach(product => {
+                dropdown.innerHTML += `<div class="dropdown-item" data-value="${product.id}">${product.name}</div>`;
+            });
+        });
+
+        this.initializeProductSearch();
+    },
+
     initializeClientSearch: function () {
         const searchInput = document.getElementById('clientSearchInput');
         const dropdown = document.getElementById('clientDropdown');
@@ -635,6 +679,10 @@ const ReportManager = {
 
             if (!searchInput || !dropdown || !hiddenInput) return;
 
+            // Prevent duplicate initialization (the form is filled again when fresher data arrives)
+            if (searchInput.dataset.initialized === 'true') return;
+            searchInput.dataset.initialized = 'true';
+
             // Handle input focus - show dropdown
             searchInput.addEventListener('focus', () => {
                 dropdown.style.display = 'block';
@@ -1304,7 +1352,8 @@ const ReportManager = {
 
     loadReportImages: async function (reportId) {
         try {
-            const response = await fetch(`${API_BASE_URL}/visit-reports/${reportId}/images`, {
+            // Only URLs: tiles load the 512px rendition, the viewer the full one
+            const response = await fetch(`${API_BASE_URL}/visit-reports/${reportId}/images?inline_images=false`, {
                 headers: getAuthHeaders()
             });
 
@@ -1319,7 +1368,7 @@ const ReportManager = {
                         <div class="gallery-grid">
                             ${data.images.map((img, index) => `
                                 <div class="gallery-item" onclick="ReportManager.viewReportImages(${reportId}, ${index})">
-                                    <img src="data:image/jpeg;base64,${img.data}" alt="${img.filename}" title="${img.filename}">
+                                    <img src="${img.url}?size=512&token=${localStorage.getItem('authToken')}" alt="${img.filename}" title="${img.filename}" loading="lazy">
                                     <div class="gallery-overlay">
                                         <span class="gallery-filename">${img.filename}</span>
                                         ${img.is_suggested_products ? `<span class="suggested-products-badge">${currentLanguage === 'ar' ? 'منتجات مقترحة' : 'Suggested Products'}</span>` : ''}
@@ -1351,14 +1400,15 @@ const ReportManager = {
         if (!report || !report.images || report.images.length === 0) return;
 
         // Use the ClientManager's image viewer (reuse functionality)
+        const token = localStorage.getItem('authToken');
         const allImages = report.images.map(img => ({
-            data: img.data,
+            src: `${img.url}?size=full&token=${token}`,
             filename: img.filename,
             title: img.filename || currentLanguage === 'ar' ? 'صورة الزيارة' : 'Visit Image'
         }));
 
         ClientManager.viewImageFullscreen(
-            `data:image/jpeg;base64,${allImages[startIndex].data}`,
+            allImages[startIndex].src,
             allImages[startIndex].title,
             allImages,
             startIndex
@@ -1380,6 +1430,37 @@ const ReportManager = {
         }
     },
 
+    downloadReportPdf: async function (reportId, button) {
+        // The PDF is rendered on the server; 202 means it is still being generated
+        if (button) button.disabled = true;
+        try {
+            const url = `${API_BASE_URL}/visit-reports/${reportId}/pdf`;
+            const headers = { 'Authorization': `Bearer ${localStorage.getItem('authToken')}` };
+            let response = await fetch(url, { headers });
+            while (response.status === 202) {
+                const retryAfter = parseInt(response.headers.get('Retry-After') || '5', 10);
+                await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+                response = await fetch(url, { headers });
+            }
+
+            if (!response.ok) {
+                throw new Error('Failed to generate PDF');
+            }
+
+            const blobUrl = URL.createObjectURL(await response.blob());
+            const link = document.createElement('a');
+            link.href = blobUrl;
+            link.download = `visit_report_${reportId}.pdf`;
+            link.click();
+            URL.revokeObjectURL(blobUrl);
+        } catch (error) {
+            console.error('Error downloading report PDF:', error);
+            alert(currentLanguage === 'ar' ? 'تعذر تحميل ملف PDF' : 'Could not download the PDF');
+        } finally {
+            if (button) button.disabled = false;
+        }
+    },
+
     deleteReport: async function (reportId) {
         const report = this.currentReports.find(r => r.id === reportId);
         if (!report) return;
@@ -1473,26 +1554,6 @@ const ReportManager = {
     // Predefined Notes Functions
     predefinedNotes: [],
 
-    loadPredefinedNotes: async function () {
-        try {
-            // Add cache-busting parameter
-            const timestamp = new Date().getTime();
-            const response = await fetch(`${API_BASE_URL}/predefined-notes?t=${timestamp}`, {
-                headers: getAuthHeaders()
-            });
-
-            if (response.ok) {
-                const data = await response.json();
-                this.predefinedNotes = data.questions || [];
-                this.populatePredefinedQuestions();
-            } else {
-                console.error('Failed to load predefined notes');
-            }
-        } catch (error) {
-            console.error('Error loading predefined notes:', error);
-        }
-    },
-
     populatePredefinedQuestions: function () {
         const select = document.getElementById('predefinedQuestionSelect');
         if (!select) return;
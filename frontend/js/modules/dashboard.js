@@ -15,28 +15,20 @@ const Dashboard = {
                 'Authorization': `Bearer ${token}`
             };
 
-            // Use paginated endpoints for fast counts
-            const [clientsResponse, productsResponse, reportsResponse] = await Promise.all([
-                fetch(`${API_BASE_URL}/clients/list?page=1&per_page=1`, { headers }),
-                fetch(`${API_BASE_URL}/products/list?page=1&per_page=1`, { headers }),
-                fetch(`${API_BASE_URL}/visit-reports/list?page=1&per_page=1`, { headers })
-            ]);
-
-            if (clientsResponse.ok && productsResponse.ok && reportsResponse.ok) {
-                const [clientsData, productsData, reportsData] = await Promise.all([
-                    clientsResponse.json(),
-                    productsResponse.json(),
-                    reportsResponse.json()
-                ]);
+            // All counters in one request, computed and cached per role scope on the server
+            const response = await fetch(`${API_BASE_URL}/dashboard/stats`, { headers });
+
+            if (response.ok) {
+                const stats = await response.json();
 
                 // Update dashboard counters
                 const totalClientsEl = document.getElementById('totalClients');
                 const totalProductsEl = document.getElementById('totalProducts');
                 const monthlyReportsEl = document.getElementById('monthlyReports');
 
-                if (totalClientsEl) totalClientsEl.textContent = clientsData.total || 0;
-                if (totalProductsEl) totalProductsEl.textContent = productsData.total || 0;
-                if (monthlyReportsEl) monthlyReportsEl.textContent = reportsData.total || 0;
+                if (totalClientsEl) totalClientsEl.textContent = stats.total_clients || 0;
+                if (totalProductsEl) totalProductsEl.textContent = stats.total_products || 0;
+                if (monthlyReportsEl) monthlyReportsEl.textContent = stats.monthly_reports || 0;
             } else {
                 console.error('Failed to load dashboard data');
             }
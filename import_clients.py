@@ -6,6 +6,7 @@ import sqlite3
 from datetime import datetime
 import os
 import sys
+from backend.search.normalize import normalize_text
 
 def import_clients():
     # Database connection - check both locations
@@ -99,14 +100,18 @@ def import_clients():
                         INSERT INTO clients (
                             name, 
                             region, 
+                            name_key, 
+                            region_key, 
                             location, 
                             thumbnail, 
                             assigned_user_id,
                             created_at
-                        ) VALUES (?, ?, ?, ?, ?, ?)
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """, (
                         client_name,
                         region,
+                        normalize_text(client_name),  # search keys, normally set by the Client model
+                        normalize_text(region),
                         None,  # location - null for now
                         None,  # thumbnail - null for now
                         abdullah_id,
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Migration script to move image BLOBs out of SQLite into the blob store:
+- Streams each image table in id order, one batch at a time
+- Writes every image to the content-addressed store (deduplicated)
+- Replaces the BLOB with its hash and updates reference counts
+- Optionally generates the resized renditions inline
+- Optionally VACUUMs the database afterwards to reclaim the space
+
+Run `flask db upgrade` first so the *_hash columns exist.
+
+Usage: python migrate_blobs_to_store.py [--batch-size 200] [--renditions] [--vacuum] [--restore]
+"""
+
+import argparse
+from sqlalchemy import text
+from app import app
+from backend.models import db
+from backend.models.blob import acquire_blob, release_blob
+from backend.storage.blob_store import put_blob, read_blob
+from backend.storage.image_pipeline import generate_renditions
+
+# (table, legacy BLOB column, hash column)
+BLOB_COLUMNS = [
+    ('clients', 'thumbnail', 'thumbnail_hash'),
+    ('products', 'thumbnail', 'thumbnail_hash'),
+    ('client_images', 'image_data', 'image_hash'),
+    ('product_images', 'image_data', 'image_hash'),
+    ('visit_report_images', 'image_data', 'image_hash'),
+]
+
+def move_table(table, blob_column, hash_column, batch_size, renditions=False):
+    """Move one table's BLOBs to the store, committing after every batch"""
+    select_batch = text(f"""
+        SELECT id, {blob_column} FROM {table}
+        WHERE id > :last_id AND {blob_column} IS NOT NULL AND {hash_column} IS NULL
+        ORDER BY id LIMIT :batch_size
+    """)
+    update_row = text(f"UPDATE {table} SET {hash_column} = :hash, {blob_column} = NULL WHERE id = :id")
+
+    last_id = 0
+    moved = 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(select_batch, {'last_id': last_id, 'batch_size': batch_size}).fetchall()
+            if not rows:
+                break
+            for row_id, data in rows:
+                hash_value = put_blob(data)
+                acquire_blob(connection, hash_value)
+                if renditions:
+                    try:
+                        generate_renditions(hash_value)
+                    except Exception as e:
+                        # Served from the original until generated on demand
+                        print(f"  ⚠️ {table} #{row_id}: could not generate renditions: {e}")
+                connection.execute(update_row, {'hash': hash_value, 'id': row_id})
+            last_id = rows[-1][0]
+            moved += len(rows)
+        print(f"  {table}: moved {moved} rows (last id {last_id})")
+    return moved
+
+def restore_table(table, blob_column, hash_column, batch_size):
+    """Copy blob-store images back into the legacy BLOB column (before a downgrade)"""
+    select_batch = text(f"""
+        SELECT id, {hash_column} FROM {table}
+        WHERE id > :last_id AND {hash_column} IS NOT NULL
+        ORDER BY id LIMIT :batch_size
+    """)
+    update_row = text(f"UPDATE {table} SET {blob_column} = :data, {hash_column} = NULL WHERE id = :id")
+
+    last_id = 0
+    restored = 0
+    while True:
+        with db.engine.begin() as connection:
+            rows = connection.execute(select_batch, {'last_id': last_id, 'batch_size': batch_size}).fetchall()
+            if not rows:
+                break
+            for row_id, hash_value in rows:
+                connection.execute(update_row, {'data': read_blob(hash_value), 'id': row_id})
+                # Files are left on disk; delete instance/blobs once the downgrade is done
+                release_blob(connection, hash_value)
+            last_id = rows[-1][0]
+            restored += len(rows)
+        print(f"  {table}: restored {restored} rows (last id {last_id})")
+    return restored
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move image BLOBs into the blob store')
+    parser.add_argument('--batch-size', type=int, default=200, help='rows loaded per transaction')
+    parser.add_argument('--renditions', action='store_true', help='generate resized renditions while moving')
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM the database afterwards')
+    parser.add_argument('--restore', action='store_true', help='move images back into the database')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 Running Migration: " + ("Restore BLOBs from blob store" if args.restore else "Move BLOBs to blob store"))
+    print("=" * 60)
+
+    with app.app_context():
+        total = 0
+        for table, blob_column, hash_column in BLOB_COLUMNS:
+            if args.restore:
+                total += restore_table(table, blob_column, hash_column, args.batch_size)
+            else:
+                total += move_table(table, blob_column, hash_column, args.batch_size, args.renditions)
+
+        if args.vacuum:
+            print("🔄 Running VACUUM to reclaim space...")
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text("VACUUM"))
+
+    print("=" * 60)
+    print(f"✅ Migration completed: {total} images processed")
+    print("=" * 60)
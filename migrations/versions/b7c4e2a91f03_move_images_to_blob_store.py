@@ -0,0 +1,54 @@
+"""Move images to the content-addressed blob store
+
+Revision ID: b7c4e2a91f03
+Revises: 21bf2170a3c1
+Create Date: 2026-10-17 09:12:44.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c4e2a91f03'
+down_revision = '21bf2170a3c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumbnail_hash', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumbnail_hash', sa.String(length=64), nullable=True))
+
+    # image_data becomes optional: new rows only carry image_hash
+    for table in ('client_images', 'product_images', 'visit_report_images'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('image_hash', sa.String(length=64), nullable=True))
+            batch_op.alter_column('image_data', existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade():
+    # Run migrate_blobs_to_store.py --restore first, or images stored only on disk are lost
+    for table in ('visit_report_images', 'product_images', 'client_images'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('image_data', existing_type=sa.LargeBinary(), nullable=False)
+            batch_op.drop_column('image_hash')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_column('thumbnail_hash')
+
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_column('thumbnail_hash')
+
+    op.drop_table('blobs')
@@ -0,0 +1,65 @@
+"""Add full-text search indexes for clients and visit report notes
+
+Revision ID: c3e8f1a5d217
+Revises: b7c4e2a91f03
+Create Date: 2026-10-17 15:40:12.902117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8f1a5d217'
+down_revision = 'b7c4e2a91f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # External-content FTS5 tables: only the index is stored, the text stays in
+    # the base tables and triggers keep the two in step
+    op.execute("""CREATE VIRTUAL TABLE clients_fts USING fts5(
+        name, region, address, salesman_name,
+        content='clients', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""")
+    op.execute("""CREATE TRIGGER clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts(rowid, name, region, address, salesman_name)
+        VALUES (new.id, new.name, new.region, new.address, new.salesman_name);
+    END""")
+    op.execute("""CREATE TRIGGER clients_fts_delete AFTER DELETE ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, region, address, salesman_name)
+        VALUES ('delete', old.id, old.name, old.region, old.address, old.salesman_name);
+    END""")
+    op.execute("""CREATE TRIGGER clients_fts_update AFTER UPDATE OF name, region, address, salesman_name ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, name, region, address, salesman_name)
+        VALUES ('delete', old.id, old.name, old.region, old.address, old.salesman_name);
+        INSERT INTO clients_fts(rowid, name, region, address, salesman_name)
+        VALUES (new.id, new.name, new.region, new.address, new.salesman_name);
+    END""")
+
+    op.execute("""CREATE VIRTUAL TABLE visit_report_notes_fts USING fts5(
+        note_text,
+        content='visit_report_notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""")
+    op.execute("""CREATE TRIGGER visit_report_notes_fts_insert AFTER INSERT ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(rowid, note_text) VALUES (new.id, new.note_text);
+    END""")
+    op.execute("""CREATE TRIGGER visit_report_notes_fts_delete AFTER DELETE ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(visit_report_notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+    END""")
+    op.execute("""CREATE TRIGGER visit_report_notes_fts_update AFTER UPDATE OF note_text ON visit_report_notes BEGIN
+        INSERT INTO visit_report_notes_fts(visit_report_notes_fts, rowid, note_text) VALUES ('delete', old.id, old.note_text);
+        INSERT INTO visit_report_notes_fts(rowid, note_text) VALUES (new.id, new.note_text);
+    END""")
+
+    # Index the rows that already exist
+    op.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO visit_report_notes_fts(visit_report_notes_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    for trigger in ('visit_report_notes_fts_update', 'visit_report_notes_fts_delete', 'visit_report_notes_fts_insert',
+                    'clients_fts_update', 'clients_fts_delete', 'clients_fts_insert'):
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS visit_report_notes_fts')
+    op.execute('DROP TABLE IF EXISTS clients_fts')
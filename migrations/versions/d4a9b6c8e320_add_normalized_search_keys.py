@@ -0,0 +1,111 @@
+"""Add normalized search key columns and index them for full-text search
+
+Revision ID: d4a9b6c8e320
+Revises: c3e8f1a5d217
+Create Date: 2026-10-17 17:05:31.447920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.search.normalize import normalize_text
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9b6c8e320'
+down_revision = 'c3e8f1a5d217'
+branch_labels = None
+depends_on = None
+
+CLIENT_KEYS = {'name_key': 'name', 'region_key': 'region', 'address_key': 'address', 'salesman_key': 'salesman_name'}
+
+
+def _backfill(table, keys):
+    connection = op.get_bind()
+    sources = list(keys.values())
+    rows = connection.execute(sa.text(f"SELECT id, {', '.join(sources)} FROM {table}")).fetchall()
+    assignments = ', '.join(f'{key} = :{key}' for key in keys)
+    for row in rows:
+        values = {key: normalize_text(value) for key, value in zip(keys, row[1:])}
+        connection.execute(sa.text(f'UPDATE {table} SET {assignments} WHERE id = :id'), {'id': row[0], **values})
+
+
+def _drop_fts(index, triggers=('insert', 'delete', 'update')):
+    for trigger in triggers:
+        op.execute(f'DROP TRIGGER IF EXISTS {index}_{trigger}')
+    op.execute(f'DROP TABLE IF EXISTS {index}')
+
+
+def _create_clients_fts(columns):
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    names = ', '.join(columns)
+    op.execute(f"""CREATE VIRTUAL TABLE clients_fts USING fts5(
+        {names},
+        content='clients', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""")
+    op.execute(f"""CREATE TRIGGER clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts(rowid, {names}) VALUES (new.id, {new});
+    END""")
+    op.execute(f"""CREATE TRIGGER clients_fts_delete AFTER DELETE ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, {names}) VALUES ('delete', old.id, {old});
+    END""")
+    op.execute(f"""CREATE TRIGGER clients_fts_update AFTER UPDATE OF {names} ON clients BEGIN
+        INSERT INTO clients_fts(clients_fts, rowid, {names}) VALUES ('delete', old.id, {old});
+        INSERT INTO clients_fts(rowid, {names}) VALUES (new.id, {new});
+    END""")
+    op.execute("INSERT INTO clients_fts(clients_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    # Plain ADD COLUMN: a batch (copy and rename) of clients would drop its FTS triggers
+    op.add_column('clients', sa.Column('name_key', sa.String(length=255), nullable=True))
+    op.add_column('clients', sa.Column('region_key', sa.String(length=255), nullable=True))
+    op.add_column('clients', sa.Column('address_key', sa.Text(), nullable=True))
+    op.add_column('clients', sa.Column('salesman_key', sa.String(length=255), nullable=True))
+    op.add_column('products', sa.Column('name_key', sa.String(length=255), nullable=True))
+
+    _backfill('clients', CLIENT_KEYS)
+    _backfill('products', {'name_key': 'name'})
+
+    op.create_index('ix_clients_name_key', 'clients', ['name_key'])
+    op.create_index('ix_clients_region_key', 'clients', ['region_key'])
+    op.create_index('ix_clients_salesman_key', 'clients', ['salesman_key'])
+    op.create_index('ix_products_name_key', 'products', ['name_key'])
+
+    # The client index now covers the normalized keys instead of the raw text
+    _drop_fts('clients_fts')
+    _create_clients_fts(list(CLIENT_KEYS))
+
+    op.execute("""CREATE VIRTUAL TABLE products_fts USING fts5(
+        name_key,
+        content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )""")
+    op.execute("""CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name_key) VALUES (new.id, new.name_key);
+    END""")
+    op.execute("""CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+    END""")
+    op.execute("""CREATE TRIGGER products_fts_update AFTER UPDATE OF name_key ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name_key) VALUES ('delete', old.id, old.name_key);
+        INSERT INTO products_fts(rowid, name_key) VALUES (new.id, new.name_key);
+    END""")
+    op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    _drop_fts('products_fts')
+    _drop_fts('clients_fts')
+    _create_clients_fts(list(CLIENT_KEYS.values()))
+
+    op.drop_index('ix_products_name_key', table_name='products')
+    op.drop_index('ix_clients_salesman_key', table_name='clients')
+    op.drop_index('ix_clients_region_key', table_name='clients')
+    op.drop_index('ix_clients_name_key', table_name='clients')
+
+    op.drop_column('products', 'name_key')
+    op.drop_column('clients', 'salesman_key')
+    op.drop_column('clients', 'address_key')
+    op.drop_column('clients', 'region_key')
+    op.drop_column('clients', 'name_key')
@@ -0,0 +1,44 @@
+"""Index the normalized region and salesman keys for client filtering
+
+Revision ID: e5b1c7d9f432
+Revises: d4a9b6c8e320
+Create Date: 2026-10-17 18:21:07.183554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from backend.search.normalize import normalize_text
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c7d9f432'
+down_revision = 'd4a9b6c8e320'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows written outside the ORM (raw SQL imports) may still lack their keys
+    connection = op.get_bind()
+    for key, source in (('region_key', 'region'), ('salesman_key', 'salesman_name')):
+        rows = connection.execute(sa.text(
+            f'SELECT id, {source} FROM clients WHERE {key} IS NULL AND {source} IS NOT NULL'
+        )).fetchall()
+        for client_id, value in rows:
+            connection.execute(sa.text(f'UPDATE clients SET {key} = :key WHERE id = :id'),
+                               {'key': normalize_text(value), 'id': client_id})
+
+    # Wider indexes led by the same keys: filters seek on the key, and the
+    # filter dropdowns read distinct values per scope from the index alone
+    op.drop_index('ix_clients_region_key', table_name='clients')
+    op.drop_index('ix_clients_salesman_key', table_name='clients')
+    op.create_index('ix_clients_region_scope', 'clients', ['region_key', 'is_active', 'assigned_user_id', 'region'])
+    op.create_index('ix_clients_salesman_scope', 'clients', ['salesman_key', 'is_active', 'assigned_user_id', 'salesman_name'])
+
+
+def downgrade():
+    op.drop_index('ix_clients_salesman_scope', table_name='clients')
+    op.drop_index('ix_clients_region_scope', table_name='clients')
+    op.create_index('ix_clients_salesman_key', 'clients', ['salesman_key'])
+    op.create_index('ix_clients_region_key', 'clients', ['region_key'])
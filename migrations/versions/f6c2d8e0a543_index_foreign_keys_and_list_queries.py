@@ -0,0 +1,48 @@
+"""Index foreign keys and the scope and sort columns of list queries
+
+Revision ID: f6c2d8e0a543
+Revises: e5b1c7d9f432
+Create Date: 2026-10-17 19:02:44.610238
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c2d8e0a543'
+down_revision = 'e5b1c7d9f432'
+branch_labels = None
+depends_on = None
+
+# (index, table, columns); check_query_plans.py verifies the endpoints use them
+INDEXES = [
+    # Report lists: author scope (or all active reports) in created_at order
+    ('ix_visit_reports_user_activity', 'visit_reports', ['user_id', 'is_active', 'created_at']),
+    ('ix_visit_reports_active_created', 'visit_reports', ['is_active', 'created_at']),
+    ('ix_visit_reports_client_id', 'visit_reports', ['client_id']),
+    # Client lists and name dropdowns: owner scope (or all active clients) in name order
+    ('ix_clients_assigned_active_name', 'clients', ['assigned_user_id', 'is_active', 'name']),
+    ('ix_clients_active_name', 'clients', ['is_active', 'name']),
+    # Team lookups
+    ('ix_users_supervisor_id', 'users', ['supervisor_id']),
+    # Children loaded or counted per parent
+    ('ix_client_images_client_id', 'client_images', ['client_id']),
+    ('ix_product_images_product_id', 'product_images', ['product_id']),
+    ('ix_visit_report_images_visit_report_id', 'visit_report_images', ['visit_report_id']),
+    ('ix_visit_report_notes_visit_report_id', 'visit_report_notes', ['visit_report_id']),
+    ('ix_visit_report_products_visit_report_id', 'visit_report_products', ['visit_report_id']),
+    ('ix_visit_report_products_product_id', 'visit_report_products', ['product_id']),
+]
+
+
+def upgrade():
+    # Plain CREATE INDEX: recreating the tables in batch mode would drop the
+    # full-text search triggers on clients
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)